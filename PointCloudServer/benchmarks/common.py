@@ -0,0 +1,138 @@
+"""Helpers shared by the benchmark scripts"""
+
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOCUST_DIR = os.path.join(ROOT, "locust")
+
+def wait_for_server(url: str, timeout: float = 30.0) -> None:
+    """Block until the server at `url` accepts connections
+
+    :param url: The URL to poll
+    :param timeout: Seconds to wait before giving up
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return
+        except urllib.error.HTTPError:
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"Server at {url} did not come up within {timeout} s")
+
+def peak_memory(pid: int) -> int:
+    """Return the peak resident set size of a process in kB, if available
+
+    :param pid: The process id
+    :return: The peak RSS in kB or `None` on platforms without procfs
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def read_locust_stats(prefix: str) -> dict:
+    """Read the aggregated row of a locust stats csv file
+
+    :param prefix: The `--csv` prefix passed to locust
+    :return: The aggregated statistics
+    """
+    with open(prefix + "_stats.csv") as f:
+        for row in csv.DictReader(f):
+            if row["Name"] == "Aggregated":
+                return row
+    return {}
+
+def read_server_stats(log_path: str) -> dict:
+    """Read the statistics the DASH server logs on shutdown
+
+    :param log_path: The file the server output was written to
+    :return: The statistics or an empty dictionary if none were logged
+    """
+    stats = {}
+    with open(log_path) as f:
+        for line in f:
+            if " Statistics " in line:
+                stats = json.loads(line.split(" Statistics ", 1)[1])
+    return stats
+
+def benchmark(name: str, config: dict, media_dir: str, workdir: str, port: int, users: int, duration: str, locust_file: str = "sequential_user.py", server_args: list = (), locust_processes: int = 1, locust_args: list = ()) -> dict:
+    """Start a DASH server with `config` and run a headless locust scenario against it
+
+    :param name: The name of the run, used for the files in `workdir`
+    :param config: The configuration of the server
+    :param media_dir: The directory where media can be found
+    :param workdir: A directory for configuration, log and result files
+    :param port: The port the server listens on
+    :param users: The number of concurrent locust users
+    :param duration: The run time, e.g. 30s or 2m
+    :param locust_file: The locust file from the `locust` folder to run
+    :param server_args: Additional arguments for the `dash` command
+    :param locust_processes: The number of locust processes generating load
+    :param locust_args: Additional arguments for locust, e.g. options of the locust file
+    :return: The aggregated locust statistics extended by the peak memory and the server statistics
+    """
+    config_path = os.path.join(workdir, f"{name}.yaml")
+    with open(config_path, "w") as f:
+        yaml.dump(config, f)
+
+    host = f"http://127.0.0.1:{port}"
+    log_path = os.path.join(workdir, f"{name}.log")
+    with open(log_path, "w") as log:
+        server = subprocess.Popen([
+            sys.executable, "-m", "pointcloudserver.app", "dash",
+            "--config", config_path,
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--mediaDir", media_dir,
+            *server_args,
+        ], cwd=ROOT, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            wait_for_server(host + "/media/")
+            prefix = os.path.join(workdir, name)
+            # Locust exits with 1 if any request failed, failures are reported from the statistics instead
+            result = subprocess.run([
+                "locust", "-f", os.path.join(LOCUST_DIR, locust_file), "--headless",
+                "--host", host,
+                "--users", str(users),
+                "--spawn-rate", str(users),
+                "--run-time", duration,
+                "--csv", prefix,
+                "--only-summary",
+                "--processes", str(locust_processes),
+                *locust_args,
+            ])
+            if not os.path.exists(prefix + "_stats.csv"):
+                raise RuntimeError(f"locust exited with code {result.returncode} without writing statistics")
+            stats = read_locust_stats(prefix)
+            stats["Peak RSS (kB)"] = peak_memory(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+    stats["server"] = read_server_stats(log_path)
+    return stats
+
+def print_table(results: dict, columns: list) -> None:
+    """Print one row per benchmark run
+
+    :param results: The statistics by run name
+    :param columns: The statistics to print
+    """
+    print("{:<12}".format("run") + "".join("{:>24}".format(c) for c in columns))
+    for name, stats in results.items():
+        print("{:<12}".format(name) + "".join("{:>24}".format(str(stats.get(c))) for c in columns))
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+
+"""Compare the segment delivery modes of the DASH server
+
+Starts a DASH server for every delivery mode, runs the locust
+`sequential_user` scenario headless against it and prints throughput,
+latency percentiles and the peak memory of the server process.
+
+Example:
+    python benchmarks/delivery.py --mediaDir media/ --users 50 --duration 60s
+"""
+
+import argparse
+import tempfile
+
+from common import benchmark, print_table
+
+MODES = ["memory", "file"]
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the DASH server delivery modes")
+    ap.add_argument("--mediaDir", metavar="DIR", type=str, required=True, help="Directory where media can be found")
+    ap.add_argument("--port", metavar="PORT", type=int, default=8089, help="Port used for the benchmarked server")
+    ap.add_argument("--users", metavar="N", type=int, default=20, help="Number of concurrent locust users")
+    ap.add_argument("--duration", metavar="TIME", type=str, default="30s", help="Run time per mode, e.g. 30s or 2m")
+    ap.add_argument("--cache", metavar="CACHE", choices={"internal", "redis", "none"}, default="none", help="Cache backend of the memory mode")
+    args = ap.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in MODES:
+            config = {"cache": {"use": args.cache}, "dash": {"delivery": mode}}
+            results[mode] = benchmark(mode, config, args.mediaDir, workdir, args.port, args.users, args.duration)
+
+    print_table(results, ["Requests/s", "Average Response Time", "50%", "95%", "99%", "Failure Count", "Peak RSS (kB)"])
+
+if __name__ == "__main__":
+    main()
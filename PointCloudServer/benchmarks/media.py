@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+"""Generate a synthetic media tree for benchmarks
+
+Every media consists of one folder per representation with one segment
+file of random bytes per frame and an `mpd.xml` in the format written by
+`pointcloudserver mpd`. The content only depends on the arguments and the
+seed, so runs on different machines and commits serve identical media.
+
+Example:
+    python benchmarks/media.py --outputDir /tmp/media --media 2 --frames 300 --sizes 20 60 120
+"""
+
+import argparse
+import os
+import random
+import xml.etree.ElementTree as ET
+
+def generate_media(path: str, media: int = 1, frames: int = 300, sizes: list = (20, 60, 120), fps: int = 30, seed: int = 0) -> list:
+    """Write synthetic media into `path`
+
+    :param path: The media directory to create
+    :param media: The number of media
+    :param frames: The number of frames per media
+    :param sizes: The average segment size in kB of every representation, from low to high quality
+    :param fps: The frames per second advertised in the MPD
+    :param seed: The seed of the generated content
+    :return: The names of the generated media
+    """
+    rng = random.Random(seed)
+    names = []
+    for m in range(media):
+        name = f"media{m:02d}"
+        names.append(name)
+        representations = [f"q{i}" for i in range(len(sizes))]
+
+        mpd = ET.Element("MPD")
+        mpd.set("type", "static")
+        mpd.set("minBufferTime", str(1.0/fps))
+        ET.SubElement(mpd, "BaseURL").text = "/media/" + name + "/"
+
+        for representation in representations:
+            os.makedirs(os.path.join(path, name, representation), exist_ok=True)
+
+        for frame in range(frames):
+            period = ET.SubElement(mpd, "Period")
+            period.set("id", str(frame))
+            period.set("start", f"PT{frame/fps}S")
+            period.set("duration", f"PT{1/fps}S")
+            adaptation_set = ET.SubElement(period, "AdaptationSet")
+            adaptation_set.set("id", "0")
+            adaptation_set.set("mimeType", "pointcloud/drc")
+
+            segment = f"{frame:08d}.drc"
+            for i, (representation, size) in enumerate(zip(representations, sizes)):
+                # Vary the size of consecutive frames like a real encoder does
+                length = max(1, int(size*1024*rng.uniform(0.8, 1.2)))
+                with open(os.path.join(path, name, representation, segment), "wb") as f:
+                    f.write(rng.randbytes(length))
+
+                element = ET.SubElement(adaptation_set, "Representation")
+                element.set("id", f"{frame}-{i}")
+                element.set("size", str(length))
+                element.set("bandwidth", str(length*fps))
+                ET.SubElement(element, "BaseURL").text = representation + "/" + segment
+
+        ET.ElementTree(mpd).write(os.path.join(path, name, "mpd.xml"), encoding="utf-8", xml_declaration=True)
+    return names
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Generate a synthetic media tree")
+    ap.add_argument("--outputDir", metavar="DIR", type=str, required=True, help="Directory to write the media to")
+    ap.add_argument("--media", metavar="N", type=int, default=1, help="Number of media")
+    ap.add_argument("--frames", metavar="N", type=int, default=300, help="Number of frames per media")
+    ap.add_argument("--sizes", metavar="KB", type=int, nargs="+", default=[20, 60, 120], help="Average segment size of every representation")
+    ap.add_argument("--fps", metavar="FPS", type=int, default=30, help="Frames per second")
+    ap.add_argument("--seed", metavar="N", type=int, default=0, help="Seed of the generated content")
+    args = ap.parse_args()
+
+    names = generate_media(args.outputDir, args.media, args.frames, args.sizes, args.fps, args.seed)
+    print(f"Generated {len(names)} media in {args.outputDir}")
+
+if __name__ == "__main__":
+    main()
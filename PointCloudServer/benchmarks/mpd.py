@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+"""Measure how the MPD generation scales with the length of a sequence
+
+Creates synthetic media trees with one folder of small segment files per
+quality and runs `pointcloudserver mpd` on every tree with different
+numbers of I/O threads, with a period per frame and in the compact layout.
+The run time and the peak memory of the command, the size of the MPD
+uncompressed and gzipped and the time a client takes to parse it into
+timeslots are printed per run.
+
+Example:
+    python benchmarks/mpd.py --frames 1000 10000 100000 --qualities 3 --ioWorkers 1 8
+"""
+
+import argparse
+import gzip
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT, print_table
+
+sys.path.insert(0, ROOT)
+from pointcloudserver.dash.timeline import parse_timeline
+
+LAYOUTS = ["periods", "compact"]
+
+def generate_tree(path: str, frames: int, qualities: int, seed: int = 0) -> None:
+    """Write a single object media tree with tiny segments
+
+    :param path: The media directory to create
+    :param frames: The number of frames per quality
+    :param qualities: The number of qualities
+    :param seed: The seed of the segment sizes
+    """
+    rng = random.Random(seed)
+    for q in range(qualities):
+        quality_path = os.path.join(path, f"q{q}")
+        os.makedirs(quality_path)
+        for frame in range(frames):
+            with open(os.path.join(quality_path, f"{frame:08d}.drc"), "wb") as f:
+                f.write(bytes(rng.randint(1, 64)))
+
+def generate_mpd(media_dir: str, output: str, io_workers: int, pretty: bool, compact: bool) -> dict:
+    """Run `pointcloudserver mpd` and measure it
+
+    :return: The run time in seconds, the peak memory in kB, the size of the MPD in kB and the parse time in ms
+    """
+    command = [
+        sys.executable, "-m", "pointcloudserver.app", "mpd",
+        "--baseUrl", "/media/bench/",
+        "--framesPerSecond", "30",
+        "--ioWorkers", str(io_workers),
+        "--outputFile", output,
+        media_dir,
+    ]
+    if pretty:
+        command.insert(-1, "--pretty")
+    if compact:
+        command.insert(-1, "--compact")
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT)
+    _, status, usage = os.wait4(process.pid, 0)
+    duration = time.perf_counter() - start
+    if status != 0:
+        raise RuntimeError(f"MPD generation for {media_dir} failed")
+
+    with open(output, "rb") as f:
+        content = f.read()
+    start = time.perf_counter()
+    parse_timeline(content, "http://127.0.0.1/media/bench")
+    parse_duration = time.perf_counter() - start
+    return {
+        "seconds": round(duration, 3),
+        "peak_rss_kb": usage.ru_maxrss,
+        "mpd_kb": len(content) // 1024,
+        "gzip_kb": len(gzip.compress(content)) // 1024,
+        "parse_ms": round(parse_duration * 1000, 1),
+    }
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the MPD generation")
+    ap.add_argument("--frames", metavar="N", type=int, nargs="+", default=[1000, 10000, 100000], help="Number of frames of the generated trees")
+    ap.add_argument("--qualities", metavar="N", type=int, default=3, help="Number of qualities of the generated trees")
+    ap.add_argument("--ioWorkers", metavar="N", type=int, nargs="+", default=[1, 8], help="Numbers of I/O threads to compare")
+    ap.add_argument("--layouts", metavar="NAME", nargs="+", choices=LAYOUTS, default=LAYOUTS, help="MPD layouts to compare")
+    ap.add_argument("--pretty", action="store_true", help="Write indented MPDs")
+    args = ap.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for frames in args.frames:
+            media_dir = os.path.join(workdir, f"media{frames}")
+            generate_tree(media_dir, frames, args.qualities)
+            for layout in args.layouts:
+                for io_workers in args.ioWorkers:
+                    output = os.path.join(workdir, f"mpd{frames}.xml")
+                    results[f"{frames}/{layout}/{io_workers}"] = generate_mpd(media_dir, output, io_workers, args.pretty, layout == "compact")
+
+    print_table(results, ["seconds", "peak_rss_kb", "mpd_kb", "gzip_kb", "parse_ms"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+"""Compare the DASH server with and without segment prefetching
+
+Runs the locust `sequential_user` scenario against a server using the
+internal cache once without prefetching and once for every given prefetch
+depth. Prints throughput, latency percentiles and the cache hit ratio the
+server reports on shutdown.
+
+Example:
+    python benchmarks/prefetch.py --mediaDir media/ --segments 2 8 --users 50
+"""
+
+import argparse
+import tempfile
+
+from common import benchmark, print_table
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the DASH server segment prefetching")
+    ap.add_argument("--mediaDir", metavar="DIR", type=str, required=True, help="Directory where media can be found")
+    ap.add_argument("--port", metavar="PORT", type=int, default=8089, help="Port used for the benchmarked server")
+    ap.add_argument("--users", metavar="N", type=int, default=20, help="Number of concurrent locust users")
+    ap.add_argument("--duration", metavar="TIME", type=str, default="30s", help="Run time per configuration, e.g. 30s or 2m")
+    ap.add_argument("--bufferSize", metavar="MB", type=int, default=64, help="Size of the internal cache")
+    ap.add_argument("--segments", metavar="K", type=int, nargs="+", default=[4], help="Prefetch depths to compare")
+    args = ap.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for segments in [0] + args.segments:
+            name = f"prefetch-{segments}"
+            config = {
+                "cache": {"use": "internal", "internal": {"buffer_size": args.bufferSize}},
+                "dash": {"prefetch": {"segments": segments}},
+            }
+            stats = benchmark(name, config, args.mediaDir, workdir, args.port, args.users, args.duration)
+            cache = stats["server"].get("cache", {})
+            lookups = cache.get("hits", 0) + cache.get("misses", 0)
+            stats["Hit ratio"] = round(cache.get("hits", 0) / lookups, 3) if lookups else None
+            results[name] = stats
+
+    print_table(results, ["Requests/s", "Average Response Time", "50%", "95%", "99%", "Hit ratio"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+"""Compare the serialization of socket frames
+
+Serializes rotated synthetic frames of different sizes with the former
+implementation, which converted every section into a temporary array, copied
+it into a byte string and concatenated them, into a newly allocated buffer
+per frame and into one reused buffer, as the socket server does with the
+buffers of its ring while no client holds them. The mean
+time per frame and the resulting throughput are printed per point count.
+
+Example:
+    python benchmarks/serialize.py --points 10000 100000 1000000
+"""
+
+import argparse
+import sys
+import timeit
+
+import numpy as np
+
+from common import ROOT, print_table
+
+sys.path.insert(0, ROOT)
+from pointcloudserver.transfer.socket_server import SocketServer
+from pointcloudserver.transfer.synthetic import SyntheticWorkload
+from pointcloudserver.transfer.wire import get_frame_size
+
+def serialize_legacy(vertices: np.ndarray, colors: np.ndarray) -> bytes:
+    num_points = np.array([len(vertices)], dtype=np.int32).tobytes("C")
+    vertices = np.array(vertices, dtype=np.int16).tobytes("C")
+    colors = np.array(colors, dtype=np.uint8).tobytes("C")
+    return num_points + vertices + colors
+
+def measure(func, repeat: int) -> float:
+    """Return the fastest mean time of a call in ms out of 5 runs"""
+    return min(timeit.repeat(func, number=repeat, repeat=5)) / repeat * 1000
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the serialization of socket frames")
+    ap.add_argument("--points", metavar="N", type=int, nargs="+", default=[10000, 100000, 1000000], help="Numbers of points per frame")
+    ap.add_argument("--repeat", metavar="N", type=int, default=20, help="Frames serialized per measurement")
+    args = ap.parse_args()
+
+    server = SocketServer()
+    results = {}
+    for points in args.points:
+        xyz, rgb = SyntheticWorkload(num_points=points).get_frame(1.0)
+        buffer = bytearray(get_frame_size(points))
+        assert serialize_legacy(xyz, rgb) == server.serialize(xyz, rgb) == server.serialize(xyz, rgb, buffer)
+
+        timings = {
+            "legacy": measure(lambda: serialize_legacy(xyz, rgb), args.repeat),
+            "allocated": measure(lambda: server.serialize(xyz, rgb), args.repeat),
+            "reused": measure(lambda: server.serialize(xyz, rgb, buffer), args.repeat),
+        }
+        size_mb = get_frame_size(points) / 1024 / 1024
+        stats = {}
+        for name, ms in timings.items():
+            stats[f"{name} (ms)"] = round(ms, 3)
+            stats[f"{name} (MB/s)"] = round(size_mb / ms * 1000)
+        results[str(points)] = stats
+
+    print_table(results, [f"{name} ({unit})" for name in ["legacy", "allocated", "reused"] for unit in ["ms", "MB/s"]])
+
+if __name__ == "__main__":
+    main()
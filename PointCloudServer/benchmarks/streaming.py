@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+"""Measure the throughput of the socket server with many clients
+
+Starts `pointcloudserver socket` and connects an increasing number of
+clients, which either request a frame after receiving the previous one or
+let the server push frames at its frame rate. A share of the clients can be
+slow readers, which sleep after every frame. The server streams a synthetic
+point cloud generated from a fixed seed or a recorded sequence, so runs are
+repeatable. Received frames per second, throughput and request latency over
+all clients, the frames dropped for slow readers and the peak memory of the
+server process are printed per run.
+
+Example:
+    python benchmarks/streaming.py --clients 1 8 32 --modes pull push --duration 10 --slow 0.25
+    python benchmarks/streaming.py --clients 8 --modes push --points 1000000 --shape sphere
+    python benchmarks/streaming.py --clients 8 --modes push --sequence longdress.frames
+"""
+
+import argparse
+import asyncio
+import socket
+import struct
+import subprocess
+import sys
+import time
+
+from common import ROOT, peak_memory, print_table
+
+MODES = ["pull", "push"]
+
+def wait_for_port(host: str, port: int, timeout: float = 30.0) -> None:
+    """Block until a TCP server at `host` and `port` accepts connections"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"Server at {host}:{port} did not come up within {timeout} s")
+
+async def read_frame(reader: asyncio.StreamReader) -> int:
+    """Read one serialized frame
+
+    :return: The size of the frame in bytes
+    """
+    num_points = struct.unpack("<i", await reader.readexactly(4))[0]
+    await reader.readexactly(num_points * 9)
+    return 4 + num_points * 9
+
+async def client(host: str, port: int, mode: str, duration: float, delay: float) -> dict:
+    """Receive frames for `duration` seconds
+
+    :param mode: pull to request every frame, push to let the server send frames
+    :param delay: Seconds to sleep after every frame, emulating a slow reader
+    :return: The number of frames and bytes received and the request latencies in seconds
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    frames = 0
+    size = 0
+    latencies = []
+    end = time.perf_counter() + duration
+    if mode == "push":
+        writer.write(b"\x01")
+    while time.perf_counter() < end:
+        if mode == "pull":
+            start = time.perf_counter()
+            writer.write(b"\x00")
+            size += await read_frame(reader)
+            latencies.append(time.perf_counter() - start)
+        else:
+            size += await read_frame(reader)
+        frames += 1
+        if delay > 0:
+            await asyncio.sleep(delay)
+    writer.close()
+    return {"frames": frames, "bytes": size, "latencies": latencies}
+
+async def run_clients(host: str, port: int, mode: str, clients: int, duration: float, slow: float, delay: float) -> list:
+    slow_clients = int(clients * slow)
+    return await asyncio.gather(*[
+        client(host, port, mode, duration, delay if i < slow_clients else 0.0) for i in range(clients)
+    ])
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def benchmark(args: argparse.Namespace, mode: str, clients: int) -> dict:
+    command = [
+        sys.executable, "-m", "pointcloudserver.app", "socket",
+        "--host", args.host,
+        "--port", str(args.port),
+        "--fps", str(args.fps),
+        "--maxBuffer", str(args.maxBuffer),
+        "--points", str(args.points),
+        "--shape", args.shape,
+    ]
+    if args.sequence is not None:
+        command += ["--sequence", args.sequence, "--loop"]
+    server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    try:
+        wait_for_port(args.host, args.port)
+        results = asyncio.run(run_clients(args.host, args.port, mode, clients, args.duration, args.slow, args.delay))
+        memory = peak_memory(server.pid)
+        # Let the server log the closed connections
+        time.sleep(0.5)
+    finally:
+        server.terminate()
+        _, log = server.communicate()
+
+    # The server logs the frames dropped for every closed connection
+    dropped = sum(int(line.rsplit(" ", 1)[1]) for line in log.splitlines() if "dropped" in line)
+    frames = sum(result["frames"] for result in results)
+    size = sum(result["bytes"] for result in results)
+    latencies = [latency for result in results for latency in result["latencies"]]
+    return {
+        "Frames/s": round(frames / args.duration, 1),
+        "MB/s": round(size / args.duration / 1024 / 1024, 1),
+        "Latency 50% (ms)": round(percentile(latencies, 0.5) * 1000, 1) if latencies else None,
+        "Latency 99% (ms)": round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+        "Dropped": dropped,
+        "Peak RSS (kB)": memory,
+    }
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the socket server with concurrent clients")
+    ap.add_argument("--host", metavar="ADDRESS", type=str, default="127.0.0.1", help="Address of the benchmarked server")
+    ap.add_argument("--port", metavar="PORT", type=int, default=5089, help="Port used for the benchmarked server")
+    ap.add_argument("--clients", metavar="N", type=int, nargs="+", default=[1, 8, 32], help="Numbers of concurrent clients")
+    ap.add_argument("--modes", metavar="MODE", choices=MODES, nargs="+", default=MODES, help="Request every frame (pull) or let the server push frames (push)")
+    ap.add_argument("--duration", metavar="SECONDS", type=float, default=10.0, help="Run time per run")
+    ap.add_argument("--fps", metavar="N", type=int, default=30, help="Frame rate of the server")
+    ap.add_argument("--maxBuffer", metavar="KB", type=int, default=1024, help="kB waiting to be sent to a pushed client before frames are dropped")
+    ap.add_argument("--points", metavar="N", type=int, default=10000, help="Number of points of every frame")
+    ap.add_argument("--shape", metavar="SHAPE", choices=["cube", "sphere", "ball"], default="cube", help="Shape of the streamed point cloud")
+    ap.add_argument("--sequence", metavar="FILE", type=str, default=None, help="Frames encoded with `pointcloudserver encode` to stream in a loop instead of a synthetic point cloud")
+    ap.add_argument("--slow", metavar="SHARE", type=float, default=0.0, help="Share of clients reading slowly")
+    ap.add_argument("--delay", metavar="SECONDS", type=float, default=0.2, help="Seconds a slow client sleeps after every frame")
+    args = ap.parse_args()
+
+    results = {}
+    for mode in args.modes:
+        for clients in args.clients:
+            name = f"{mode}-{clients}"
+            print(f"Running {name}", file=sys.stderr)
+            results[name] = benchmark(args, mode, clients)
+
+    print_table(results, ["Frames/s", "MB/s", "Latency 50% (ms)", "Latency 99% (ms)", "Dropped", "Peak RSS (kB)"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+
+"""Run a reproducible benchmark of the DASH server for every cache backend
+
+Generates a synthetic media tree, unless one is given, and runs the locust
+`player_user` scenario headless against a server with each cache backend.
+The players fetch one segment per frame at the frame rate, switch
+representations and seek. Throughput, latency percentiles and the cache
+hit ratio are written to a JSON report, which can be compared with the
+report of another commit.
+
+Example:
+    python benchmarks/suite.py --backends none internal redis --users 50 --output report.json
+    python benchmarks/suite.py --output new.json --baseline report.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+from common import ROOT, benchmark, print_table
+from media import generate_media
+
+BACKENDS = ["none", "internal", "redis"]
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def redis_available(host: str, port: int) -> bool:
+    try:
+        import redis
+        return redis.Redis(host=host, port=port, socket_connect_timeout=1).ping()
+    except Exception:
+        return False
+
+def get_hit_ratio(server_stats: dict) -> float:
+    cache = server_stats.get("cache")
+    if not cache:
+        return None
+    requests = cache.get("hits", 0) + cache.get("misses", 0)
+    return round(cache.get("hits", 0) / requests, 4) if requests else None
+
+def to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def summarize(stats: dict) -> dict:
+    """Reduce the statistics of a run to the reported values
+
+    :param stats: The statistics returned by `benchmark`
+    :return: The throughput, latency percentiles in ms, failures, hit ratio and peak memory
+    """
+    return {
+        "requests_per_s": round(to_float(stats.get("Requests/s")) or 0, 2),
+        "p50_ms": to_float(stats.get("50%")),
+        "p95_ms": to_float(stats.get("95%")),
+        "p99_ms": to_float(stats.get("99%")),
+        "requests": int(stats.get("Request Count") or 0),
+        "failures": int(stats.get("Failure Count") or 0),
+        "hit_ratio": get_hit_ratio(stats.get("server", {})),
+        "peak_rss_kb": stats.get("Peak RSS (kB)"),
+    }
+
+def compare(report: dict, baseline: dict) -> None:
+    """Print the change of every result relative to a baseline report"""
+    print(f"Compared to {baseline.get('commit')} from {baseline.get('date')}:")
+    for backend, result in report["results"].items():
+        old = baseline.get("results", {}).get(backend)
+        if not old or "skipped" in result or "skipped" in old:
+            continue
+        changes = []
+        for key in ["requests_per_s", "p50_ms", "p95_ms", "p99_ms", "hit_ratio"]:
+            if result.get(key) is not None and old.get(key):
+                changes.append(f"{key} {(result[key] - old[key]) / old[key] * 100:+.1f}%")
+        print(f"{backend:<12}" + ", ".join(changes))
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the DASH server with every cache backend")
+    ap.add_argument("--mediaDir", metavar="DIR", type=str, default=None, help="Directory with media to use instead of generated media")
+    ap.add_argument("--media", metavar="N", type=int, default=2, help="Number of generated media")
+    ap.add_argument("--frames", metavar="N", type=int, default=300, help="Number of frames per generated media")
+    ap.add_argument("--sizes", metavar="KB", type=int, nargs="+", default=[20, 60, 120], help="Average segment size of every generated representation")
+    ap.add_argument("--fps", metavar="FPS", type=int, default=30, help="Frames per second of the players")
+    ap.add_argument("--backends", metavar="NAME", nargs="+", choices=BACKENDS, default=BACKENDS, help="Cache backends to benchmark")
+    ap.add_argument("--bufferSize", metavar="MB", type=int, default=512, help="Size of the internal cache")
+    ap.add_argument("--redisHost", metavar="ADDRESS", type=str, default="127.0.0.1", help="Host of the redis server")
+    ap.add_argument("--redisPort", metavar="PORT", type=int, default=6379, help="Port of the redis server")
+    ap.add_argument("--port", metavar="PORT", type=int, default=8089, help="Port used for the benchmarked server")
+    ap.add_argument("--users", metavar="N", type=int, default=20, help="Number of concurrent players")
+    ap.add_argument("--duration", metavar="TIME", type=str, default="30s", help="Run time per backend, e.g. 30s or 2m")
+    ap.add_argument("--locustProcesses", metavar="N", type=int, default=1, help="Number of locust processes, -1 for one per core")
+    ap.add_argument("--output", metavar="FILE", type=str, default="report.json", help="Path of the JSON report")
+    ap.add_argument("--baseline", metavar="FILE", type=str, default=None, help="Report to compare the results with")
+    args = ap.parse_args()
+
+    settings = {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "port")}
+    report = {
+        "commit": get_commit(),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "settings": settings,
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        media_dir = args.mediaDir
+        if media_dir is None:
+            media_dir = os.path.join(workdir, "media")
+            names = generate_media(media_dir, args.media, args.frames, args.sizes, args.fps)
+        else:
+            names = sorted(entry for entry in os.listdir(media_dir) if os.path.isfile(os.path.join(media_dir, entry, "mpd.xml")))
+        locust_args = ["--media", ",".join(names), "--fps", str(args.fps)]
+
+        rows = {}
+        for backend in args.backends:
+            config = {
+                "cache": {"use": backend, "internal": {"buffer_size": args.bufferSize}},
+                "dash": {"metrics": False},
+            }
+            if backend == "redis":
+                if not redis_available(args.redisHost, args.redisPort):
+                    report["results"][backend] = {"skipped": f"no redis server at {args.redisHost}:{args.redisPort}"}
+                    continue
+                # A fresh prefix, so segments cached by earlier runs are not hit
+                config["cache"]["redis"] = {"host": args.redisHost, "port": args.redisPort, "prefix": f"benchmark-{int(time.time())}:", "ttl": 600}
+
+            stats = benchmark(
+                backend, config, media_dir, workdir, args.port, args.users, args.duration,
+                locust_file="player_user.py",
+                locust_processes=args.locustProcesses,
+                locust_args=locust_args,
+            )
+            report["results"][backend] = summarize(stats)
+            rows[backend] = report["results"][backend]
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print_table(rows, ["requests_per_s", "p50_ms", "p95_ms", "p99_ms", "hit_ratio", "failures"])
+    for backend, result in report["results"].items():
+        if "skipped" in result:
+            print(f"Skipped {backend}: {result['skipped']}")
+    print(f"Wrote report to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
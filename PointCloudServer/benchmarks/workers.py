@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+
+"""Measure how the DASH server throughput scales with the number of workers
+
+Runs the locust `sequential_user` scenario against a server with the
+internal cache for every given worker count. With more than one worker the
+cache is shared between the workers. Locust itself can be run in several
+processes, so the load generator does not become the bottleneck.
+
+Example:
+    python benchmarks/workers.py --mediaDir media/ --workers 1 2 4 8 --users 200 --locustProcesses 4
+"""
+
+import argparse
+import tempfile
+
+from common import benchmark, print_table
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the DASH server with multiple workers")
+    ap.add_argument("--mediaDir", metavar="DIR", type=str, required=True, help="Directory where media can be found")
+    ap.add_argument("--port", metavar="PORT", type=int, default=8089, help="Port used for the benchmarked server")
+    ap.add_argument("--users", metavar="N", type=int, default=100, help="Number of concurrent locust users")
+    ap.add_argument("--duration", metavar="TIME", type=str, default="30s", help="Run time per worker count, e.g. 30s or 2m")
+    ap.add_argument("--bufferSize", metavar="MB", type=int, default=512, help="Size of the internal cache")
+    ap.add_argument("--workers", metavar="N", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to compare")
+    ap.add_argument("--locustProcesses", metavar="N", type=int, default=1, help="Number of locust processes, -1 for one per core")
+    args = ap.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for workers in args.workers:
+            name = f"workers-{workers}"
+            config = {"cache": {"use": "internal", "internal": {"buffer_size": args.bufferSize}}}
+            results[name] = benchmark(
+                name, config, args.mediaDir, workdir, args.port, args.users, args.duration,
+                server_args=["--workers", str(workers)],
+                locust_processes=args.locustProcesses,
+            )
+
+    baseline = float(next(iter(results.values())).get("Requests/s") or 0)
+    for stats in results.values():
+        stats["Speedup"] = round(float(stats.get("Requests/s") or 0) / baseline, 2) if baseline else None
+    print_table(results, ["Requests/s", "Speedup", "50%", "95%", "99%", "Failure Count"])
+
+if __name__ == "__main__":
+    main()
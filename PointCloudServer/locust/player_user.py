@@ -0,0 +1,79 @@
+from locust import HttpUser, constant_pacing, events, task
+import random
+import re
+import xml.etree.ElementTree as ET
+
+@events.init_command_line_parser.add_listener
+def add_arguments(parser):
+    parser.add_argument("--media", type=str, default="", help="Comma separated names of the media to play")
+    parser.add_argument("--fps", type=float, default=30, help="Frames per second the players fetch")
+    parser.add_argument("--switchProbability", type=float, default=0.05, help="Probability to switch the representation per segment")
+    parser.add_argument("--seekProbability", type=float, default=0.005, help="Probability to seek to a random period per segment")
+
+def parse_compact_mpd(root):
+    # Written by `pointcloudserver mpd --compact`, one representation per quality with a numbered segment template
+    representations=[]
+    for representation in root.iter("Representation"):
+        template=representation.find("SegmentTemplate")
+        media=template.get("media")
+        prefix, width, suffix=re.match(r"^(.*)\$Number%0(\d+)d\$(.*)$", media).groups()
+        start=int(template.get("startNumber", 1))
+        count=sum(int(entry.get("r", 0))+1 for entry in template.iter("S"))
+        urls=["{}{:0{}d}{}".format(prefix, start+i, int(width), suffix) for i in range(count)]
+        representations.append((int(representation.get("bandwidth", 0)), urls))
+    representations.sort(key=lambda representation: representation[0])
+    return [[urls[i] for _, urls in representations if i < len(urls)] for i in range(max(len(urls) for _, urls in representations))]
+
+def parse_mpd(content):
+    """Return the segment URLs of every period, ordered by bandwidth
+
+    :param content: The MPD
+    :return: A list with a list of segment URLs per period
+    """
+    root=ET.fromstring(content)
+    if root.find(".//SegmentTemplate") is not None:
+        return parse_compact_mpd(root)
+    periods=[]
+    for period in root.findall("Period"):
+        representations=[]
+        for representation in period.iter("Representation"):
+            url=representation.find("BaseURL")
+            if url is not None and url.text:
+                representations.append((int(representation.get("bandwidth", 0)), url.text))
+        representations.sort()
+        periods.append([url for _, url in representations])
+    return periods
+
+class PlayerUser(HttpUser):
+    """A DASH player fetching one segment per frame at the frame rate
+
+    The player starts with a random representation of a random media and
+    occasionally switches the representation or seeks to a random period.
+    Segment requests are grouped by media in the statistics.
+    """
+    def wait_time(self):
+        return constant_pacing(1/self.environment.parsed_options.fps)(self)
+
+    def on_start(self):
+        options=self.environment.parsed_options
+        names=[name for name in options.media.split(",") if name]
+        if not names:
+            raise ValueError("No media given, pass their names with --media")
+        self.media=random.choice(names)
+        response=self.client.get("/media/{}".format(self.media), name="/media/[mpd]")
+        self.periods=parse_mpd(response.content)
+        self.period=0
+        self.quality=random.randrange(len(self.periods[0]))
+
+    @task
+    def play(self):
+        options=self.environment.parsed_options
+        if random.random() < options.seekProbability:
+            self.period=random.randrange(len(self.periods))
+        if random.random() < options.switchProbability:
+            self.quality=random.randrange(len(self.periods[self.period]))
+
+        representations=self.periods[self.period]
+        url=representations[min(self.quality, len(representations)-1)]
+        self.client.get("/media/{}/{}".format(self.media, url), name="/media/{}/[segment]".format(self.media))
+        self.period=(self.period+1)%len(self.periods)
@@ -6,8 +6,12 @@ import logging.config
 
 from pointcloudserver.persistence.configuration import Configuration
 import pointcloudserver.commands.dash as dash
+import pointcloudserver.commands.encode as encode
 import pointcloudserver.commands.socket as socket
 import pointcloudserver.commands.mpd as mpd
+import pointcloudserver.commands.pack as pack
+import pointcloudserver.commands.play as play
+import pointcloudserver.commands.preload as preload
 
 def setup_logging(verbose):
     """Setup logging
@@ -30,7 +34,7 @@ def main() -> None:
     ap_common = argparse.ArgumentParser(add_help=False)
     ap_common.add_argument("--verbose", default=False, action="store_true", help="Run the command with verbose logging enabled")
     ap_common.add_argument("--config", metavar="FILE", type=str, default=None, required=False, help="Path to a configuration file")
-    ap_common.add_argument("--cache", metavar="CACHE", choices={"internal", "redis"}, default="internal", type=str, required=False, help="Cache backend to use")
+    ap_common.add_argument("--cache", metavar="CACHE", choices={"internal", "redis", "tiered", "none"}, default=None, type=str, required=False, help="Cache backend to use instead of the configured one")
 
     ap_main = argparse.ArgumentParser(description="pointcloudserver - A point cloud streaming server", add_help=True)
     sp = ap_main.add_subparsers(help="Commands")
@@ -40,37 +44,92 @@ def main() -> None:
     sp_edit.add_argument("--host", metavar="ADDRESS", default="127.0.0.1", type=str, required=False, help="Address to serve at")
     sp_edit.add_argument("--port", metavar="PORT", default=8080, type=int, required=False, help="Port to listen for incoming connections")
     sp_edit.add_argument("--mediaDir", metavar="DIR", type=str, required=True, help="Directory where media can be found")
+    sp_edit.add_argument("--workers", metavar="N", default=1, type=int, required=False, help="Number of worker processes sharing the internal cache")
     sp_edit.set_defaults(which="dash")
 
     sp_render = sp.add_parser("socket", parents=[ap_common], add_help=True)
     sp_render.add_argument("--host", metavar="ADDRESS", default="0.0.0.0", type=str, required=False, help="Address to serve at")
     sp_render.add_argument("--port", metavar="PORT", default=5000, type=int, required=False, help="Port to listen for incoming connections")
+    sp_render.add_argument("--fps", metavar="N", default=30, type=int, required=False, help="Frame rate of pushed frames")
+    sp_render.add_argument("--maxBuffer", metavar="KB", default=1024, type=int, required=False, help="kB waiting to be sent to a pushed client before frames are dropped")
+    sp_render.add_argument("--points", metavar="N", default=10000, type=int, required=False, help="Number of points of every frame")
+    sp_render.add_argument("--shape", metavar="SHAPE", choices=["cube", "sphere", "ball"], default="cube", type=str, required=False, help="Shape of the streamed point cloud")
+    sp_render.add_argument("--seed", metavar="N", default=0, type=int, required=False, help="Seed of the points and colors of the point cloud")
+    sp_render.add_argument("--sequence", metavar="FILE", type=str, required=False, help="Frames encoded with the encode command to stream instead of a synthetic point cloud")
+    sp_render.add_argument("--loop", action="store_true", required=False, help="Start over after the last frame of the sequence")
     sp_render.set_defaults(which="socket")
 
+    sp_preload = sp.add_parser("preload", parents=[ap_common], add_help=True)
+    sp_preload.add_argument("--mediaDir", metavar="DIR", type=str, required=True, help="Directory where media can be found, exactly as passed to the DASH server")
+    sp_preload.add_argument("--budget", metavar="MB", type=float, required=False, help="Maximum number of MB to load")
+    sp_preload.add_argument("--periods", metavar="N", default=0, type=int, required=False, help="Number of periods to load per media, 0 for all")
+    sp_preload.add_argument("--batchSize", metavar="N", default=64, type=int, required=False, help="Number of segments written to redis in one pipeline")
+    sp_preload.add_argument("media", metavar="NAME", nargs="*", help="Names of the media to load, all if omitted")
+    sp_preload.set_defaults(which="preload")
+
+    sp_play = sp.add_parser("play", parents=[ap_common], add_help=True)
+    sp_play.add_argument("--url", metavar="URL", type=str, required=True, help="URL of the MPD to play")
+    sp_play.add_argument("--players", metavar="N", default=1, type=int, required=False, help="Number of concurrent players")
+    sp_play.add_argument("--policy", metavar="POLICY", choices={"lowest", "highest", "available"}, default="available", type=str, required=False, help="Adaptation policy of the players")
+    sp_play.add_argument("--trace", metavar="FILE", type=str, required=False, help="Bandwidth trace with lines of seconds and Mbit/s emulated per player")
+    sp_play.add_argument("--bandwidth", metavar="MBITS", type=float, required=False, help="Constant bandwidth in Mbit/s emulated per player if no trace is given")
+    sp_play.add_argument("--bufferDuration", metavar="MS", default=3000, type=int, required=False, help="Maximum duration of media buffered ahead")
+    sp_play.add_argument("--timeslots", metavar="N", type=int, required=False, help="Number of timeslots to play, all if omitted")
+    sp_play.add_argument("--loop", action="store_true", required=False, help="Start over after the last timeslot")
+    sp_play.add_argument("--timeout", metavar="SECONDS", default=30, type=float, required=False, help="Timeout of requests")
+    sp_play.add_argument("--outputFile", metavar="FILE", type=str, required=False, help="Save the reports of all players as JSON instead of printing a summary")
+    sp_play.set_defaults(which="play")
+
     sp_mpd = sp.add_parser("mpd", parents=[ap_common], add_help=True)
     sp_mpd.add_argument('--pretty', action='store_true', required=False, help='Print pretty formated xml instead of a single line')
     sp_mpd.add_argument('--outputFile', metavar='FILE', required=False, help='Save to a file instead of printing to command line')
     sp_mpd.add_argument('--framesPerSecond', metavar='FPS', required=False, help='Frames per second to calculate start and end time of periods')
+    sp_mpd.add_argument('--batchSize', metavar='N', type=int, required=False, help='Advertise batch requests of up to N segments')
+    sp_mpd.add_argument('--compact', action='store_true', required=False, help='Describe every quality once with a segment template instead of a period per frame')
+    sp_mpd.add_argument('--manifest', metavar='FILE', required=False, help='Keep the files of the media in FILE, so later runs only rescan changed folders')
+    sp_mpd.add_argument('--watch', metavar='SECONDS', type=float, required=False, help='Keep running and update the output file whenever frames are added, checking every SECONDS seconds')
+    sp_mpd.add_argument('--ioWorkers', metavar='N', type=int, default=8, help='Number of threads reading the file sizes')
     sp_mpd.add_argument('--baseUrl', metavar='URL', required=True, help='Base URL of the media on the webserver')
     sp_mpd.add_argument('mediaDir', metavar='FOLDER', nargs=1, help='Path to the media folder root')
     sp_mpd.set_defaults(which="mpd")
 
+    sp_pack = sp.add_parser("pack", parents=[ap_common], add_help=True)
+    sp_pack.add_argument('--unpack', action='store_true', required=False, help='Unpack all containers of the media into folders again')
+    sp_pack.add_argument('--remove', action='store_true', required=False, help='Remove the folders after packing or the containers after unpacking, once their segments were checked against each other')
+    sp_pack.add_argument('mediaDir', metavar='FOLDER', nargs=1, help='Path to the media folder')
+    sp_pack.set_defaults(which="pack")
+
+    sp_encode = sp.add_parser("encode", parents=[ap_common], add_help=True)
+    sp_encode.add_argument("--outputFile", metavar="FILE", type=str, required=True, help="Path of the file with the encoded frames")
+    sp_encode.add_argument("--scale", metavar="FACTOR", default=1.0, type=float, required=False, help="Factor converting coordinates to the 16 bit integers of the socket protocol")
+    sp_encode.add_argument("sequenceDir", metavar="FOLDER", nargs=1, help="Path to a folder with a PLY, DRC or Velodyne bin file per frame")
+    sp_encode.set_defaults(which="encode")
+
     args=ap_main.parse_args()
 
     setup_logging(args.verbose)
 
     config = Configuration()
     if args.config:
-        config.load("configuration.yaml")
+        config.load(args.config)
     config = config.config
 
-    
+    if args.cache:
+        config['cache']['use'] = args.cache
 
     if args.which == "dash":
-        dash.run(args.host, args.port, args.mediaDir, config)
+        dash.run(args.host, args.port, args.mediaDir, config, workers=args.workers)
     elif args.which == "socket":
-        socket.run(args.host, args.port)
+        socket.run(args.host, args.port, fps=args.fps, max_buffer=args.maxBuffer*1024, num_points=args.points, shape=args.shape, seed=args.seed, sequence=args.sequence, loop=args.loop)
+    elif args.which == "preload":
+        preload.run(args, config)
+    elif args.which == "play":
+        play.run(args)
     elif args.which == "mpd":
         mpd.run(args)
+    elif args.which == "pack":
+        pack.run(args)
+    elif args.which == "encode":
+        encode.run(args)
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,28 +1,33 @@
 import logging
 
-import redis
-
-from pointcloudserver.transfer.buffer import Buffer
+from pointcloudserver.transfer.cache import CacheFactory
 from pointcloudserver.transfer.dash_server import DASHServer
 
-def run(host: str, port: int, media_path: str, config: dict) -> None:
-    cache = None
-    if config['cache']['use'] == 'internal':
-        logging.info(f"Setting up internal cache") 
-        cache = Buffer(logger=logging.getLogger('root'), max_size=config['cache']['internal']['buffer_size'])
-    elif config['cache']['use'] == 'redis':
-        logging.info(f"Setting up redis cache") 
-        cache = redis.Redis(host=config['cache']['redis']['host'], port=config['cache']['redis']['port'], db=0)
-    else:
-        logging.info(f"Setting up no cache") 
+def run(host: str, port: int, media_path: str, config: dict, workers: int = 1) -> None:
+    cache = CacheFactory(logger=logging.getLogger('root')).create_from_config(config['cache'], workers=workers)
 
     logging.info("Setting up DASH server")
     server=DASHServer(
         host=host,
         port=port,
         media_path=media_path,
-        cache=cache
+        cache=cache,
+        delivery=config['dash']['delivery'],
+        io_workers=config['dash']['io_workers'],
+        prefetch_segments=config['dash']['prefetch']['segments'],
+        prefetch_headroom=config['dash']['prefetch']['headroom'],
+        warmup_periods=config['dash']['warmup']['periods'],
+        warmup_budget=config['dash']['warmup']['budget'],
+        max_age=config['dash']['caching']['max_age'],
+        immutable=config['dash']['caching']['immutable'],
+        stat_entries=config['dash']['caching']['stat_entries'],
+        batch_size=config['dash']['batch_size'],
+        metrics=config['dash']['metrics'],
+        tracing=config['dash']['tracing']['enabled'],
+        max_traces=config['dash']['tracing']['traces'],
+        admin=config['dash']['admin']['enabled'],
+        max_profile_seconds=config['dash']['admin']['max_profile_seconds']
     ) 
 
     logging.info("Starting DASH server")
-    server.start()
\ No newline at end of file
+    server.start(workers=workers)
\ No newline at end of file
@@ -0,0 +1,12 @@
+import logging
+import os
+from argparse import Namespace
+
+from pointcloudserver.transfer.sequence import encode_sequence
+
+def run(args: Namespace) -> None:
+    directory=args.sequenceDir[0]
+    path=args.outputFile
+    logging.info("Encoding the frames of {}".format(directory))
+    count=encode_sequence(directory, path, scale=args.scale)
+    logging.info("Encoded {} frames into {} ({} MB)".format(count, path, round(os.path.getsize(path)/1024/1024, 2)))
@@ -1,33 +1,56 @@
-import xml.etree.ElementTree as ET
+import logging
+import sys
+import time as T
 from argparse import Namespace
 
-from pointcloudserver.dash.mpd import build_multiple_object_mpd, build_single_object_mpd, get_depth, save_xml, serialize_xml
+from pointcloudserver.dash.manifest import MediaManifest
+from pointcloudserver.dash.mpd import index_representations, index_segments, replace_file, write_compact_mpd, write_mpd
 
 def run(args: Namespace):
     media_dir=args.mediaDir[0]
-    pretty=args.pretty
-    base_url=args.baseUrl
     output_file=args.outputFile
     fps=None
     if args.framesPerSecond is not None:
         fps=int(args.framesPerSecond)
-    mpd_type="static"
-
-    mpd = ET.Element("MPD")
-    mpd.set("type", mpd_type)
-    mpd.set("minBufferTime", str(1.0/float(fps)))
-
-    mpd_url = ET.SubElement(mpd, "BaseURL")
-    mpd_url.text = base_url
-
-    depth = get_depth(media_dir)
-    if depth == 2:
-        mpd = build_single_object_mpd(mpd, media_dir, fps)
-    elif depth == 3:
-        mpd = build_multiple_object_mpd(mpd, media_dir, fps)
-    mediaPresentationDuration = len(mpd.findall("Period")) * (1/fps)
-    mpd.set("mediaPresentationDuration", str(mediaPresentationDuration))
+    if args.watch is not None and output_file is None:
+        raise ValueError("Watching a media folder needs an output file")
+
+    # Without a file the manifest only lives as long as the command, e.g. while watching
+    manifest=MediaManifest()
+    if args.manifest is not None:
+        manifest=MediaManifest.load(args.manifest)
+
+    while True:
+        try:
+            update(args, manifest, media_dir, output_file, fps)
+        except Exception as e:
+            if args.watch is None:
+                raise
+            # A scan may fail while an encoder writes the media, the next one runs as usual
+            logging.error("Updating {} failed: {}".format(output_file, e))
+
+        if args.watch is None:
+            break
+        T.sleep(args.watch)
+
+def update(args: Namespace, manifest: MediaManifest, media_dir: str, output_file: str, fps: int) -> None:
+    changed, removed=manifest.update(media_dir, io_workers=args.ioWorkers)
+    if args.manifest is not None:
+        manifest.save(args.manifest)
+    logging.debug("Rescanned {} and removed {} folders".format(len(changed), len(removed)))
+
+    segments=manifest.get_segments()
+    if args.compact:
+        media=index_representations(segments)
+        write=write_compact_mpd
+    else:
+        media=index_segments(segments)
+        write=write_mpd
+
     if output_file is not None:
-        save_xml(mpd, output_file, pretty=pretty)
+        if replace_file(output_file, lambda f: write(f, media, args.baseUrl, fps=fps, batch_size=args.batchSize, pretty=args.pretty)):
+            logging.info("Wrote {}, {} folders changed and {} were removed".format(output_file, len(changed), len(removed)))
     else:
-        print(serialize_xml(mpd, pretty=pretty))
+        write(sys.stdout, media, args.baseUrl, fps=fps, batch_size=args.batchSize, pretty=args.pretty)
+        if not args.pretty:
+            sys.stdout.write("\n")
@@ -0,0 +1,46 @@
+import logging
+import os
+import shutil
+from argparse import Namespace
+
+from pointcloudserver.transfer.pack import EXTENSION, pack, unpack, verify
+
+def find_representations(media_dir: str) -> list:
+    """Return the folders below a media folder that only contain files
+
+    :param media_dir: The media folder
+    :return: The paths of the representation folders
+    """
+    representations=[]
+    for directory, folders, files in os.walk(media_dir):
+        folders.sort()
+        if directory != media_dir and not folders and files:
+            representations.append(directory)
+    return representations
+
+def find_containers(media_dir: str) -> list:
+    containers=[]
+    for directory, folders, files in os.walk(media_dir):
+        folders.sort()
+        containers+=[os.path.join(directory, file) for file in sorted(files) if file.endswith(EXTENSION)]
+    return containers
+
+def run(args: Namespace) -> None:
+    media_dir=args.mediaDir[0]
+    if args.unpack:
+        for path in find_containers(media_dir):
+            directory=path[:-len(EXTENSION)]
+            count=unpack(path, directory)
+            if args.remove:
+                verify(path, directory)
+                os.remove(path)
+            logging.info("Unpacked {} segments into {}".format(count, directory))
+        return
+
+    for directory in find_representations(media_dir):
+        path=directory+EXTENSION
+        count=pack(directory, path)
+        if args.remove:
+            verify(path, directory)
+            shutil.rmtree(directory)
+        logging.info("Packed {} segments into {} ({} MB)".format(count, path, round(os.path.getsize(path)/1024/1024, 2)))
@@ -0,0 +1,50 @@
+import asyncio
+import json
+import logging
+import random
+from argparse import Namespace
+
+import httpx
+
+from pointcloudserver.dash.player import Player, summarize
+from pointcloudserver.dash.throughput import BandwidthTrace, TokenBucket
+
+async def play(args: Namespace) -> dict:
+    trace = None
+    if args.trace is not None:
+        trace = BandwidthTrace.load(args.trace)
+    elif args.bandwidth is not None:
+        trace = BandwidthTrace.constant(args.bandwidth*1000*1000/8)
+
+    limits = httpx.Limits(max_connections=args.players, max_keepalive_connections=args.players)
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        players = []
+        for i in range(args.players):
+            bucket = None
+            if trace is not None:
+                # Players start at different points of the trace, so they do not move in lockstep
+                bucket = TokenBucket(trace, offset=random.uniform(0, trace.duration) if args.players > 1 else 0.0)
+            players.append(Player(
+                client,
+                args.url,
+                policy=args.policy,
+                bucket=bucket,
+                max_buffer=args.bufferDuration,
+                timeslots=args.timeslots,
+                loop=args.loop
+            ))
+
+        logging.info(f"Starting {len(players)} players with {args.policy} policy")
+        reports = await asyncio.gather(*[player.run() for player in players])
+    return {"summary": summarize(reports), "players": reports}
+
+def run(args: Namespace) -> None:
+    # Every request would be logged otherwise
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    result = asyncio.run(play(args))
+    logging.info("Summary {}".format(json.dumps(result["summary"])))
+    if args.outputFile:
+        with open(args.outputFile, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result["summary"], indent=2))
@@ -0,0 +1,27 @@
+import asyncio
+import logging
+from argparse import Namespace
+
+from pointcloudserver.transfer.cache import CacheFactory
+from pointcloudserver.transfer.preloader import Preloader
+
+def run(args: Namespace, config: dict) -> None:
+    logging.info("Setting up redis cache")
+    cache = CacheFactory(logger=logging.getLogger('root')).create("redis", config['cache'])
+
+    budget = 0
+    if args.budget is not None:
+        budget = int(args.budget*1024*1024)
+
+    preloader = Preloader(
+        cache=cache,
+        media_path=args.mediaDir,
+        periods=args.periods,
+        budget=budget,
+        batch_size=args.batchSize,
+        io_workers=config['dash']['io_workers'],
+        logger=logging.getLogger('root')
+    )
+
+    logging.info("Starting preload")
+    asyncio.run(preloader.run(args.media or None))
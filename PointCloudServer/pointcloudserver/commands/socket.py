@@ -1,12 +1,22 @@
 import logging
 
+from pointcloudserver.transfer.sequence import RecordedSequence
 from pointcloudserver.transfer.socket_server import SocketServer
 
-def run(host: str, port: int) -> None:
+def run(host: str, port: int, fps: int = 30, max_buffer: int = 1024*1024, num_points: int = 10000, shape: str = "cube", seed: int = 0, sequence: str = None, loop: bool = False) -> None:
     logging.info("Setting up socket server")
+    if sequence is not None:
+        sequence=RecordedSequence(sequence, fps=fps, loop=loop)
+        logging.info("Streaming {} frames of a recorded sequence".format(len(sequence)))
     server = SocketServer(
         host=host,
-        port=port
+        port=port,
+        fps=fps,
+        max_buffer=max_buffer,
+        num_points=num_points,
+        shape=shape,
+        seed=seed,
+        sequence=sequence
     )
     
     logging.info("Starting socket server")
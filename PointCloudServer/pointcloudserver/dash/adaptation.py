@@ -0,0 +1,78 @@
+class BandwidthMeter:
+    """Measures the bandwidth of the last download like the Unity client"""
+    def __init__(self):
+        self.bandwidth=0.0 # in bytes/second
+
+    def measure(self, size, seconds):
+        """Update the bandwidth from a finished download
+
+        :param size: The number of bytes received
+        :param seconds: The duration of the download
+        """
+        if seconds > 0:
+            self.bandwidth=size/seconds
+
+class AdaptationPolicy:
+    """Selects the representations of the timeslots in a window
+
+    The policies follow the adaptation policies of the Unity client. The
+    first timeslot of the window is the one currently played.
+    """
+    def adapt(self, window):
+        raise NotImplementedError
+
+    def select(self, timeslot, selections):
+        # Buffered timeslots keep their selection, the emulated player does not download them again
+        if not timeslot.buffered:
+            timeslot.selections=selections
+
+class LowestBandwidthPolicy(AdaptationPolicy):
+    """Always choose the representation with the lowest bandwidth"""
+    def adapt(self, window):
+        for timeslot in window:
+            self.select(timeslot, [min(alternatives, key=lambda r: r.bandwidth) for alternatives in timeslot.alternatives])
+
+class HighestBandwidthPolicy(AdaptationPolicy):
+    """Always choose the representation with the highest bandwidth"""
+    def adapt(self, window):
+        for timeslot in window:
+            self.select(timeslot, [max(alternatives, key=lambda r: r.bandwidth) for alternatives in timeslot.alternatives])
+
+class AvailableBandwidthPolicy(AdaptationPolicy):
+    """Choose the representation with the highest bandwidth below the measured bandwidth
+
+    If no representation fits, the first one is chosen.
+    """
+    def __init__(self, meter):
+        self.meter=meter
+
+    def adapt(self, window):
+        available=self.meter.bandwidth
+        for timeslot in window[1:]:
+            selections=[]
+            for alternatives in timeslot.alternatives:
+                selection=alternatives[0]
+                for alternative in alternatives:
+                    if alternative.bandwidth > selection.bandwidth and alternative.bandwidth < available:
+                        selection=alternative
+                selections.append(selection)
+            self.select(timeslot, selections)
+
+POLICIES={
+    "lowest": LowestBandwidthPolicy,
+    "highest": HighestBandwidthPolicy,
+    "available": AvailableBandwidthPolicy,
+}
+
+def create_policy(name: str, meter: BandwidthMeter) -> AdaptationPolicy:
+    """Create an adaptation policy by name
+
+    :param name: One of lowest, highest, available
+    :param meter: The bandwidth meter of the player
+    :return: The policy
+    """
+    if name == "available":
+        return AvailableBandwidthPolicy(meter)
+    if name in POLICIES:
+        return POLICIES[name]()
+    raise ValueError("Unknown adaptation policy \"{}\"".format(name))
@@ -0,0 +1,158 @@
+import json
+import os
+import time as T
+
+from pointcloudserver.dash.mpd import infer_mime_type, is_packed, replace_file, scan_directory, skip_packed_folders, stat_files
+from pointcloudserver.transfer.pack import EXTENSION as PACK_EXTENSION, load_index
+
+MANIFEST_VERSION=2
+RACY_NANOSECONDS=2*1000*1000*1000 # Folders modified this recently may still change within the same timestamp
+
+class MediaManifest:
+    """The files of every representation folder of a media
+
+    The manifest lists the name, size and modification time of every frame
+    per folder together with the modification time of the folder. It is
+    persisted between runs of `pointcloudserver mpd`, so only folders whose
+    modification time changed are listed and statted again. Adding,
+    removing or renaming frames changes the modification time of their
+    folder, which includes encoders writing to a temporary file and
+    renaming it. Frames written in place do not change their folder, so the
+    last frame of every folder and frames modified within the last seconds
+    are statted on every update as well. Files that are no segments, e.g.
+    temporary files of encoders, are skipped. Packed representations are
+    read from the index of their container whenever the container changed.
+    """
+    def __init__(self, folders=None):
+        """
+        :param folders: The folders by their path relative to the media folder
+        """
+        self.folders=folders if folders is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        """Load a manifest saved with `save`
+
+        :param path: The path of the manifest
+        :return: The manifest, an empty one if the file does not exist or was written by another version
+        """
+        try:
+            with open(path) as f:
+                data=json.load(f)
+        except (FileNotFoundError, ValueError):
+            return cls()
+        if data.get("version") != MANIFEST_VERSION:
+            return cls()
+        return cls(data["folders"])
+
+    def save(self, path):
+        content=json.dumps({"version": MANIFEST_VERSION, "folders": self.folders})
+        replace_file(path, lambda f: f.write(content))
+
+    def find_folders(self, media_path):
+        """Find the representation folders of a media
+
+        Folders known from the last update are not listed, unless they hold
+        objects with their qualities.
+
+        :param media_path: The media folder
+        :return: A list of tuples of the relative path of every folder as used in URLs, its path and its entries if they were listed already
+        """
+        objects={folder.split("/")[0] for folder in self.folders if "/" in folder}
+        folders=[]
+        for entry in skip_packed_folders(scan_directory(media_path)):
+            if is_packed(entry):
+                folders.append((entry.name[:-len(PACK_EXTENSION)], entry.path, None))
+                continue
+            if not entry.is_dir():
+                continue
+            if entry.name in self.folders and entry.name not in objects:
+                folders.append((entry.name, entry.path, None))
+                continue
+            children=scan_directory(entry.path)
+            if entry.name in objects or any(child.is_dir() or is_packed(child) for child in children):
+                for child in skip_packed_folders(children):
+                    if child.is_dir():
+                        folders.append((entry.name+"/"+child.name, child.path, None))
+                    elif is_packed(child):
+                        folders.append((entry.name+"/"+child.name[:-len(PACK_EXTENSION)], child.path, None))
+            else:
+                folders.append((entry.name, entry.path, children))
+        return folders
+
+    def update(self, media_path, io_workers=1):
+        """Rescan the folders of a media that changed since the last update
+
+        :param media_path: The media folder
+        :param io_workers: The number of threads used to stat the frames
+        :return: A tuple of the lists of new or changed folders and of removed folders
+        """
+        folders={}
+        changed=[]
+        for folder, path, entries in self.find_folders(media_path):
+            mtime=os.stat(path).st_mtime_ns
+            known=self.folders.get(folder)
+            if known is not None and known["mtime"] is not None and known["mtime"] == mtime:
+                files=known["files"]
+                if not path.endswith(PACK_EXTENSION):
+                    files=self.restat_growing(path, files)
+                if files != known["files"]:
+                    changed.append(folder)
+                folders[folder]={"mtime": mtime, "files": files}
+                continue
+
+            if path.endswith(PACK_EXTENSION):
+                files=[[name, size, mtime] for name, _, size in load_index(path) if infer_mime_type(name) is not None]
+            else:
+                if entries is None:
+                    entries=scan_directory(path)
+                frames=[entry for entry in entries if entry.is_file() and infer_mime_type(entry.name) is not None]
+                results=stat_files([frame.path for frame in frames], io_workers)
+                files=[[frame.name, result.st_size, result.st_mtime_ns] for frame, result in zip(frames, results)]
+            # Changes within the resolution of the timestamp would go unnoticed, recent folders are checked again
+            if T.time_ns()-mtime < RACY_NANOSECONDS:
+                mtime=None
+            if known is None or known["files"] != files:
+                changed.append(folder)
+            folders[folder]={"mtime": mtime, "files": files}
+
+        removed=[folder for folder in self.folders if folder not in folders]
+        self.folders=folders
+        return changed, removed
+
+    def restat_growing(self, path, files):
+        """Stat the frames of an unchanged folder that may still be written in place
+
+        :param path: The folder
+        :param files: The known files of the folder
+        :return: The files with the current sizes and modification times, the same list if nothing changed
+        """
+        now=T.time_ns()
+        recent=[i for i, (_, _, mtime) in enumerate(files) if now-mtime < RACY_NANOSECONDS]
+        if files and len(files)-1 not in recent:
+            recent.append(len(files)-1)
+
+        updated=None
+        for i in recent:
+            name, size, mtime=files[i]
+            result=os.stat(os.path.join(path, name))
+            if result.st_size != size or result.st_mtime_ns != mtime:
+                if updated is None:
+                    updated=list(files)
+                updated[i]=[name, result.st_size, result.st_mtime_ns]
+        return updated if updated is not None else files
+
+    def get_segments(self):
+        """Return the segments of all folders
+
+        :return: A list of tuples of the period index, the adaptation set id, the relative URL and the size of every segment, like `stat_segments`
+        """
+        multiple=any("/" in folder for folder in self.folders)
+        segments=[]
+        for folder in sorted(self.folders, key=lambda folder: folder.split("/")):
+            if ("/" in folder) != multiple:
+                continue
+            object=folder.split("/")[0]
+            for index, (name, size, _) in enumerate(self.folders[folder]["files"]):
+                segments.append((index, object if multiple else str(index), folder+"/"+name, size))
+        return segments
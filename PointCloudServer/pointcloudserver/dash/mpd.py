@@ -1,32 +1,151 @@
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+import filecmp
 import os
+import re
 import uuid
 
-def save_xml(root, path, pretty=False):
-    with open(path, "w") as f:
-        f.write(serialize_xml(root, pretty=pretty))
+from pointcloudserver.transfer.pack import EXTENSION as PACK_EXTENSION, load_index
 
-def serialize_xml(root, pretty=False):
-    if pretty:
-        return minidom.parseString(ET.tostring(root)).toprettyxml(indent="  ")
+def replace_file(path, write):
+    """Write a file through a temporary file, which replaces it unless the content is the same
+
+    Readers never see a partially written file and unchanged files keep
+    their modification time, so caches of them stay valid.
+
+    :param path: The path of the file
+    :param write: A function writing the content to a text file
+    :return: `True` if the file was replaced, `False` if it already had the content
+    """
+    directory, name=os.path.split(os.path.abspath(path))
+    temporary_path=os.path.join(directory, "."+name+".tmp")
+    try:
+        with open(temporary_path, "w") as f:
+            write(f)
+        if os.path.isfile(path) and filecmp.cmp(temporary_path, path, shallow=False):
+            os.remove(temporary_path)
+            return False
+        os.replace(temporary_path, path)
+        return True
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+BATCH_SCHEME="urn:streamingkom:batch"
+
+def get_period_segments(root, periods=None):
+    """Return the segment URLs of all representations per period
+
+    Compact MPDs are expanded, so every segment number is a period.
+
+    :param root: The root element of a MPD
+    :param periods: The number of periods to include, all if `None`
+    :return: A list with a list of tuples of the relative segment URL and its size in bytes per period
+    """
+    if is_compact(root):
+        return [[(url, size) for representations in adaptation_sets for _, url, _, size in representations] for _, _, adaptation_sets in get_compact_timeslots(root)[:periods]]
+    segments=[]
+    for period in root.findall("Period")[:periods]:
+        urls=[]
+        for representation in period.iter("Representation"):
+            url=representation.find("BaseURL")
+            if url is None or not url.text:
+                continue
+            urls.append((url.text, int(representation.get("size", 0))))
+        segments.append(urls)
+    return segments
+
+def get_representation_urls(root, periods=None):
+    """Return the segment URLs of all representations in the order of their periods
+
+    :param root: The root element of a MPD
+    :param periods: The number of periods to include, all if `None`
+    :return: A list of tuples of the relative segment URL and its size in bytes
+    """
+    return [url for urls in get_period_segments(root, periods) for url in urls]
+
+SEGMENT_SIZES_SCHEME="urn:streamingkom:segment-sizes"
+TEMPLATE_PATTERN=re.compile(r"\$(Number|RepresentationID|)(%0\d+d)?\$")
+
+def is_compact(root):
+    """Return whether a MPD describes its segments with templates instead of a period per frame"""
+    return root.find("Period/AdaptationSet/SegmentTemplate") is not None or root.find("Period/AdaptationSet/Representation/SegmentTemplate") is not None
+
+def format_template(template, representation_id, number):
+    def replace(match):
+        if match.group(1) == "Number":
+            return (match.group(2) or "%d") % number
+        if match.group(1) == "RepresentationID":
+            return representation_id
+        return "$"
+    return TEMPLATE_PATTERN.sub(replace, template)
+
+def get_template_segments(adaptation_set, representation):
+    """Expand the SegmentTemplate of a representation
+
+    :return: A list of tuples of the start and end in seconds, the URL and the size in bytes of every segment
+    """
+    template=representation.find("SegmentTemplate")
+    if template is None:
+        template=adaptation_set.find("SegmentTemplate")
+    timescale=int(template.get("timescale", 1))
+    number=int(template.get("startNumber", 1))
+    sizes=[]
+    for property in representation.findall("SupplementalProperty"):
+        if property.get("schemeIdUri") == SEGMENT_SIZES_SCHEME:
+            sizes=[int(size) for size in property.get("value", "").split()]
+
+    times=[]
+    timeline=template.find("SegmentTimeline")
+    if timeline is not None:
+        time=0
+        for entry in timeline.findall("S"):
+            time=int(entry.get("t", time))
+            duration=int(entry.get("d"))
+            for _ in range(int(entry.get("r", 0))+1):
+                times.append((time, time+duration))
+                time+=duration
     else:
-        return ET.tostring(root, encoding='unicode', method='xml')
+        duration=int(template.get("duration", 1))
+        times=[(i*duration, (i+1)*duration) for i in range(len(sizes))]
 
-def get_id(root, tag, id):
-    for child in root:
-        if child.tag is tag:
-            if child.attrib["id"] == str(id):
-                return child
-    return None
+    id=representation.get("id", "")
+    segments=[]
+    for i, (start, end) in enumerate(times):
+        size=sizes[i] if i < len(sizes) else 0
+        segments.append((start/timescale, end/timescale, format_template(template.get("media"), id, number+i), size))
+    return segments
 
-def get_depth(path, depth=0):
-    if not os.path.isdir(path): return depth
-    max_depth=depth
-    for entry in os.listdir(path):
-        full_path = os.path.join(path, entry)
-        max_depth = max(max_depth, get_depth(full_path, depth+1))
-    return max_depth
+def get_compact_timeslots(root):
+    """Expand a compact MPD into one timeslot per segment number
+
+    The segments of all representations with the same position in their
+    timeline form a timeslot, like the periods of a MPD with a period per
+    frame. The bandwidth of a segment is its size divided by its duration.
+
+    :param root: The root element of a MPD written with `write_compact_mpd`
+    :return: A list of tuples of start and end in seconds and a list with a list of tuples of representation id, URL, bandwidth and size per adaptation set
+    """
+    timeslots=[]
+    offset=0.0
+    # Periods follow each other, the timelines start at their period
+    for period in root.findall("Period"):
+        adaptation_sets=period.findall("AdaptationSet")
+        slots=[]
+        end=offset
+        for set_index, adaptation_set in enumerate(adaptation_sets):
+            for representation in adaptation_set.findall("Representation"):
+                for index, (start, stop, url, size) in enumerate(get_template_segments(adaptation_set, representation)):
+                    if index == len(slots):
+                        slots.append((offset+start, offset+stop, [[] for _ in adaptation_sets]))
+                    bandwidth=int(size/(stop-start)) if stop > start else size
+                    slots[index][2][set_index].append((representation.get("id"), url, bandwidth, size))
+                    end=max(end, offset+stop)
+        for start, stop, representations in slots:
+            timeslots.append((start, stop, [segments for segments in representations if segments]))
+        offset=end
+    return timeslots
 
 def infer_mime_type(path: str) -> str:
     """Infer and return the MIME-Type of the given file
@@ -61,93 +180,326 @@ def infer_mime_type(path: str) -> str:
 
 
     return None
-                
-def build_single_object_mpd(mpd, path, fps):
-    entries=os.listdir(path)
-    for entry in entries:
-        entry_path=os.path.join(path, entry)
-        if os.path.isdir(entry_path):
-            sub_entries=os.listdir(entry_path)
-            period_counter=0
-            for sub_entry in sub_entries:
-                sub_entry_path=os.path.join(entry_path, sub_entry)
-                period=get_id(mpd, "Period", period_counter)
-                adapation_set=None
-                if period is None:
-                    period=ET.SubElement(mpd, "Period")
-                    period.set("id", str(period_counter))
-                    if fps is not None:
-                        frame_time=1/fps
-                        start=period_counter/fps
-                        end=start+frame_time
-                        period.set("start", "PT"+str(start)+"S")
-                        period.set("end", "PT"+str(end)+"S")
-                        period.set("duration", "PT"+str(frame_time)+"S")
-
-                    adapation_set=ET.SubElement(period, "AdaptationSet")
-                    mime_type = infer_mime_type(sub_entry_path)
-                    if mime_type is not None:
-                        adapation_set.set("mimeType",mime_type)
-                    adapation_set.set("id", str(period_counter))
-                else:
-                    adapation_set=period.find("AdaptationSet")
-
-                id        = str(uuid.uuid4())
-                size      = os.path.getsize(os.path.join(path, entry, sub_entry))
-                bandwidth = size * int(fps)
-
-                representation=ET.SubElement(adapation_set, "Representation")
-                representation.set("id", str(id))
-                representation.set("size", str(size))
-                representation.set("bandwidth", str(bandwidth))
-
-                representation_url=ET.SubElement(representation, "BaseURL")
-                representation_url.text=entry+"/"+sub_entry
-                period_counter+=1
-    return mpd
-
-def build_multiple_object_mpd(mpd, path, fps):
-    objects=os.listdir(path)
-    for object in objects:
-        object_path=os.path.join(path, object)
-        if os.path.isdir(object_path):
-            qualtities=os.listdir(object_path)
-            for quality in qualtities:
-                quality_path=os.path.join(object_path, quality)
-                sequence=os.listdir(quality_path)
-                period_counter=0
-                for frame in sequence:
-                    frame_path=os.path.join(quality_path, frame)
-                    period=get_id(mpd, "Period", period_counter)
-                    if period is None:
-                        period=ET.SubElement(mpd, "Period")
-                        period.set("id", str(period_counter))
-                        if fps is not None:
-                            frame_time=1/fps
-                            start=period_counter/fps
-                            end=start+frame_time
-                            period.set("start", "PT"+str(start)+"S")
-                            period.set("end", "PT"+str(end)+"S")
-                            period.set("duration", "PT"+str(frame_time)+"S")
-
-                    adapation_set=get_id(period, "AdaptationSet", object)
-                    if adapation_set is None:
-                        adapation_set=ET.SubElement(period, "AdaptationSet")
-                        adapation_set.set("id", object)
-                        mime_type = infer_mime_type(frame_path)
-                        if mime_type is not None:
-                            adapation_set.set("mimeType", mime_type)
-
-                    id        = str(uuid.uuid4())
-                    size      = os.path.getsize(os.path.join(path, object, quality, frame))
-                    bandwidth = int(size * fps)
-    
-                    representation=ET.SubElement(adapation_set, "Representation")
-                    representation.set("id", id)
-                    representation.set("size", size)
-                    representation.set("bandwidth", bandwidth)
-
-                    representation_url=ET.SubElement(representation, "BaseURL")
-                    representation_url.text=object+"/"+quality+"/"+frame
-                    period_counter+=1
-    return mpd
+
+class AdaptationSet:
+    """The representations of one object in one period"""
+    def __init__(self, id, mime_type=None):
+        self.id=id
+        self.mime_type=mime_type
+        self.representations=[] # Tuples of the relative URL and the size in bytes
+
+def scan_directory(path):
+    """Return the entries of a directory sorted by name
+
+    The entries cache the file type, so no further system calls are needed
+    to tell files and folders apart.
+    """
+    with os.scandir(path) as entries:
+        return sorted(entries, key=lambda entry: entry.name)
+
+def stat_files(paths, io_workers=1):
+    """Stat files, optionally on several threads
+
+    :param paths: A list of file paths
+    :param io_workers: The number of threads, stats are slow on network file systems
+    :return: The `os.stat_result` of every path in the order of the paths
+    """
+    if io_workers <= 1 or len(paths) < 2*io_workers:
+        return [os.stat(path) for path in paths]
+    # One task per thread, a future per file costs more than the stat itself
+    chunk=-(-len(paths)//io_workers)
+    with ThreadPoolExecutor(io_workers) as executor:
+        chunks=executor.map(lambda start: [os.stat(path) for path in paths[start:start+chunk]], range(0, len(paths), chunk))
+        return [result for results in chunks for result in results]
+
+def stat_segments(segments, io_workers=1):
+    """Replace the paths of listed segments with their sizes
+
+    :param segments: A list of tuples of the period index, the adaptation set id, the relative URL and the path of every segment, or its size for packed segments
+    :param io_workers: The number of threads used to stat the segments
+    :return: A list of tuples of the period index, the adaptation set id, the relative URL and the size in bytes
+    """
+    results=iter(stat_files([segment[3] for segment in segments if isinstance(segment[3], str)], io_workers))
+    return [(index, set_id, url, next(results).st_size if isinstance(path, str) else path) for index, set_id, url, path in segments]
+
+def index_segments(segments):
+    """Group segments into periods and adaptation sets
+
+    :param segments: A list of tuples of the period index, the adaptation set id, the relative URL and the size of every segment
+    :return: A list of periods, each a dictionary of adaptation sets by id
+    """
+    periods=[]
+    for index, set_id, url, size in segments:
+        while len(periods) <= index:
+            periods.append({})
+        adaptation_set=periods[index].get(set_id)
+        if adaptation_set is None:
+            adaptation_set=AdaptationSet(set_id, infer_mime_type(url))
+            periods[index][set_id]=adaptation_set
+        adaptation_set.representations.append((url, size))
+    return periods
+
+def is_packed(entry):
+    return entry.is_file() and entry.name.endswith(PACK_EXTENSION)
+
+def skip_packed_folders(entries):
+    """Drop the folders of representations that are packed as well, the server serves their containers"""
+    packed={entry.name[:-len(PACK_EXTENSION)] for entry in entries if is_packed(entry)}
+    return [entry for entry in entries if not (entry.is_dir() and entry.name in packed)]
+
+def scan_folders(path):
+    """Return the folders of a directory together with their entries
+
+    Packed representations are returned without entries.
+    """
+    folders=[]
+    for entry in skip_packed_folders(scan_directory(path)):
+        if entry.is_dir():
+            folders.append((entry, scan_directory(entry.path)))
+        elif is_packed(entry):
+            folders.append((entry, None))
+    return folders
+
+def get_frames(quality, frames=None):
+    """Return the frames of a representation folder or container
+
+    :param quality: The `os.DirEntry` of the folder or container
+    :param frames: The entries of the folder if they were listed already
+    :return: A tuple of the representation name and a list of tuples of the name and the path or, if it is known already, the size of every frame
+    """
+    if is_packed(quality):
+        return quality.name[:-len(PACK_EXTENSION)], [(name, size) for name, _, size in load_index(quality.path) if infer_mime_type(name) is not None]
+    if frames is None:
+        frames=scan_directory(quality.path)
+    return quality.name, [(frame.name, frame.path) for frame in frames if frame.is_file() and infer_mime_type(frame.name) is not None]
+
+def get_single_object_segments(qualities):
+    segments=[]
+    for quality, frames in qualities:
+        name, frames=get_frames(quality, frames)
+        for index, (frame, path) in enumerate(frames):
+            segments.append((index, str(index), name+"/"+frame, path))
+    return segments
+
+def get_multiple_object_segments(objects):
+    segments=[]
+    for object, qualities in objects:
+        for quality in skip_packed_folders(qualities or []):
+            if not quality.is_dir() and not is_packed(quality):
+                continue
+            name, frames=get_frames(quality)
+            for index, (frame, path) in enumerate(frames):
+                segments.append((index, object.name, object.name+"/"+name+"/"+frame, path))
+    return segments
+
+def scan_segments(path):
+    """List the segments of a media folder of either layout
+
+    Folders of frames directly below the media folder are qualities of a
+    single object, folders containing further folders are objects. Every
+    folder is listed once.
+
+    :param path: The media folder
+    :return: A list of tuples of the period index, the adaptation set id, the relative URL and the path of every segment
+    """
+    folders=scan_folders(path)
+    if any(child.is_dir() or is_packed(child) for _, children in folders for child in children or []):
+        return get_multiple_object_segments(folders)
+    return get_single_object_segments(folders)
+
+def get_period_times(index, fps):
+    frame_time=1/fps
+    start=index/fps
+    end=start+frame_time
+    return "PT"+str(start)+"S", "PT"+str(end)+"S", "PT"+str(frame_time)+"S"
+
+def get_representation_id(url):
+    """Return an id that only depends on the URL of a segment
+
+    Regenerated MPDs keep their ids, so they stay equal as long as the
+    media does not change.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, url))
+
+def get_bandwidth(size, fps):
+    # Without a frame rate every segment is assumed to last a second
+    return int(size*fps) if fps is not None else size
+
+ESCAPED_CHARACTERS=re.compile(r'[&<>"\n\r\t]')
+
+def escape_text(value):
+    value=str(value)
+    # Most values are numbers and plain names, checking is cheaper than replacing
+    if ESCAPED_CHARACTERS.search(value) is None:
+        return value
+    return escape(value, {"\"": "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#09;"})
+
+def get_attributes(attributes):
+    return "".join(' {}="{}"'.format(key, escape_text(value)) for key, value in attributes)
+
+def write_mpd(file, periods, base_url, fps=None, batch_size=None, pretty=False):
+    """Write a MPD period by period without building a tree of it
+
+    The output equals serializing an ElementTree of the MPD with the same
+    elements and attribute order, with minidom if `pretty`, so MPDs of long
+    sequences are written with little memory. Every adaptation set has its
+    `id` before its `mimeType`, while the former tree based writer put the
+    `mimeType` first for single objects. XML readers do not depend on the
+    order of attributes.
+
+    :param file: A text file to write to
+    :param periods: The periods returned by `index_segments`
+    :param base_url: The base URL of the media on the webserver
+    :param fps: The frames per second, periods have no times if `None`
+    :param batch_size: Advertise batch requests of up to this many segments if not `None`
+    :param pretty: Indent the elements like minidom
+    """
+    # Like minidom and ElementTree
+    indent, newline, empty_tag_end=("  ", "\n", "/>") if pretty else ("", "", " />")
+    attributes=[("type", "static")]
+    if fps is not None:
+        attributes.append(("minBufferTime", 1.0/float(fps)))
+        attributes.append(("mediaPresentationDuration", len(periods)*(1/fps)))
+
+    if pretty:
+        file.write('<?xml version="1.0" ?>\n')
+    file.write("<MPD"+get_attributes(attributes)+">"+newline)
+    file.write(indent+"<BaseURL>"+escape_text(base_url)+"</BaseURL>"+newline)
+    if batch_size is not None:
+        file.write(indent+"<SupplementalProperty"+get_attributes([("schemeIdUri", BATCH_SCHEME), ("value", batch_size)])+empty_tag_end+newline)
+
+    for index, adaptation_sets in enumerate(periods):
+        attributes=[("id", index)]
+        if fps is not None:
+            start, end, duration=get_period_times(index, fps)
+            attributes+=[("start", start), ("end", end), ("duration", duration)]
+        lines=[indent+"<Period"+get_attributes(attributes)+">"]
+        for adaptation_set in adaptation_sets.values():
+            attributes=[("id", adaptation_set.id)]
+            if adaptation_set.mime_type is not None:
+                attributes.append(("mimeType", adaptation_set.mime_type))
+            lines.append(indent*2+"<AdaptationSet"+get_attributes(attributes)+">")
+            for url, size in adaptation_set.representations:
+                # Formatted directly, the ids and numbers need no escaping
+                lines.append('{0}<Representation id="{1}" size="{2}" bandwidth="{3}">{4}{5}<BaseURL>{6}</BaseURL>{4}{0}</Representation>'.format(
+                    indent*3, get_representation_id(url), size, get_bandwidth(size, fps), newline, indent*4, escape_text(url)
+                ))
+            lines.append(indent*2+"</AdaptationSet>")
+        lines.append(indent+"</Period>")
+        file.write(newline.join(lines)+newline)
+    file.write("</MPD>"+newline)
+
+class SegmentedRepresentation:
+    """The frames of one quality, described by a segment template in compact MPDs"""
+    def __init__(self, id):
+        self.id=id
+        self.names=[]
+        self.sizes=[]
+
+FRAME_PATTERN=re.compile(r"^(\d+)(\D.*)?$")
+
+def get_segment_template(names):
+    """Derive the media pattern of a SegmentTemplate from consecutively numbered frames
+
+    :param names: The file names of the frames in playback order, e.g. `00000000.drc`
+    :return: A tuple of the pattern, e.g. `$Number%08d$.drc`, and the first number
+    :raises ValueError: If the frames are not numbered consecutively with the same width and extension
+    """
+    match=FRAME_PATTERN.match(names[0]) if names else None
+    if match is None:
+        raise ValueError("Frame names must start with their number to be described by a template")
+    width=len(match.group(1))
+    suffix=match.group(2) or ""
+    start=int(match.group(1))
+    for i, name in enumerate(names):
+        expected="{:0{}d}{}".format(start+i, width, suffix)
+        if name != expected:
+            raise ValueError("Frames are not numbered consecutively, found \"{}\" where \"{}\" was expected".format(name, expected))
+    return "$Number%0{}d${}".format(width, suffix), start
+
+def index_representations(segments):
+    """Group segments into adaptation sets of `SegmentedRepresentation` objects
+
+    Files that are no segments, e.g. temporary files of encoders, are
+    skipped, they would break the numbering of the frames.
+
+    :param segments: A list of tuples of the period index, the adaptation set id, the relative URL and the size of every segment
+    :return: A list of adaptation sets
+    """
+    adaptation_sets={}
+    representations={}
+    for _, _, url, size in segments:
+        if infer_mime_type(url) is None:
+            continue
+        folder, name=url.rsplit("/", 1)
+        representation=representations.get(folder)
+        if representation is None:
+            set_id=folder.split("/")[0] if "/" in folder else "0"
+            adaptation_set=adaptation_sets.get(set_id)
+            if adaptation_set is None:
+                adaptation_set=AdaptationSet(set_id, infer_mime_type(url))
+                adaptation_sets[set_id]=adaptation_set
+            representation=SegmentedRepresentation(folder)
+            representations[folder]=representation
+            adaptation_set.representations.append(representation)
+        representation.names.append(name)
+        representation.sizes.append(size)
+    return list(adaptation_sets.values())
+
+def write_compact_mpd(file, adaptation_sets, base_url, fps=None, batch_size=None, pretty=False):
+    """Write a MPD with a single period, which describes every quality once
+
+    The segments of a representation are addressed with a SegmentTemplate
+    and timed by a SegmentTimeline with one frame per `1/fps` seconds, or a
+    second without a frame rate. Their sizes are listed in a
+    SupplementalProperty with the scheme `urn:streamingkom:segment-sizes`,
+    so clients can still adapt per frame. The size of the MPD grows by a
+    few bytes per frame instead of a period per frame.
+
+    :param file: A text file to write to
+    :param adaptation_sets: The adaptation sets returned by `index_representations`
+    :param base_url: The base URL of the media on the webserver
+    :param fps: The frames per second
+    :param batch_size: Advertise batch requests of up to this many segments if not `None`
+    :param pretty: Indent the elements like minidom
+    """
+    indent, newline, empty_tag_end=("  ", "\n", "/>") if pretty else ("", "", " />")
+    timescale=fps if fps is not None else 1
+    frames=max((len(representation.names) for adaptation_set in adaptation_sets for representation in adaptation_set.representations), default=0)
+    duration=frames/timescale
+    attributes=[("type", "static")]
+    if fps is not None:
+        attributes.append(("minBufferTime", 1.0/float(fps)))
+        attributes.append(("mediaPresentationDuration", duration))
+
+    lines=[]
+    if pretty:
+        lines.append('<?xml version="1.0" ?>')
+    lines.append("<MPD"+get_attributes(attributes)+">")
+    lines.append(indent+"<BaseURL>"+escape_text(base_url)+"</BaseURL>")
+    if batch_size is not None:
+        lines.append(indent+"<SupplementalProperty"+get_attributes([("schemeIdUri", BATCH_SCHEME), ("value", batch_size)])+empty_tag_end)
+    lines.append(indent+"<Period"+get_attributes([("id", 0), ("start", "PT0.0S"), ("duration", "PT"+str(duration)+"S")])+">")
+    for adaptation_set in adaptation_sets:
+        attributes=[("id", adaptation_set.id)]
+        if adaptation_set.mime_type is not None:
+            attributes.append(("mimeType", adaptation_set.mime_type))
+        lines.append(indent*2+"<AdaptationSet"+get_attributes(attributes)+">")
+        for representation in adaptation_set.representations:
+            try:
+                media, start_number=get_segment_template(representation.names)
+            except ValueError as e:
+                raise ValueError("Representation {} cannot be described by a segment template: {}".format(representation.id, e)) from e
+            bandwidth=get_bandwidth(sum(representation.sizes)/len(representation.sizes), fps)
+            lines.append(indent*3+"<Representation"+get_attributes([("id", representation.id), ("bandwidth", bandwidth)])+">")
+            lines.append(indent*4+"<SupplementalProperty"+get_attributes([("schemeIdUri", SEGMENT_SIZES_SCHEME), ("value", " ".join(map(str, representation.sizes)))])+empty_tag_end)
+            lines.append(indent*4+"<SegmentTemplate"+get_attributes([("media", representation.id+"/"+media), ("startNumber", start_number), ("timescale", timescale)])+">")
+            lines.append(indent*5+"<SegmentTimeline>")
+            lines.append(indent*6+"<S"+get_attributes([("t", 0), ("d", 1), ("r", len(representation.names)-1)])+empty_tag_end)
+            lines.append(indent*5+"</SegmentTimeline>")
+            lines.append(indent*4+"</SegmentTemplate>")
+            lines.append(indent*3+"</Representation>")
+        lines.append(indent*2+"</AdaptationSet>")
+    lines.append(indent+"</Period>")
+    lines.append("</MPD>")
+    file.write(newline.join(lines)+newline)
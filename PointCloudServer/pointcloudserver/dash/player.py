@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time as T
+
+import httpx
+
+from pointcloudserver.dash.adaptation import BandwidthMeter, create_policy
+from pointcloudserver.dash.timeline import parse_timeline
+
+class Player:
+    """A headless DASH player emulating the Unity client
+
+    Timeslots are downloaded in order while the buffered timeslots ahead of
+    the playback last less than `max_buffer` milliseconds. Before every
+    download the adaptation policy selects the representations of the
+    timeslots within the buffer horizon. Playback starts once the first
+    timeslot is buffered and stalls whenever the next timeslot is not.
+    Decoding and rendering are not emulated.
+    """
+    def __init__(self, client, url, policy="lowest", bucket=None, max_buffer=3000, timeslots=None, loop=False, logger=None):
+        """
+        :param client: An `httpx.AsyncClient` used for all requests
+        :param url: The URL of the MPD
+        :param policy: The adaptation policy, one of lowest, highest, available
+        :param bucket: An optional `TokenBucket` limiting the throughput
+        :param max_buffer: The maximum duration of buffered media ahead of the playback in milliseconds
+        :param timeslots: The number of timeslots to play, all if `None`
+        :param loop: Start over at the first timeslot after the last one
+        :param logger: An optional logger
+        """
+        self.client=client
+        self.url=url
+        self.meter=BandwidthMeter()
+        self.policy=create_policy(policy, self.meter)
+        self.bucket=bucket
+        self.max_buffer=max_buffer
+        self.timeslots=timeslots
+        self.loop=loop
+
+        if logger is None:
+            self.logger = logging.getLogger("root")
+        else:
+            self.logger = logger
+
+        self.timeline=[]
+        self.playback_index=0
+        self.changed=asyncio.Event()
+        self.stopped=False
+
+        self.startup_delay=None
+        self.stalls=0
+        self.stall_duration=0.0
+        self.played=0
+        self.qualities=[]
+        self.switches=0
+        self.bytes=0
+        self.requests=0
+        self.errors=0
+
+    def notify(self):
+        self.changed.set()
+
+    async def wait_for_change(self):
+        await self.changed.wait()
+        self.changed.clear()
+
+    def get_forward_buffer(self):
+        """Return the duration of the buffered timeslots from the playback on in milliseconds"""
+        duration=0
+        for i in range(len(self.timeline)):
+            timeslot=self.timeline[(self.playback_index+i)%len(self.timeline)]
+            if not timeslot.buffered:
+                break
+            duration+=timeslot.duration
+        return duration
+
+    def get_horizon(self):
+        """Return the timeslots from the playback on that fit into the buffer"""
+        window=[]
+        duration=0
+        index=self.playback_index
+        while duration < self.max_buffer and len(window) < len(self.timeline):
+            timeslot=self.timeline[index%len(self.timeline)]
+            window.append(timeslot)
+            duration+=timeslot.duration
+            index+=1
+        return window
+
+    async def download(self, url):
+        """Download a segment through the emulated link
+
+        :return: The number of bytes received
+        """
+        size=0
+        self.requests+=1
+        try:
+            async with self.client.stream("GET", url) as response:
+                async for chunk in response.aiter_raw():
+                    if self.bucket is not None:
+                        await self.bucket.consume(len(chunk))
+                    size+=len(chunk)
+                if response.status_code != 200:
+                    self.errors+=1
+        except httpx.HTTPError as e:
+            self.errors+=1
+            self.logger.warning("Download of {} failed: {}".format(url, e))
+        return size
+
+    async def buffer(self):
+        index=0
+        while not self.stopped:
+            if index >= len(self.timeline):
+                if not self.loop:
+                    return
+                index=0
+            timeslot=self.timeline[index]
+
+            # Wait for the playback to free the buffer, an empty buffer always takes a timeslot
+            while not self.stopped and (timeslot.buffered or 0 < self.get_forward_buffer() and self.get_forward_buffer()+timeslot.duration > self.max_buffer):
+                await self.wait_for_change()
+            if self.stopped:
+                return
+
+            self.policy.adapt(self.get_horizon())
+            for selection in timeslot.selections:
+                start=T.perf_counter()
+                size=await self.download(selection.url)
+                self.meter.measure(size, T.perf_counter()-start)
+                self.bytes+=size
+            timeslot.buffered=True
+            self.notify()
+            index+=1
+
+    async def play(self):
+        start=T.perf_counter()
+        quality=None
+        while self.timeslots is None or self.played < self.timeslots:
+            timeslot=self.timeline[self.playback_index]
+            if not timeslot.buffered:
+                stall_start=T.perf_counter()
+                while not timeslot.buffered:
+                    await self.wait_for_change()
+                if self.startup_delay is None:
+                    self.startup_delay=T.perf_counter()-start
+                else:
+                    self.stalls+=1
+                    self.stall_duration+=T.perf_counter()-stall_start
+            elif self.startup_delay is None:
+                self.startup_delay=T.perf_counter()-start
+
+            qualities=[alternatives.index(selection) for selection, alternatives in zip(timeslot.selections, timeslot.alternatives)]
+            if quality is not None and qualities != quality:
+                self.switches+=1
+            quality=qualities
+            self.qualities.append(timeslot.get_relative_quality())
+
+            await asyncio.sleep(timeslot.duration/1000)
+            self.played+=1
+            timeslot.buffered=False
+            if self.playback_index+1 >= len(self.timeline) and not self.loop:
+                break
+            self.playback_index=(self.playback_index+1)%len(self.timeline)
+            self.notify()
+
+    async def run(self):
+        """Load the MPD and play it
+
+        :return: A dictionary describing the session
+        """
+        response=await self.client.get(self.url)
+        response.raise_for_status()
+        self.timeline=parse_timeline(response.content, str(response.url))
+        if len(self.timeline) == 0:
+            raise ValueError("The MPD at {} has no periods".format(self.url))
+
+        t_start=T.perf_counter()
+        buffering=asyncio.ensure_future(self.buffer())
+        playing=asyncio.ensure_future(self.play())
+        try:
+            # Stop waiting for downloads if the buffering failed
+            await asyncio.wait([buffering, playing], return_when=asyncio.FIRST_COMPLETED)
+            if buffering.done() and buffering.exception() is not None:
+                raise buffering.exception()
+            await playing
+        finally:
+            self.stopped=True
+            self.notify()
+            for task in (buffering, playing):
+                task.cancel()
+            await asyncio.gather(buffering, playing, return_exceptions=True)
+        return self.get_report(T.perf_counter()-t_start)
+
+    def get_report(self, duration):
+        return {
+            "url": self.url,
+            "duration": duration,
+            "startup_delay": self.startup_delay,
+            "stalls": self.stalls,
+            "stall_duration": self.stall_duration,
+            "played_timeslots": self.played,
+            "mean_quality": sum(self.qualities)/len(self.qualities) if self.qualities else None,
+            "quality_switches": self.switches,
+            "bytes": self.bytes,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+def summarize(reports: list) -> dict:
+    """Aggregate the reports of several players
+
+    :param reports: The reports returned by `Player.run`
+    :return: Means and totals over all players
+    """
+    def mean(key):
+        values=[report[key] for report in reports if report[key] is not None]
+        return sum(values)/len(values) if values else None
+
+    return {
+        "players": len(reports),
+        "mean_startup_delay": mean("startup_delay"),
+        "max_startup_delay": max((report["startup_delay"] for report in reports if report["startup_delay"] is not None), default=None),
+        "mean_stalls": mean("stalls"),
+        "mean_stall_duration": mean("stall_duration"),
+        "mean_quality": mean("mean_quality"),
+        "mean_quality_switches": mean("quality_switches"),
+        "bytes": sum(report["bytes"] for report in reports),
+        "requests": sum(report["requests"] for report in reports),
+        "errors": sum(report["errors"] for report in reports),
+    }
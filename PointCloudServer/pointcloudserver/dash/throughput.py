@@ -0,0 +1,93 @@
+import asyncio
+import time as T
+from bisect import bisect_right
+
+class BandwidthTrace:
+    """A throughput that changes over time and repeats once it ended
+
+    Traces are text files with one sample per line, the time in seconds
+    since the start of the trace and the throughput in Mbit/s separated by
+    whitespace, as used by many ABR evaluations.
+    """
+    def __init__(self, samples):
+        """
+        :param samples: A list of tuples of time in seconds and throughput in bytes/s
+        """
+        if len(samples) == 0:
+            raise ValueError("A trace needs at least one sample")
+        self.times=[time for time, _ in samples]
+        self.rates=[rate for _, rate in samples]
+        # The last sample lasts as long as the gap before it
+        gap=self.times[-1]-self.times[-2] if len(samples) > 1 else 1.0
+        self.duration=self.times[-1]+gap
+
+    @classmethod
+    def load(cls, path):
+        samples=[]
+        with open(path) as file:
+            for line in file:
+                parts=line.split()
+                if len(parts) < 2 or line.startswith("#"):
+                    continue
+                samples.append((float(parts[0]), float(parts[1])*1000*1000/8))
+        samples.sort()
+        # Traces may start late, time is relative to the first sample
+        start=samples[0][0] if samples else 0
+        return cls([(time-start, rate) for time, rate in samples])
+
+    @classmethod
+    def constant(cls, rate):
+        """Create a trace with a constant throughput
+
+        :param rate: The throughput in bytes/s
+        """
+        return cls([(0.0, rate)])
+
+    def get_rate(self, time):
+        """Return the throughput at a point of the trace
+
+        :param time: Seconds since the start of the trace
+        :return: The throughput in bytes/s
+        """
+        index=bisect_right(self.times, time%self.duration)-1
+        return self.rates[max(0, index)]
+
+class TokenBucket:
+    """Limits the throughput of a download to the rate of a trace
+
+    Tokens are bytes, they are added at the current rate of the trace up to
+    `burst` bytes. Consuming more bytes than available waits until enough
+    tokens were added, so received data is handed out at the rate of the
+    emulated link.
+    """
+    def __init__(self, trace, burst=16*1024, offset=0.0, clock=T.monotonic):
+        """
+        :param trace: The `BandwidthTrace` of the link
+        :param burst: The number of bytes that may be received at once
+        :param offset: Seconds into the trace to start at
+        :param clock: A function returning the current time in seconds
+        """
+        self.trace=trace
+        self.burst=burst
+        self.clock=clock
+        self.start=clock()-offset
+        self.last=clock()
+        self.tokens=burst
+
+    def refill(self):
+        now=self.clock()
+        self.tokens=min(self.burst, self.tokens+(now-self.last)*self.trace.get_rate(now-self.start))
+        self.last=now
+
+    async def consume(self, amount):
+        """Wait until `amount` bytes may be received
+
+        :param amount: The number of bytes
+        """
+        self.refill()
+        self.tokens-=amount
+        while self.tokens < 0:
+            rate=self.trace.get_rate(self.last-self.start)
+            # Wake up regularly, so changes of the rate are picked up
+            await asyncio.sleep(min(-self.tokens/rate, 0.05) if rate > 0 else 0.05)
+            self.refill()
@@ -0,0 +1,134 @@
+import re
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin
+
+from pointcloudserver.dash.mpd import get_compact_timeslots, is_compact
+
+NUMBER=r"[\d.]+(?:[eE][-+]?\d+)?" # Python writes small floats in scientific notation
+DURATION_PATTERN=re.compile(r"^P(?:(?P<days>{0})D)?(?:T(?:(?P<hours>{0})H)?(?:(?P<minutes>{0})M)?(?:(?P<seconds>{0})S)?)?$".format(NUMBER))
+
+def parse_duration(value: str) -> float:
+    """Parse an ISO 8601 duration as used in MPDs, e.g. `PT0.033S`
+
+    :param value: The duration
+    :return: The duration in seconds
+    """
+    match=DURATION_PATTERN.match(value.strip())
+    if match is None:
+        raise ValueError("Invalid duration \"{}\"".format(value))
+    parts={key: float(part) if part else 0.0 for key, part in match.groupdict().items()}
+    return parts["days"]*86400+parts["hours"]*3600+parts["minutes"]*60+parts["seconds"]
+
+class Representation:
+    """A segment that can be selected for playback"""
+    def __init__(self, id, url, bandwidth, size=None):
+        self.id=id
+        self.url=url
+        self.bandwidth=bandwidth
+        self.size=size
+
+    def __repr__(self):
+        return "Representation({}, {})".format(self.id, self.bandwidth)
+
+class Timeslot:
+    """A period of the media with the alternatives of every adaptation set
+
+    The alternatives of every adaptation set are ordered by bandwidth and,
+    like the timeslots of the Unity client, the first alternative is selected
+    initially.
+    """
+    def __init__(self, index, start, end, alternatives):
+        """
+        :param index: The index of the period
+        :param start: The start in milliseconds
+        :param end: The end in milliseconds
+        :param alternatives: A list of representations per adaptation set, ordered by bandwidth
+        """
+        self.index=index
+        self.start=start
+        self.end=end
+        self.alternatives=alternatives
+        self.selections=[representations[0] for representations in alternatives]
+        self.buffered=False
+
+    @property
+    def duration(self):
+        return self.end-self.start
+
+    def get_relative_quality(self):
+        """Return the mean rank of the selections by bandwidth relative to the number of alternatives
+
+        :return: The quality between 0 for the lowest and 1 for the highest bandwidths
+        """
+        qualities=[]
+        for selection, representations in zip(self.selections, self.alternatives):
+            if len(representations) == 1:
+                qualities.append(1.0)
+            else:
+                qualities.append(representations.index(selection)/(len(representations)-1))
+        return sum(qualities)/len(qualities) if qualities else 1.0
+
+def parse_timeline(content, url: str) -> list:
+    """Parse a MPD written by `pointcloudserver mpd` into timeslots
+
+    Segment URLs are resolved against the `BaseURL` of the MPD, which is
+    itself resolved against the URL of the MPD. Periods without `end` or
+    `duration` last `minBufferTime`. Compact MPDs have a timeslot per
+    segment number. The representations of every adaptation set are sorted
+    by bandwidth, as the MPD lists them in the order of their folder names.
+
+    :param content: The MPD
+    :param url: The URL the MPD was loaded from
+    :return: A list of timeslots in the order of their periods
+    """
+    root=ET.fromstring(content)
+    base_url=url
+    element=root.find("BaseURL")
+    if element is not None and element.text:
+        base_url=urljoin(url, element.text.strip())
+    # Written as seconds by `pointcloudserver mpd`, other writers use durations
+    min_buffer_time=root.get("minBufferTime", "0")
+    try:
+        default_duration=float(min_buffer_time)
+    except ValueError:
+        default_duration=parse_duration(min_buffer_time)
+
+    if is_compact(root):
+        timeslots=[]
+        for index, (start, end, adaptation_sets) in enumerate(get_compact_timeslots(root)):
+            alternatives=[sorted((Representation(id, urljoin(base_url, url), bandwidth, size) for id, url, bandwidth, size in segments), key=lambda r: r.bandwidth) for segments in adaptation_sets]
+            timeslots.append(Timeslot(index, start*1000, end*1000, alternatives))
+        return timeslots
+
+    timeslots=[]
+    start=0.0
+    for index, period in enumerate(root.findall("Period")):
+        if period.get("start") is not None:
+            start=parse_duration(period.get("start"))
+        if period.get("end") is not None:
+            end=parse_duration(period.get("end"))
+        elif period.get("duration") is not None:
+            end=start+parse_duration(period.get("duration"))
+        else:
+            end=start+default_duration
+
+        alternatives=[]
+        for adaptation_set in period.findall("AdaptationSet"):
+            representations=[]
+            for representation in adaptation_set.findall("Representation"):
+                element=representation.find("BaseURL")
+                if element is None or not element.text:
+                    continue
+                size=representation.get("size")
+                representations.append(Representation(
+                    representation.get("id"),
+                    urljoin(base_url, element.text.strip()),
+                    int(representation.get("bandwidth", 0)),
+                    int(size) if size is not None else None
+                ))
+            if representations:
+                alternatives.append(sorted(representations, key=lambda r: r.bandwidth))
+
+        timeslots.append(Timeslot(index, start*1000, end*1000, alternatives))
+        start=end
+    return timeslots
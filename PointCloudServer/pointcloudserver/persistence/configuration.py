@@ -1,5 +1,22 @@
+import copy
+
 import yaml
 
+def merge(base: dict, update: dict) -> dict:
+    """Recursively merge `update` into a copy of `base` and return it
+
+    :param base: The dictionary providing the default values
+    :param update: The dictionary whose values take precedence
+    :return: The merged dictionary
+    """
+    merged = copy.deepcopy(base)
+    for key, value in update.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
 class Configuration():
     def __init__(self, path:str=None):
         """
@@ -14,13 +31,52 @@ class Configuration():
                 "redis": {
                     "host": "127.0.0.1",
                     "port": 6379,
+                    "db": 0,
+                    "prefix": "pointcloudserver:", # Prefix of all keys
+                    "max_connections": 32, # Size of the connection pool
+                    "ttl": 0, # Seconds until segments expire, 0 for never
+                    "negative_ttl": 5, # Seconds missing files are remembered, 0 to disable
+                    "compression": None, # Compression of stored segments, one of None, zstd
                 },
                 "internal": {
                     "buffer_size": 512, # MB
+                    "protected_ratio": 0.8, # Share of the buffer for frequently hit segments
+                },
+                "tiered": {
+                    "tiers": ["internal", "redis"], # Caches ordered from fastest to slowest
+                    "write_through": True, # Write to all tiers, else demote evicted segments
                 }
+            },
+            "dash": {
+                "delivery": "memory", # One of memory, file
+                "io_workers": 8, # Threads for blocking disk and cache I/O
+                "metrics": True, # Serve Prometheus metrics at /metrics
+                "tracing": {
+                    "enabled": False, # Record the phases of every request
+                    "traces": 1000, # Number of recent traces kept
+                },
+                "admin": {
+                    "enabled": False, # Serve tracing and profiling endpoints under /admin
+                    "max_profile_seconds": 60,
+                },
+                "prefetch": {
+                    "segments": 0, # Segments to prefetch for sequential playback, 0 disables prefetching
+                    "headroom": 0.1, # Share of the internal cache a single prefetch may fill
+                },
+                "batch_size": 60, # Maximum number of segments per batch request, 0 disables batches
+                "caching": {
+                    "max_age": 0, # Seconds clients may cache segments, 0 disables the Cache-Control header
+                    "immutable": False, # Mark segments as immutable, so clients do not revalidate them
+                    "stat_entries": 100000, # Number of segment file metadata entries kept in memory
+                },
+                "warmup": {
+                    # Warm-up is disabled while both are 0
+                    "periods": 0, # Periods to preload per media on startup, 0 for all up to the budget
+                    "budget": 0, # MB to preload per media on startup, 0 for all of the periods
+                },
             }
         }
-        self.config=self.defaults
+        self.config=copy.deepcopy(self.defaults)
 
         if path is not None:
             self.load(path)
@@ -38,8 +94,8 @@ class Configuration():
         with open(path) as f:
             user_config = yaml.safe_load(f)
 
-            # TODO: Merge those dictionaries instead of overwriting
-            self.config = user_config
+            if user_config is not None:
+                self.config = merge(self.config, user_config)
 
     def save(self, path: str):
         """
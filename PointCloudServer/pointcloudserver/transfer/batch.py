@@ -0,0 +1,33 @@
+import struct
+
+MEDIA_TYPE="application/vnd.streamingkom.batch"
+
+# Container layout, all integers are 32 bit unsigned little endian:
+# - Number of segments N
+# - N sizes of the segments in bytes
+# - The segments one after another
+def pack_header(sizes) -> bytes:
+    """Pack the header of a batch container
+
+    :param sizes: The sizes of the contained segments in bytes
+    :return: The header preceding the segments
+    """
+    return struct.pack("<{}I".format(len(sizes)+1), len(sizes), *sizes)
+
+def unpack(data: bytes) -> list:
+    """Split a batch container into its segments
+
+    :param data: The complete container
+    :return: A list of the contained segments
+    """
+    count=struct.unpack_from("<I", data)[0]
+    sizes=struct.unpack_from("<{}I".format(count), data, 4)
+    offset=4*(count+1)
+
+    segments=[]
+    for size in sizes:
+        segments.append(data[offset:offset+size])
+        offset+=size
+    if offset != len(data):
+        raise ValueError("Batch container has {} b, expected {} b".format(len(data), offset))
+    return segments
@@ -1,22 +1,52 @@
 import logging
-from typing import OrderedDict
+from collections import OrderedDict
 
 class Buffer:
-    def __init__(self, logger=None, max_size=512):
+    """An in-memory segmented LRU cache limited by the size of its values
+
+    New keys are inserted into a probationary segment. A key that is hit
+    again is promoted to a protected segment, which holds up to
+    `protected_ratio` of the capacity. Keys are evicted from the probationary
+    segment first, so a single sequential pass over a media does not flush
+    the frames that are watched by many clients. With a `protected_ratio`
+    of 0 the buffer behaves like a plain LRU cache. Prefetched keys are only
+    promoted on their second hit, since their first hit is the request they
+    were prefetched for.
+
+    All operations run in constant time, the size of the stored values is
+    tracked as a running total. If set, `on_evict` is called with the key
+    and value of every evicted entry.
+    """
+    def __init__(self, logger=None, max_size=512, protected_ratio=0.8):
         self.max_size=max_size*1024*1024 # in bytes
 
+        if not 0 <= protected_ratio <= 1:
+            raise ValueError("Protected ratio must be between 0 and 1")
+        self.max_protected_size=int(self.max_size*protected_ratio)
+
         if logger is None:
             self.logger = logging.getLogger("root")
         else:
             self.logger = logger
-        
+
+        self.on_evict=None
+
+        self.hits=0
+        self.misses=0
+        self.evictions=0
+        self.evicted_bytes=0
+
         self.init_buffer()
         self.logger.info("Initialized buffer with {} Mb size limit".format(max_size))
-    
+
     def init_buffer(self):
-        self.buffer=OrderedDict()
+        self.probation=OrderedDict()
+        self.protected=OrderedDict()
+        self.prefetched=set() # Probationary keys not hit since they were prefetched
+        self.probation_size=0
+        self.protected_size=0
 
-    def set(self, key, value):
+    def set(self, key, value, prefetched=False):
         if key is None:
             return
 
@@ -28,57 +58,123 @@ class Buffer:
             self.logger.error("Size of value for key \"{}\" is to large ({})".format(key, need))
             return
 
-        missing=need-self.get_free_size()
-        if key in self.buffer:
-            self.logger.debug("Updating key \"{}\"".format(key))
-            missing-=len(self.buffer[key])
-            self.delete(key)
+        if key in self.protected:
+            self.protected_size+=need-len(self.protected[key])
+            self.protected[key]=value
+            self.protected.move_to_end(key)
+            self.demote()
         else:
-            self.logger.debug("Adding key \"{}\"".format(key))
+            if key in self.probation:
+                self.probation_size-=len(self.probation.pop(key))
+            self.probation[key]=value
+            self.probation_size+=need
+            if prefetched:
+                self.prefetched.add(key)
+            else:
+                self.prefetched.discard(key)
 
+        missing=self.get_current_size()-self.get_max_size()
         if missing > 0:
-            self.logger.debug("{} b missing in buffer".format(missing))
             self.clean(missing)
 
-        self.buffer[key]=value
-    
     def get(self, key):
-        if key not in self.buffer:
-            self.logger.debug("Value for key \"{}\" not found".format(key))
-        else:
-            self.logger.debug("Found value for key \"{}\"".format(key))
-            return self.buffer[key]
+        if key in self.protected:
+            self.hits+=1
+            self.protected.move_to_end(key)
+            return self.protected[key]
+
+        if key in self.prefetched:
+            self.hits+=1
+            self.prefetched.discard(key)
+            self.probation.move_to_end(key)
+            return self.probation[key]
+
+        if key in self.probation:
+            self.hits+=1
+            value=self.probation.pop(key)
+            self.probation_size-=len(value)
+            self.protected[key]=value
+            self.protected_size+=len(value)
+            self.demote()
+            return value
+
+        self.misses+=1
+        return None
+
+    def __contains__(self, key):
+        return key in self.protected or key in self.probation
+
+    def __len__(self):
+        return len(self.protected)+len(self.probation)
 
     def delete(self, key):
-        if key in self.buffer:
-            self.logger.debug("Removing key \"{}\"".format(key))
-            del self.buffer[key]
+        if key in self.protected:
+            self.protected_size-=len(self.protected.pop(key))
+        elif key in self.probation:
+            self.probation_size-=len(self.probation.pop(key))
+            self.prefetched.discard(key)
+
+    def demote(self):
+        """Move the least recently used protected keys back to the
+        probationary segment until the protected segment fits its limit
+        """
+        while self.protected_size > self.max_protected_size:
+            key, value=self.protected.popitem(last=False)
+            self.protected_size-=len(value)
+            self.probation[key]=value
+            self.probation_size+=len(value)
 
     def clean(self, size=0):
+        """Evict least recently used values
+
+        :param size: The number of bytes to free, everything is removed if 0
+        """
         if size < 0:
             return
 
-        if size == 0 or size > self.get_current_size():
+        if size == 0:
+            self.evictions+=len(self)
+            self.evicted_bytes+=self.get_current_size()
             self.init_buffer()
-            self.logger("Cleaned buffer completly")
+            self.logger.debug("Cleaned buffer completly")
             return
 
         cleaned=0
-        while cleaned < size:
-            k = next(iter(self.buffer))
-            cleaned+=len(self.buffer[k])
-            self.delete(k)
+        while cleaned < size and len(self) > 0:
+            segment=self.probation if self.probation else self.protected
+            key, value=segment.popitem(last=False)
+            if segment is self.probation:
+                self.probation_size-=len(value)
+                self.prefetched.discard(key)
+            else:
+                self.protected_size-=len(value)
+            cleaned+=len(value)
+            self.evictions+=1
+            if self.on_evict is not None:
+                self.on_evict(key, value)
+        self.evicted_bytes+=cleaned
         self.logger.debug("Cleaned {} b".format(cleaned))
-    
+
     def get_max_size(self):
         return self.max_size
 
     def get_current_size(self):
-        size=0
-        for k,v in self.buffer.items():
-            size+=len(v)
-        
-        return size
+        return self.probation_size+self.protected_size
 
     def get_free_size(self):
         return self.get_max_size() - self.get_current_size()
+
+    def get_stats(self):
+        """Return the counters of the buffer
+
+        :return: A dictionary with hit, miss, eviction and size counters
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+            "items": len(self),
+            "size": self.get_current_size(),
+            "max_size": self.get_max_size(),
+        }
@@ -0,0 +1,305 @@
+from abc import ABC, abstractmethod
+import asyncio
+import logging
+
+from pointcloudserver.transfer.buffer import Buffer
+from pointcloudserver.transfer.shared_buffer import SharedBuffer
+
+class NotFound:
+    """Marker returned for keys known to have no file"""
+    def __repr__(self):
+        return "NOT_FOUND"
+
+NOT_FOUND=NotFound()
+
+class Cache(ABC):
+    """A segment cache used by the DASH server
+
+    All methods are coroutines, so implementations talking to a remote
+    server never block the event loop.
+    """
+    @abstractmethod
+    async def get(self, key):
+        """Return the cached value of `key`
+
+        :param key: The key to look up
+        :return: The value, `NOT_FOUND` for a negative entry or `None` on a miss
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key, value) -> None:
+        raise NotImplementedError
+
+    async def set_prefetched(self, key, value) -> None:
+        """Store a value that was loaded before it was requested
+
+        Caches protecting values hit repeatedly do not count the first hit
+        of a prefetched value, so sequential playback does not take over the
+        protected values.
+        """
+        await self.set(key, value)
+
+    async def set_many(self, items) -> None:
+        """Store several values at once
+
+        :param items: An iterable of tuples of key and value
+        """
+        for key, value in items:
+            await self.set(key, value)
+
+    async def set_missing(self, key) -> None:
+        """Remember that there is no file for `key`, if supported
+
+        :param key: The key of the missing file
+        """
+        pass
+
+    @abstractmethod
+    async def exists(self, key) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, key) -> None:
+        raise NotImplementedError
+
+    def get_max_size(self):
+        """Return the capacity of the cache in bytes
+
+        :return: The capacity or `None` if unknown
+        """
+        return None
+
+    def get_free_size(self):
+        """Return the number of bytes that can be stored without evicting a value
+
+        :return: The free space or `None` if unknown
+        """
+        return None
+
+    def set_executor(self, run_io) -> None:
+        """Run blocking work of the cache, e.g. compression, off the event loop
+
+        :param run_io: A coroutine function running a blocking function on a bounded executor
+        """
+        pass
+
+    @abstractmethod
+    def get_stats(self) -> dict:
+        raise NotImplementedError
+
+class BufferCache(Cache):
+    """A cache in the memory of the server process, either a `Buffer` or a `SharedBuffer`"""
+    def __init__(self, buffer):
+        self.buffer=buffer
+
+    async def get(self, key):
+        return self.buffer.get(key)
+
+    async def set(self, key, value) -> None:
+        self.buffer.set(key, value)
+
+    async def set_prefetched(self, key, value) -> None:
+        self.buffer.set(key, value, prefetched=True)
+
+    async def exists(self, key) -> bool:
+        return key in self.buffer
+
+    async def delete(self, key) -> None:
+        self.buffer.delete(key)
+
+    def get_max_size(self):
+        return self.buffer.get_max_size()
+
+    def get_free_size(self):
+        return self.buffer.get_free_size()
+
+    def get_stats(self) -> dict:
+        return self.buffer.get_stats()
+
+class TieredCache(Cache):
+    """Several caches queried in order, e.g. a small in-process cache in
+    front of a redis server shared by several DASH servers
+
+    A value found in a lower tier is promoted to all tiers above it. New
+    values are written to all tiers, unless `write_through` is disabled.
+    Then they are only written to the first tier that can hold them and
+    values evicted from a `Buffer` tier are demoted to the tier below.
+    Values larger than a tier are never written to it.
+    """
+    def __init__(self, tiers, write_through=True, logger=None):
+        """
+        :param tiers: The caches ordered from fastest to slowest
+        :param write_through: Write new values to all tiers instead of the first only
+        :param logger: An optional logger
+        """
+        if len(tiers) == 0:
+            raise ValueError("At least one tier is required")
+        self.tiers=tiers
+        self.write_through=write_through
+
+        if logger is None:
+            self.logger = logging.getLogger("root")
+        else:
+            self.logger = logger
+
+        self.hits=[0]*len(tiers)
+        self.misses=0
+        self.promotions=0
+        self.demotions=0
+        self.tasks=set()
+
+        if not write_through:
+            for i, tier in enumerate(tiers[:-1]):
+                buffer=getattr(tier, "buffer", None)
+                if hasattr(buffer, "on_evict"):
+                    buffer.on_evict=self.create_demotion(i+1)
+
+    def create_demotion(self, target):
+        def demote(key, value):
+            self.demotions+=1
+            task=asyncio.ensure_future(self.tiers[target].set(key, value))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        return demote
+
+    async def get(self, key):
+        for i, tier in enumerate(self.tiers):
+            value=await tier.get(key)
+            if value is None:
+                continue
+
+            self.hits[i]+=1
+            if value is not NOT_FOUND and i > 0:
+                self.promotions+=1
+                for upper in self.tiers[:i]:
+                    if self.fits(upper, value):
+                        await upper.set(key, value)
+            return value
+
+        self.misses+=1
+        return None
+
+    def fits(self, tier, value):
+        max_size=tier.get_max_size()
+        return max_size is None or len(value) <= max_size
+
+    def get_target_tiers(self, value):
+        """Return the tiers a new value is written to"""
+        tiers=[tier for tier in self.tiers if self.fits(tier, value)]
+        return tiers if self.write_through else tiers[:1]
+
+    async def set(self, key, value) -> None:
+        for tier in self.get_target_tiers(value):
+            await tier.set(key, value)
+
+    async def set_prefetched(self, key, value) -> None:
+        for tier in self.get_target_tiers(value):
+            await tier.set_prefetched(key, value)
+
+    async def set_many(self, items) -> None:
+        batches={id(tier): [] for tier in self.tiers}
+        for key, value in items:
+            for tier in self.get_target_tiers(value):
+                batches[id(tier)].append((key, value))
+        for tier in self.tiers:
+            if batches[id(tier)]:
+                await tier.set_many(batches[id(tier)])
+
+    async def set_missing(self, key) -> None:
+        for tier in self.tiers:
+            await tier.set_missing(key)
+
+    async def exists(self, key) -> bool:
+        for tier in self.tiers:
+            if await tier.exists(key):
+                return True
+        return False
+
+    async def delete(self, key) -> None:
+        for tier in self.tiers:
+            await tier.delete(key)
+
+    def get_max_size(self):
+        return self.tiers[0].get_max_size()
+
+    def get_free_size(self):
+        return self.tiers[0].get_free_size()
+
+    def set_executor(self, run_io) -> None:
+        for tier in self.tiers:
+            tier.set_executor(run_io)
+
+    def get_stats(self) -> dict:
+        """Return the counters of the tiered cache and of each tier
+
+        :return: A dictionary with hit counters per tier and the statistics of the tiers
+        """
+        return {
+            "hits": sum(self.hits),
+            "misses": self.misses,
+            "promotions": self.promotions,
+            "demotions": self.demotions,
+            "tiers": [dict(tier.get_stats(), hits_served=hits) for tier, hits in zip(self.tiers, self.hits)],
+        }
+
+class CacheFactory():
+    def __init__(self, logger=None) -> None:
+        if logger is None:
+            self.logger = logging.getLogger("root")
+        else:
+            self.logger = logger
+
+    def create(self, name: str, config: dict, workers: int = 1) -> Cache:
+        """Create a single cache backend
+
+        :param name: The backend, one of internal, redis
+        :param config: The `cache` section of the configuration
+        :param workers: The number of worker processes sharing the cache
+        :return: The cache
+        """
+        if name == "internal" and workers > 1:
+            self.logger.info(f"Setting up internal cache shared by {workers} workers")
+            return BufferCache(SharedBuffer(logger=self.logger, max_size=config['internal']['buffer_size']))
+        elif name == "internal":
+            self.logger.info("Setting up internal cache")
+            return BufferCache(Buffer(logger=self.logger, max_size=config['internal']['buffer_size'], protected_ratio=config['internal']['protected_ratio']))
+        elif name == "redis":
+            # Imported here, as the redis cache builds upon this module
+            from pointcloudserver.transfer.redis_cache import RedisCache
+            self.logger.info("Setting up redis cache")
+            redis_config=config['redis']
+            return RedisCache(
+                host=redis_config['host'],
+                port=redis_config['port'],
+                db=redis_config['db'],
+                prefix=redis_config['prefix'],
+                max_connections=redis_config['max_connections'],
+                ttl=redis_config['ttl'],
+                negative_ttl=redis_config['negative_ttl'],
+                compression=redis_config['compression'],
+                logger=self.logger
+            )
+        raise ValueError(f"{name} cache is not supported.")
+
+    def create_from_config(self, config: dict, workers: int = 1) -> Cache:
+        """Create the cache selected by `use` in the `cache` section of the configuration
+
+        :param config: The `cache` section of the configuration
+        :param workers: The number of worker processes sharing the cache
+        :return: The cache or `None` if no cache should be used
+        """
+        use=config['use']
+        if use is None or use == "none":
+            self.logger.info("Setting up no cache")
+            return None
+        if use == "tiered":
+            self.logger.info("Setting up tiered cache of {}".format(", ".join(config['tiered']['tiers'])))
+            tiers=[self.create(name, config, workers) for name in config['tiered']['tiers']]
+            write_through=config['tiered']['write_through']
+            if not write_through and any(not hasattr(getattr(tier, "buffer", None), "on_evict") for tier in tiers[:-1]):
+                # Only a Buffer reports evictions, without demotions the lower tiers would never be written
+                self.logger.warning("Tiers above the last one cannot demote evicted segments, e.g. the internal cache shared by several workers, writing through all tiers instead")
+                write_through=True
+            return TieredCache(tiers, write_through=write_through, logger=self.logger)
+        return self.create(use, config, workers)
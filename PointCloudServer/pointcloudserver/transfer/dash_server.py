@@ -1,26 +1,57 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import Response
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.routing import APIRoute
+import json
+import multiprocessing
 import os
+import signal
+import socket
 import time as T
 import logging
 
 import mimetypes
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from hypercorn.config import Config
 from hypercorn.asyncio import serve
 
+from pointcloudserver.transfer.batch import MEDIA_TYPE as BATCH_MEDIA_TYPE, pack_header
+from pointcloudserver.transfer.cache import NOT_FOUND
+from pointcloudserver.transfer.http import is_not_modified, select_encoding
+from pointcloudserver.transfer.manifest_cache import ManifestCache
+from pointcloudserver.transfer.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Registry, RequestMetrics, collect_stats
+from pointcloudserver.transfer.pack import PackCache
+from pointcloudserver.transfer.prefetcher import Prefetcher
+from pointcloudserver.transfer.profiler import SamplingProfiler
+from pointcloudserver.transfer.segment_index import SegmentIndex
+from pointcloudserver.transfer.single_flight import SingleFlight
+from pointcloudserver.transfer.stat_cache import StatCache
+from pointcloudserver.transfer.tracing import RequestTracing, Tracer
+from pointcloudserver.transfer.warmup import WarmUp
+
+# Statistics of the server components that only ever increase
+STAT_COUNTERS=("hits", "misses", "evictions", "evicted_bytes", "negative_hits", "errors", "pipelines", "stored_bytes", "raw_bytes", "promotions", "demotions", "fills", "coalesced", "prefetched", "hits_served")
+
 class DASHServer():
-    def __init__(self, host:str="127.0.0.1", port:int=5000, media_path:str="./media", cache=None, buffer_size:int=512):
+    def __init__(self, host:str="127.0.0.1", port:int=5000, media_path:str="./media", cache=None, buffer_size:int=512, delivery:str="memory", io_workers:int=8, prefetch_segments:int=0, prefetch_headroom:float=0.1, warmup_periods:int=0, warmup_budget:int=0, max_age:int=0, immutable:bool=False, stat_entries:int=100000, batch_size:int=0, metrics:bool=True, tracing:bool=False, max_traces:int=1000, admin:bool=False, max_profile_seconds:int=60):
         self.media_path=media_path
 
+        if delivery not in ("memory", "file"):
+            raise ValueError("Unknown delivery mode \"{}\"".format(delivery))
+        self.delivery=delivery
+
+        self.host=host
+        self.port=port
         self.config=Config()
         self.config.bind="{}:{}".format(host, port)
 
         self.app = FastAPI(
+            lifespan=self.lifespan,
             routes=[
                 APIRoute("/media/{name}", self.__media_mpd, methods=["GET"]),
                 APIRoute("/media/{name}/{representation}/{segment}", self.__media_segment, methods=["GET"]),
+                APIRoute("/media/{name}/{representation}/batch/{segment}/{count}", self.__media_batch, methods=["GET"]),
             ]
         )
 
@@ -34,54 +65,511 @@ class DASHServer():
         if cache is not None:
             self.cache = cache
 
+        if io_workers < 1:
+            raise ValueError("At least one I/O worker is required")
+        self.executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="dash-io")
+        if self.cache is not None:
+            self.cache.set_executor(self.run_io)
+        self.single_flight = SingleFlight()
+        self.manifests = ManifestCache(self.run_io)
+        self.files = StatCache(self.run_io, max_entries=stat_entries, on_change=self.invalidate)
+        self.segments = SegmentIndex(self.run_io)
+        self.packs = PackCache(self.run_io)
+        self.batch_size = batch_size
+
+        self.registry = None
+        if metrics:
+            self.setup_metrics()
+
+        self.tracer = Tracer(enabled=tracing, max_traces=max_traces)
+        if self.registry is not None:
+            self.tracer.histogram = self.registry.histogram("request_phase_duration_seconds", "Seconds spent in each phase of traced requests", ("phase",))
+        self.profiler = SamplingProfiler()
+        self.max_profile_seconds = max_profile_seconds
+        if tracing or admin:
+            self.app.add_middleware(RequestTracing, tracer=self.tracer)
+        if admin:
+            self.setup_admin()
+
+        # Segments never change once written, so caches may keep them
+        self.cache_control = None
+        if max_age > 0:
+            self.cache_control = "public, max-age={}".format(max_age)
+            if immutable:
+                self.cache_control += ", immutable"
+
+        self.prefetcher = None
+        if prefetch_segments > 0 and self.cache is not None:
+            max_size = self.cache.get_max_size()
+            if max_size is not None:
+                max_size *= prefetch_headroom
+            self.prefetcher = Prefetcher(self.prefetch_file, segments=prefetch_segments, max_size=max_size, get_free_size=self.cache.get_free_size)
+
+        self.warmup = None
+        if (warmup_periods > 0 or warmup_budget > 0) and self.cache is not None:
+            self.warmup = WarmUp(
+                media_path,
+                self.prefetch_file,
+                self.run_io,
+                periods=warmup_periods,
+                budget=warmup_budget*1024*1024,
+                concurrency=io_workers
+            )
+
+    def setup_metrics(self):
+        """Serve metrics in the Prometheus text format at `/metrics`"""
+        self.registry = Registry(prefix="pointcloudserver_")
+        self.request_latency = self.registry.histogram("request_duration_seconds", "Seconds until the response to a request was sent", ("route", "cache"))
+        self.requests_in_flight = self.registry.gauge("requests_in_flight", "Requests in progress")
+        self.disk_read_latency = self.registry.histogram("disk_read_duration_seconds", "Seconds to read a segment file from disk")
+        self.bytes_served = self.registry.counter("served_bytes_total", "Bytes of segments sent", ("media", "representation"))
+        # Counters kept by the server components are only read on scrapes
+        self.registry.add_collector(lambda: collect_stats(self.get_stats(), counters=STAT_COUNTERS))
+
+        self.app.add_middleware(RequestMetrics, latency=self.request_latency, in_flight=self.requests_in_flight)
+        self.app.add_api_route("/metrics", self.__metrics, methods=["GET"])
 
-    async def __media_mpd(self, name):
+    def setup_admin(self):
+        """Serve endpoints to trace and profile the running server under `/admin`"""
+        self.app.add_api_route("/admin/tracing", self.__admin_tracing, methods=["GET", "PUT"])
+        self.app.add_api_route("/admin/traces", self.__admin_traces, methods=["GET"])
+        self.app.add_api_route("/admin/profile", self.__admin_profile, methods=["GET"])
+
+    @asynccontextmanager
+    async def lifespan(self, app):
+        # Warm up in the background, so connections are accepted meanwhile
+        task = None
+        if self.warmup is not None:
+            task = asyncio.ensure_future(self.warmup.run())
+            task.add_done_callback(self.warmup_done)
+        try:
+            yield
+        finally:
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+    def warmup_done(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            logging.error("Cache warm-up failed: {}".format(task.exception()))
+
+    async def __metrics(self):
+        return Response(content=self.registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+    async def __admin_tracing(self, request: Request, enabled: bool = None):
+        if request.method == "PUT" and enabled is not None:
+            self.tracer.enabled=enabled
+            logging.info("Tracing {}".format("enabled" if enabled else "disabled"))
+        return JSONResponse({"enabled": self.tracer.enabled, "phases": self.tracer.get_summary()})
+
+    async def __admin_traces(self, limit: int = 100, min_duration: float = 0):
+        return JSONResponse(self.tracer.get_traces(limit=limit, min_duration=min_duration))
+
+    async def __admin_profile(self, seconds: float = 10, interval: float = 0.005):
+        if not 0 < seconds <= self.max_profile_seconds:
+            raise HTTPException(status_code=400, detail="Profiles last up to {} seconds".format(self.max_profile_seconds))
+        if interval <= 0:
+            raise HTTPException(status_code=400, detail="The interval must be positive")
+        if self.profiler.is_running():
+            raise HTTPException(status_code=409, detail="A profile is already running")
+
+        logging.info("Profiling for {}s".format(seconds))
+        self.profiler.interval=interval
+        self.profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self.profiler.stop()
+
+        headers={"Content-Disposition": "attachment; filename=\"profile-{}.txt\"".format(int(T.time()))}
+        return Response(content=self.profiler.collapse(), media_type="text/plain", headers=headers)
+
+    async def __media_mpd(self, name, request: Request):
+        trace=request.scope.get("trace")
+        if trace is not None:
+            trace.enter("manifest")
         filename=os.path.join(self.media_path, name, "mpd.xml")
 
-        data=self.load_file(filename)
-        if data is None:
+        manifest=await self.manifests.get(filename)
+        if manifest is None:
             raise HTTPException(status_code=404)
 
-        return Response(content=data, media_type='application/dash+xml')
+        encoding=select_encoding(request.headers.get("accept-encoding"), manifest.variants)
+        headers={
+            "ETag": manifest.etags[encoding],
+            "Last-Modified": manifest.last_modified,
+            "Vary": "Accept-Encoding",
+        }
+        if is_not_modified(request.headers, manifest.etags.values()):
+            return Response(status_code=304, headers=headers)
+
+        if encoding is not None:
+            headers["Content-Encoding"]=encoding
+        return Response(content=manifest.variants[encoding], media_type='application/dash+xml', headers=headers)
 
-    async def __media_segment(self, name, representation, segment):
-        filename=os.path.join(self.media_path, name, representation, segment)
+    async def __media_segment(self, name, representation, segment, request: Request):
+        trace=request.scope.get("trace")
+        if trace is not None:
+            trace.enter("stat")
+        directory=os.path.join(self.media_path, name, representation)
+        packed=await self.packs.get(directory)
+        if packed is not None:
+            return self.serve_packed(packed, name, representation, segment, request)
+        filename=os.path.join(directory, segment)
 
-        data = self.load_file(filename)
+        metadata=await self.files.get(filename)
+        if metadata is None:
+            raise HTTPException(status_code=404)
+        if metadata.content_type is None:
+            raise HTTPException(status_code=406)
+
+        headers={
+            "ETag": metadata.etag,
+            "Last-Modified": metadata.last_modified,
+        }
+        if self.cache_control is not None:
+            headers["Cache-Control"]=self.cache_control
+        if is_not_modified(request.headers, [metadata.etag], metadata.mtime):
+            return Response(status_code=304, headers=headers)
+
+        if self.delivery == "file":
+            if self.registry is not None:
+                request.scope["cache"]="bypass"
+                self.bytes_served.inc(metadata.size, (name, representation))
+            return self.stream_file(filename, metadata, headers)
+
+        data = await self.load_file(filename, request.scope)
         if data is None:
             raise HTTPException(status_code=404)
 
-        content_type=mimetypes.guess_type(filename, strict=False)[0]
+        if self.registry is not None:
+            self.bytes_served.inc(len(data), (name, representation))
+        if self.prefetcher is not None:
+            self.prefetcher.notify(name, representation, segment, filename, len(data))
+
+        return Response(content=data, media_type=metadata.content_type, headers=headers)
+
+    def serve_packed(self, packed, name, representation, segment, request):
+        """Create a response with a segment of a packed representation
+
+        The segment is a slice of the mapped container, it bypasses the
+        cache since the kernel caches the pages of the container anyway.
+
+        :param packed: The container of the representation
+        :return: The response
+        """
+        data=packed.get(segment)
+        if data is None:
+            raise HTTPException(status_code=404)
+        content_type=mimetypes.guess_type(segment, strict=False)[0]
         if content_type is None:
             raise HTTPException(status_code=406)
 
-        return Response(content=data, media_type=content_type)
+        etag=packed.get_etag(segment)
+        headers={
+            "ETag": etag,
+            "Last-Modified": packed.last_modified,
+        }
+        if self.cache_control is not None:
+            headers["Cache-Control"]=self.cache_control
+        if is_not_modified(request.headers, [etag], packed.modified):
+            return Response(status_code=304, headers=headers)
+
+        if self.registry is not None:
+            request.scope["cache"]="bypass"
+            self.bytes_served.inc(len(data), (name, representation))
+        return Response(content=data, media_type=content_type, headers=headers)
+
+    async def __media_batch(self, name, representation, segment, count: int, request: Request):
+        trace=request.scope.get("trace")
+        if trace is not None:
+            trace.enter("stat")
+        if self.batch_size < 1:
+            raise HTTPException(status_code=404)
+        if count < 1 or count > self.batch_size:
+            raise HTTPException(status_code=400, detail="Batches contain 1 to {} segments".format(self.batch_size))
+
+        directory=os.path.join(self.media_path, name, representation)
+        packed=await self.packs.get(directory)
+        if packed is not None:
+            names=packed.get_range(segment, count)
+            if names is None:
+                raise HTTPException(status_code=404)
+            segments=[packed.get(file) for file in names]
+            sizes=[len(data) for data in segments]
+            header=pack_header(sizes)
+            if self.registry is not None:
+                self.bytes_served.inc(sum(sizes), (name, representation))
+            headers={
+                "Content-Length": str(len(header)+sum(sizes)),
+                "X-Segments": ",".join(names),
+            }
+            return StreamingResponse(self.stream_slices([header, *segments]), media_type=BATCH_MEDIA_TYPE, headers=headers)
+
+        names=await self.segments.get_range(directory, segment, count)
+        if names is None:
+            raise HTTPException(status_code=404)
+
+        # Every segment is loaded or opened before the response starts, so a missing one is still answered with 404
+        paths=[os.path.join(directory, name) for name in names]
+        if self.delivery == "file":
+            files=await self.run_io(self.open_files, paths)
+            if files is None:
+                raise HTTPException(status_code=404)
+            sizes=[size for _, size in files]
+        else:
+            segments=await asyncio.gather(*[self.load_file(path) for path in paths])
+            if any(data is None for data in segments):
+                raise HTTPException(status_code=404)
+            sizes=[len(data) for data in segments]
+
+        header=pack_header(sizes)
+        if self.registry is not None:
+            self.bytes_served.inc(sum(sizes), (name, representation))
+        headers={
+            "Content-Length": str(len(header)+sum(sizes)),
+            "X-Segments": ",".join(names),
+        }
+        if self.delivery == "file":
+            return StreamingResponse(self.stream_files(header, files), media_type=BATCH_MEDIA_TYPE, headers=headers)
+        return StreamingResponse(self.stream_slices([header, *segments]), media_type=BATCH_MEDIA_TYPE, headers=headers)
+
+    def open_files(self, paths):
+        """Open the segments of a batch
+
+        Open files can still be read after they were removed or replaced.
+
+        :param paths: The paths of the segments
+        :return: A list of tuples of the open file and its size or `None` if a segment is missing
+        """
+        files=[]
+        try:
+            for path in paths:
+                file=open(path, 'rb')
+                files.append((file, os.fstat(file.fileno()).st_size))
+        except (FileNotFoundError, IsADirectoryError):
+            for file, _ in files:
+                file.close()
+            return None
+        return files
+
+    def read_open_file(self, file, size):
+        start=T.perf_counter()
+        data=file.read(size)
+        if len(data) != size:
+            raise ValueError("{} was truncated to {} of {} bytes while it was sent".format(file.name, len(data), size))
+        return data, T.perf_counter()-start
+
+    async def stream_files(self, header, files):
+        """Yield a batch container segment by segment from open files and close them
+
+        :param header: The container header
+        :param files: A list of tuples of the open file and its size
+        """
+        try:
+            yield header
+            for file, size in files:
+                data, duration=await self.run_io(self.read_open_file, file, size)
+                if self.registry is not None:
+                    self.disk_read_latency.observe(duration)
+                yield data
+        finally:
+            for file, _ in files:
+                file.close()
+
+    async def stream_slices(self, slices):
+        for data in slices:
+            yield data
+
+    def stream_file(self, path, metadata, headers):
+        """Create a response streaming the file at `path` directly from disk
+
+        The response honors `Range` and `If-Range` request headers and is
+        sent with `http.response.pathsend` if the ASGI server supports it,
+        so the segment is never read into memory as a whole.
+
+        :param path: The path of the file to serve
+        :param metadata: The metadata of the file
+        :param headers: Additional response headers
+        :return: The streaming response
+        """
+        return FileResponse(path, media_type=metadata.content_type, headers=headers, stat_result=metadata.stat_result)
 
     def get_extension(self, path):
         return os.path.splitext(path)[1]
 
-    def load_file(self, path):
-        t_start=T.time()
+    async def run_io(self, func, *args):
+        """Run a blocking function on the I/O executor without blocking the event loop
+
+        :param func: The blocking function to call
+        :param args: The arguments passed to `func`
+        :return: The return value of `func`
+        """
+        loop=asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
 
-        data=None
+    async def cache_get(self, key):
+        if self.cache is None:
+            return None
+        return await self.cache.get(key)
+
+    async def cache_set(self, key, value):
         if self.cache is not None:
-            data=self.cache.get(path)
-        if data is None:
+            await self.cache.set(key, value)
+
+    async def cache_set_missing(self, key):
+        if self.cache is not None:
+            await self.cache.set_missing(key)
+
+    async def invalidate(self, path):
+        # A replaced segment must not be served from the cache with the metadata of the new file
+        if self.cache is not None:
+            await self.cache.delete(path)
+
+    async def cache_contains(self, key):
+        if self.cache is None:
+            return False
+        return await self.cache.exists(key)
+
+    def read_file(self, path):
+        try:
+            with open(path, 'rb') as file:
+                return file.read()
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+
+    def read_file_timed(self, path):
+        start=T.perf_counter()
+        data=self.read_file(path)
+        return data, T.perf_counter()-start
+
+    async def read_from_disk(self, path):
+        """Read a file on the I/O executor and record the read duration
+
+        :param path: The path of the file
+        :return: The content or `None` if there is no file at `path`
+        """
+        if self.registry is None:
+            return await self.run_io(self.read_file, path)
+        data, duration=await self.run_io(self.read_file_timed, path)
+        self.disk_read_latency.observe(duration)
+        return data
+
+    async def fill(self, path, prefetched=False):
+        data=await self.read_from_disk(path)
+        if data is not None:
+            if prefetched:
+                await self.cache.set_prefetched(path, data)
+            else:
+                await self.cache_set(path, data)
+        else:
+            await self.cache_set_missing(path)
+        return data
+
+    async def prefetch_file(self, path):
+        if await self.cache_contains(path):
+            return
+        await self.single_flight.do(path, self.fill, path, True)
+
+    async def load_file(self, path, scope=None):
+        """Return the content of a file from the cache or from disk
+
+        :param path: The path of the file
+        :param scope: The ASGI scope of the request, the cache result is stored in its `cache` key and its trace is updated
+        :return: The content or `None` if there is no file at `path`
+        """
+        trace=None
+        if scope is not None:
+            trace=scope.get("trace")
+        if trace is not None:
+            trace.enter("cache")
+
+        data=await self.cache_get(path)
+        if data is NOT_FOUND:
+            result="hit"
+            data=None
+        elif data is None:
             logging.debug("Cache miss")
-            try:
-                file=open(path, 'rb')
-                data=file.read()
-            except FileNotFoundError:
-                data=None
-            
-            if self.cache is not None:
-                self.cache.set(path, data)
+            result="miss"
+            if trace is not None:
+                trace.enter("disk")
+            # Concurrent misses for the same path share a single read
+            data=await self.single_flight.do(path, self.fill, path)
         else:
             logging.debug("Cache hit")
+            result="hit"
 
-        delta=T.time()-t_start
-        logging.debug("Response Time \"{}\" {}ms".format(path, delta))
+        if scope is not None:
+            scope["cache"]=result
         return data
 
-    def start(self):
-        asyncio.run(serve(self.app, self.config))
\ No newline at end of file
+    def get_stats(self):
+        """Return the counters of the server and its cache
+
+        :return: A dictionary with the counters of each component
+        """
+        stats={
+            "single_flight": self.single_flight.get_stats(),
+            "stat_cache": self.files.get_stats(),
+            "packs": self.packs.get_stats(),
+        }
+        if self.cache is not None:
+            stats["cache"]=self.cache.get_stats()
+        if self.prefetcher is not None:
+            stats["prefetcher"]=self.prefetcher.get_stats()
+        return stats
+
+    def serve(self, worker=0):
+        if worker > 0:
+            # The first worker warms up the cache for all of them
+            self.warmup=None
+        try:
+            asyncio.run(serve(self.app, self.config))
+        finally:
+            self.executor.shutdown(wait=False)
+            logging.info("Statistics {}".format(json.dumps(self.get_stats())))
+
+    def start(self, workers:int=1):
+        """Serve until interrupted
+
+        With more than one worker, the listening socket is created once and
+        the given number of processes are forked to accept connections on it.
+        The workers only share memory created before, e.g. a `SharedBuffer`.
+
+        :param workers: The number of worker processes
+        """
+        if workers < 2:
+            self.serve()
+            return
+
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("Multiple workers are not supported on this platform")
+
+        family=socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        listener=socket.socket(family, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.host, self.port))
+        listener.set_inheritable(True)
+        self.config.bind=["fd://{}".format(listener.fileno())]
+
+        context=multiprocessing.get_context("fork")
+        processes=[context.Process(target=self.serve, args=(i,), name="dash-worker-{}".format(i)) for i in range(workers)]
+        for process in processes:
+            process.start()
+        logging.info("Started {} workers".format(workers))
+
+        def stop(*_):
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+        signal.signal(signal.SIGTERM, stop)
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            # Workers received the interrupt as well and shut down gracefully
+            for process in processes:
+                process.join()
+        finally:
+            listener.close()
@@ -0,0 +1,83 @@
+from email.utils import formatdate, parsedate_to_datetime
+
+ENCODINGS=["zstd", "br", "gzip"] # In order of preference
+
+def format_http_date(timestamp: float) -> str:
+    """Format a unix timestamp as HTTP date
+
+    :param timestamp: Seconds since the epoch
+    :return: The formatted date, e.g. `Wed, 21 Oct 2015 07:28:00 GMT`
+    """
+    return formatdate(timestamp, usegmt=True)
+
+def parse_etags(header: str) -> list:
+    """Parse the value of an `If-None-Match` or `If-Match` header
+
+    :param header: The header value
+    :return: The listed entity tags without weakness indicator, `["*"]` for a wildcard
+    """
+    etags=[]
+    for etag in header.split(","):
+        etag=etag.strip()
+        if etag.startswith("W/"):
+            etag=etag[2:]
+        if etag:
+            etags.append(etag)
+    return etags
+
+def is_not_modified(headers, etags, last_modified: float = None) -> bool:
+    """Check if a conditional request can be answered with 304 Not Modified
+
+    `If-Modified-Since` is only evaluated if the request has no
+    `If-None-Match` header.
+
+    :param headers: The request headers
+    :param etags: The entity tags identifying the current content
+    :param last_modified: The modification time of the content as unix timestamp
+    :return: `True` if the client already holds the current content, else `False`
+    """
+    header=headers.get("if-none-match")
+    if header is not None:
+        requested=parse_etags(header)
+        return "*" in requested or any(etag in requested for etag in etags)
+
+    header=headers.get("if-modified-since")
+    if header is None or last_modified is None:
+        return False
+    try:
+        since=parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(last_modified) <= since
+
+def select_encoding(header: str, available) -> str:
+    """Select a content coding according to an `Accept-Encoding` header
+
+    Quality values are only considered to exclude codings with `q=0`, among
+    the acceptable codings the one preferred by the server is chosen.
+
+    :param header: The value of the `Accept-Encoding` header or `None`
+    :param available: The codings the content is available in
+    :return: The selected coding or `None` to send the content unencoded
+    """
+    if not header:
+        return None
+
+    accepted=set()
+    for entry in header.split(","):
+        parts=[part.strip() for part in entry.split(";")]
+        coding=parts[0].lower()
+        quality=1.0
+        for parameter in parts[1:]:
+            if parameter.startswith("q="):
+                try:
+                    quality=float(parameter[2:])
+                except ValueError:
+                    quality=0.0
+        if quality > 0:
+            accepted.add(coding)
+
+    for coding in ENCODINGS:
+        if coding in available and (coding in accepted or "*" in accepted):
+            return coding
+    return None
@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+import logging
+import os
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from pointcloudserver.transfer.http import format_http_date
+from pointcloudserver.transfer.single_flight import SingleFlight
+
+class Manifest:
+    """A MPD held in memory together with its precompressed variants"""
+    def __init__(self, data, stat_result):
+        self.mtime=stat_result.st_mtime_ns
+        self.size=stat_result.st_size
+        self.last_modified=format_http_date(stat_result.st_mtime)
+        self.checked=time.monotonic()
+
+        digest=hashlib.sha1(data).hexdigest()
+        self.variants={None: data}
+        self.etags={None: "\"{}\"".format(digest)}
+        for encoding, compress in get_compressors().items():
+            self.variants[encoding]=compress(data)
+            self.etags[encoding]="\"{}-{}\"".format(digest, encoding)
+
+    def is_current(self, stat_result):
+        return self.mtime == stat_result.st_mtime_ns and self.size == stat_result.st_size
+
+def get_compressors():
+    """Return the compression functions of the available content codings
+
+    :return: A dictionary mapping the coding name to its compression function
+    """
+    compressors={"gzip": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressors["br"]=lambda data: brotli.compress(data, quality=11)
+    if zstandard is not None:
+        compressors["zstd"]=lambda data: zstandard.ZstdCompressor(level=19).compress(data)
+    return compressors
+
+class ManifestCache:
+    """Keep the MPDs of all media in memory
+
+    A MPD is read and compressed once and served from memory afterwards.
+    The file is checked for modifications at most every `check_interval`
+    seconds and reloaded if its modification time or size changed.
+    """
+    def __init__(self, run_io, check_interval=1.0, logger=None):
+        """
+        :param run_io: A coroutine function running a blocking function off the event loop
+        :param check_interval: Seconds between two checks of a MPD file for modifications
+        :param logger: An optional logger
+        """
+        self.run_io=run_io
+        self.check_interval=check_interval
+        self.manifests={}
+        self.single_flight=SingleFlight()
+
+        if logger is None:
+            self.logger = logging.getLogger("root")
+        else:
+            self.logger = logger
+
+    def load(self, path, stat_result):
+        with open(path, 'rb') as file:
+            data=file.read()
+        return Manifest(data, stat_result)
+
+    async def get(self, path):
+        """Return the current MPD at `path`
+
+        :param path: The path of the MPD file
+        :return: The MPD or `None` if the file does not exist
+        """
+        manifest=self.manifests.get(path)
+        if manifest is not None and time.monotonic()-manifest.checked < self.check_interval:
+            return manifest
+
+        try:
+            stat_result=await self.run_io(os.stat, path)
+        except (FileNotFoundError, NotADirectoryError):
+            self.manifests.pop(path, None)
+            return None
+
+        if manifest is not None and manifest.is_current(stat_result):
+            manifest.checked=time.monotonic()
+            return manifest
+
+        self.logger.debug("Loading MPD \"{}\"".format(path))
+        try:
+            manifest=await self.single_flight.do(path, self.run_io, self.load, path, stat_result)
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+        self.manifests[path]=manifest
+        return manifest
@@ -0,0 +1,235 @@
+import time as T
+from bisect import bisect_left
+
+CONTENT_TYPE="text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from a memory hit to a slow disk read
+BUCKETS=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def format_labels(names, values, extra=""):
+    labels=",".join("{}=\"{}\"".format(name, escape(value)) for name, value in zip(names, values))
+    if extra:
+        labels=labels+","+extra if labels else extra
+    return "{"+labels+"}" if labels else ""
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """A metric with a value per combination of label values
+
+    Label values are passed as tuple in the order of `labels`, so updating
+    a metric costs a dictionary lookup only.
+    """
+    type="untyped"
+
+    def __init__(self, name, help, labels=()):
+        self.name=name
+        self.help=help
+        self.labels=tuple(labels)
+        self.values={}
+
+    def render(self):
+        lines=["# HELP {} {}".format(self.name, self.help), "# TYPE {} {}".format(self.name, self.type)]
+        for labels, value in self.values.items():
+            lines.append("{}{} {}".format(self.name, format_labels(self.labels, labels), format_value(value)))
+        return lines
+
+class Counter(Metric):
+    type="counter"
+
+    def inc(self, amount=1, labels=()):
+        self.values[labels]=self.values.get(labels, 0)+amount
+
+class Gauge(Metric):
+    type="gauge"
+
+    def set(self, value, labels=()):
+        self.values[labels]=value
+
+    def inc(self, amount=1, labels=()):
+        self.values[labels]=self.values.get(labels, 0)+amount
+
+    def dec(self, amount=1, labels=()):
+        self.values[labels]=self.values.get(labels, 0)-amount
+
+class Histogram(Metric):
+    """A histogram of observed values, e.g. durations in seconds
+
+    Counts are kept per bucket and only accumulated when rendered.
+    """
+    type="histogram"
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets=tuple(sorted(buckets))
+
+    def observe(self, value, labels=()):
+        entry=self.values.get(labels)
+        if entry is None:
+            # One count per bucket plus +Inf, followed by the sum
+            entry=self.values[labels]=[0]*(len(self.buckets)+1)+[0.0]
+        entry[bisect_left(self.buckets, value)]+=1
+        entry[-1]+=value
+
+    def time(self, labels=()):
+        return Timer(self, labels)
+
+    def render(self):
+        lines=["# HELP {} {}".format(self.name, self.help), "# TYPE {} histogram".format(self.name)]
+        for labels, entry in self.values.items():
+            total=0
+            for bound, count in zip(self.buckets+(float("inf"),), entry):
+                total+=count
+                le="le=\"{}\"".format(format_value(bound))
+                lines.append("{}_bucket{} {}".format(self.name, format_labels(self.labels, labels, le), total))
+            lines.append("{}_sum{} {}".format(self.name, format_labels(self.labels, labels), repr(entry[-1])))
+            lines.append("{}_count{} {}".format(self.name, format_labels(self.labels, labels), total))
+        return lines
+
+class Timer:
+    """Context manager observing its duration in a histogram"""
+    def __init__(self, histogram, labels):
+        self.histogram=histogram
+        self.labels=labels
+
+    def __enter__(self):
+        self.start=T.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.histogram.observe(T.perf_counter()-self.start, self.labels)
+
+class RequestMetrics:
+    """ASGI middleware measuring the latency of requests
+
+    The latency is measured until the last part of the response body was
+    sent. Requests are labeled with the path template of the matched route
+    and with the cache result the endpoint stored in the `cache` key of the
+    ASGI scope, if any.
+    """
+    def __init__(self, app, latency, in_flight):
+        """
+        :param app: The ASGI application
+        :param latency: A histogram labeled by route and cache result
+        :param in_flight: A gauge of the requests in progress
+        """
+        self.app=app
+        self.latency=latency
+        self.in_flight=in_flight
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start=T.perf_counter()
+        observed=False
+        self.in_flight.inc()
+
+        def observe():
+            nonlocal observed
+            if observed:
+                return
+            observed=True
+            self.in_flight.dec()
+            route=scope.get("route")
+            path=getattr(route, "path", "unmatched")
+            self.latency.observe(T.perf_counter()-start, (path, scope.get("cache", "none")))
+
+        async def send_observed(message):
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                observe()
+            elif message["type"] == "http.response.pathsend":
+                observe()
+
+        try:
+            await self.app(scope, receive, send_observed)
+        finally:
+            observe()
+
+class Registry:
+    """A collection of metrics rendered in the Prometheus text format
+
+    Besides metrics updated on the hot path, collectors are called on each
+    scrape to export counters that are kept elsewhere anyway.
+    """
+    def __init__(self, prefix=""):
+        self.prefix=prefix
+        self.metrics=[]
+        self.collectors=[]
+
+    def register(self, metric):
+        metric.name=self.prefix+metric.name
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def add_collector(self, collector):
+        """Add a function called on each scrape
+
+        :param collector: A function returning a list of metrics
+        """
+        self.collectors.append(collector)
+
+    def render(self):
+        lines=[]
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            for metric in collector():
+                metric.name=self.prefix+metric.name
+                lines.extend(metric.render())
+        return "\n".join(lines)+"\n"
+
+def collect_stats(stats, counters=()):
+    """Convert nested statistics into metrics
+
+    Every numeric value becomes a metric named after its path, values of
+    lists of statistics, e.g. the tiers of a cache, are labeled by index.
+
+    :param stats: A dictionary of statistics as returned by `get_stats`
+    :param counters: The names of values which only ever increase
+    :return: A list of metrics
+    """
+    metrics={}
+
+    def add(name, value, labels):
+        metric=metrics.get(name)
+        if metric is None:
+            if any(name.endswith(counter) for counter in counters):
+                metric=metrics[name]=Counter(name+"_total", name.replace("_", " "), tuple(label for label, _ in labels))
+            else:
+                metric=metrics[name]=Gauge(name, name.replace("_", " "), tuple(label for label, _ in labels))
+        metric.values[tuple(value for _, value in labels)]=value
+
+    def walk(prefix, stats, labels):
+        for key, value in stats.items():
+            name=prefix+"_"+key if prefix else key
+            if isinstance(value, bool):
+                value=int(value)
+            if isinstance(value, (int, float)):
+                add(name, value, labels)
+            elif isinstance(value, dict):
+                walk(name, value, labels)
+            elif isinstance(value, list):
+                for index, entry in enumerate(value):
+                    if isinstance(entry, dict):
+                        walk(name, entry, labels+(("tier", index),))
+
+    walk("", stats, ())
+    return list(metrics.values())
@@ -0,0 +1,252 @@
+import mmap
+import os
+import shutil
+import struct
+import time
+from collections import OrderedDict
+
+from pointcloudserver.transfer.http import format_http_date
+
+EXTENSION=".pack"
+MAGIC=b"PCPK"
+VERSION=1
+
+HEADER=struct.Struct("<4sIII")
+ENTRY=struct.Struct("<QI")
+
+# Container layout of a packed representation, all integers are unsigned little endian:
+# - The magic bytes "PCPK", the version (32 bit), the number of segments N (32 bit) and the length of the names in bytes (32 bit)
+# - N index entries of the offset of a segment from the start of the file (64 bit) and its size in bytes (32 bit)
+# - The file names of the segments in UTF-8, separated by newlines and sorted
+# - The segments one after another
+def write_container(path: str, names: list, write) -> None:
+    """Write a container segment by segment
+
+    The segments are written after the space reserved for the header, index
+    and names, which are written once the sizes of all segments are known.
+    The container is written next to its final path and renamed once it is
+    complete, so a server never maps a partially written container.
+
+    :param path: The path of the container
+    :param names: The sorted file names of the segments
+    :param write: A function called with the open container and the index of every segment, writing the segment at the current position
+    """
+    if any("\n" in name for name in names):
+        raise ValueError("Segment names of {} must not contain newlines".format(path))
+    names_data="\n".join(names).encode()
+
+    temporary_path=path+".tmp"
+    try:
+        with open(temporary_path, "wb") as container:
+            container.seek(HEADER.size+ENTRY.size*len(names)+len(names_data))
+            index=bytearray()
+            for i in range(len(names)):
+                offset=container.tell()
+                write(container, i)
+                index+=ENTRY.pack(offset, container.tell()-offset)
+            container.seek(0)
+            container.write(HEADER.pack(MAGIC, VERSION, len(names), len(names_data)))
+            container.write(index)
+            container.write(names_data)
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+def pack(directory: str, path: str) -> int:
+    """Pack the segment files of a representation directory into a container
+
+    :param directory: The representation directory
+    :param path: The path of the container
+    :return: The number of packed segments
+    """
+    with os.scandir(directory) as entries:
+        names=sorted(entry.name for entry in entries if entry.is_file())
+
+    def write(container, i):
+        with open(os.path.join(directory, names[i]), "rb") as segment:
+            shutil.copyfileobj(segment, container)
+
+    write_container(path, names, write)
+    return len(names)
+
+def read_index(data) -> list:
+    """Parse the index of a container
+
+    :param data: The container or at least its header, index and names
+    :return: A list of tuples of name, offset and size of every segment
+    """
+    magic, version, count, names_size=HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a segment container of version {}".format(VERSION))
+    names_offset=HEADER.size+ENTRY.size*count
+    names=bytes(data[names_offset:names_offset+names_size]).decode().split("\n") if count > 0 else []
+    entries=[]
+    for i, name in enumerate(names):
+        offset, size=ENTRY.unpack_from(data, HEADER.size+ENTRY.size*i)
+        entries.append((name, offset, size))
+    return entries
+
+def load_index(path: str) -> list:
+    """Read the index of a container without reading its segments
+
+    :param path: The path of the container
+    :return: A list of tuples of name, offset and size of every segment
+    """
+    with open(path, "rb") as container:
+        header=container.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError("{} is too short to be a segment container".format(path))
+        _, _, count, names_size=HEADER.unpack(header)
+        return read_index(header+container.read(ENTRY.size*count+names_size))
+
+def verify(path: str, directory: str) -> None:
+    """Check that a container and a representation directory hold the same segments
+
+    Only names and sizes are compared, so a directory can be removed after
+    packing it or a container after unpacking it without reading the segments.
+
+    :param path: The path of the container
+    :param directory: The representation directory
+    :raises ValueError: If a segment is missing on one side or differs in size
+    """
+    with os.scandir(directory) as entries:
+        files={entry.name: entry.stat().st_size for entry in entries if entry.is_file()}
+    segments={name: size for name, _, size in load_index(path)}
+    if files != segments:
+        names=sorted(name for name in files.keys() | segments.keys() if files.get(name) != segments.get(name))
+        raise ValueError("{} and {} differ in {} segments, e.g. {}".format(path, directory, len(names), names[0]))
+
+def unpack(path: str, directory: str) -> int:
+    """Write the segments of a container into a representation directory
+
+    :param path: The path of the container
+    :param directory: The representation directory, created if needed
+    :return: The number of unpacked segments
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "rb") as container:
+        with mmap.mmap(container.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            entries=read_index(data)
+            for name, offset, size in entries:
+                with open(os.path.join(directory, name), "wb") as segment:
+                    segment.write(data[offset:offset+size])
+    return len(entries)
+
+class PackedRepresentation:
+    """A container mapped into memory, whose segments are served as slices of the mapping
+
+    Slices are `memoryview` objects, so segments are not copied until they
+    are written to a socket and the kernel keeps the pages cached for all
+    workers mapping the container.
+    """
+    def __init__(self, path, stat_result):
+        """
+        :param path: The path of the container
+        :param stat_result: The `os.stat` result of the container
+        """
+        self.path=path
+        self.mtime=stat_result.st_mtime_ns
+        self.size=stat_result.st_size
+        self.modified=stat_result.st_mtime
+        self.last_modified=format_http_date(stat_result.st_mtime)
+        with open(path, "rb") as container:
+            # The mapping stays valid after the file is closed
+            self.data=mmap.mmap(container.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view=memoryview(self.data)
+        entries=read_index(self.data)
+        self.names=[name for name, _, _ in entries]
+        self.entries={name: (i, offset, size) for i, (name, offset, size) in enumerate(entries)}
+
+    def is_current(self, stat_result):
+        return self.mtime == stat_result.st_mtime_ns and self.size == stat_result.st_size
+
+    def get_etag(self, name):
+        """Return the entity tag of a segment, which changes whenever the container changes"""
+        return "\"{:x}-{:x}-{:x}\"".format(self.size, self.mtime, self.entries[name][0])
+
+    def get(self, name):
+        """Return a segment
+
+        :param name: The file name of the segment
+        :return: A `memoryview` of the segment or `None` if it is not in the container
+        """
+        entry=self.entries.get(name)
+        if entry is None:
+            return None
+        _, offset, size=entry
+        if hasattr(mmap, "MADV_WILLNEED") and size > 0:
+            # Start reading cold pages before the response is written
+            start=offset-offset%mmap.PAGESIZE
+            self.data.madvise(mmap.MADV_WILLNEED, start, offset+size-start)
+        return self.view[offset:offset+size]
+
+    def get_range(self, first, count):
+        """Return the names of `count` consecutive segments starting at `first`
+
+        :return: The segment names or `None` if `first` is not in the container
+        """
+        entry=self.entries.get(first)
+        if entry is None:
+            return None
+        return self.names[entry[0]:entry[0]+count]
+
+class PackCache:
+    """Keep the containers of packed representations mapped
+
+    Whether a representation is packed is remembered for `check_interval`
+    seconds, so requests for unpacked media do not stat a container each
+    time. A container is mapped again once its modification time or size
+    changed, e.g. because it was packed again.
+    """
+    def __init__(self, run_io, check_interval=1.0, max_entries=10000):
+        """
+        :param run_io: A coroutine function running a blocking function off the event loop
+        :param check_interval: Seconds between two checks of a container for modifications
+        :param max_entries: The number of representation directories to remember
+        """
+        self.run_io=run_io
+        self.check_interval=check_interval
+        self.max_entries=max_entries
+        self.entries=OrderedDict()
+
+    def open(self, path, packed):
+        try:
+            stat_result=os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if packed is not None and packed.is_current(stat_result):
+            return packed
+        # Mappings of replaced containers are released once no response uses them anymore
+        return PackedRepresentation(path, stat_result)
+
+    async def get(self, directory):
+        """Return the container of a representation
+
+        :param directory: The representation directory the URLs refer to, the container is this path with the extension `.pack`
+        :return: The `PackedRepresentation` or `None` if the representation is not packed
+        """
+        entry=self.entries.get(directory)
+        now=time.monotonic()
+        if entry is not None and now-entry[1] < self.check_interval:
+            self.entries.move_to_end(directory)
+            return entry[0]
+
+        packed=await self.run_io(self.open, directory+EXTENSION, entry[0] if entry is not None else None)
+        self.entries[directory]=(packed, now)
+        self.entries.move_to_end(directory)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return packed
+
+    def get_stats(self):
+        """Return the number of mapped containers
+
+        :return: A dictionary with the number of containers and their total size in bytes
+        """
+        containers=[packed for packed, _ in self.entries.values() if packed is not None]
+        return {
+            "items": len(containers),
+            "size": sum(packed.size for packed in containers),
+        }
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import re
+from collections import OrderedDict
+
+SEGMENT_PATTERN=re.compile(r"^(\d+)(\..+)$")
+
+class BoundedSet:
+    """A set forgetting its oldest entries once `max_size` is exceeded"""
+    def __init__(self, max_size=64):
+        self.max_size=max_size
+        self.entries=OrderedDict()
+
+    def add(self, entry):
+        self.entries[entry]=None
+        self.entries.move_to_end(entry)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def __contains__(self, entry):
+        return entry in self.entries
+
+class Prefetcher:
+    """Prefetch the next segments of sequentially played representations
+
+    Segments are expected to be named by their zero padded number, e.g.
+    `00000001.drc`. Once segment N of a representation is requested after
+    segment N-1, the next `segments` segments are loaded in the background.
+    Several clients playing the same representation at different positions
+    are detected independently.
+
+    Prefetching never evicts cached segments: the segments loaded at once
+    are limited by the free space of the cache minus the segments still
+    being loaded.
+    """
+    def __init__(self, prefetch, segments=4, max_size=None, get_free_size=None, logger=None):
+        """
+        :param prefetch: A coroutine function loading the segment at a path into the cache
+        :param segments: The number of segments to prefetch
+        :param max_size: The number of bytes one prefetch may load at most, unlimited if `None`
+        :param get_free_size: A function returning the free bytes of the cache or `None` if unknown
+        :param logger: An optional logger
+        """
+        self.prefetch=prefetch
+        self.segments=segments
+        self.max_size=max_size
+        self.get_free_size=get_free_size
+
+        if logger is None:
+            self.logger = logging.getLogger("root")
+        else:
+            self.logger = logger
+
+        self.requested={} # (name, representation) -> recently requested numbers
+        self.scheduled={} # (name, representation) -> recently prefetched numbers
+        self.tasks={} # task -> bytes expected to be loaded
+
+        self.prefetched=0
+
+    def notify(self, name, representation, segment, path, size):
+        """Register a segment request and start prefetching if it continues a sequence
+
+        :param name: The name of the media
+        :param representation: The representation of the segment
+        :param segment: The file name of the segment
+        :param path: The path of the segment on disk
+        :param size: The size of the segment in bytes
+        """
+        match=SEGMENT_PATTERN.match(segment)
+        if match is None:
+            return
+        number=int(match.group(1))
+        width=len(match.group(1))
+        extension=match.group(2)
+
+        key=(name, representation)
+        requested=self.requested.setdefault(key, BoundedSet())
+        scheduled=self.scheduled.setdefault(key, BoundedSet(max_size=64+self.segments))
+        sequential=number-1 in requested
+        requested.add(number)
+        if not sequential:
+            return
+
+        count=self.segments
+        if size > 0:
+            if self.max_size is not None:
+                count=min(count, int(self.max_size//size))
+            free_size=self.get_free_size() if self.get_free_size is not None else None
+            if free_size is not None:
+                count=min(count, max(0, int((free_size-sum(self.tasks.values()))//size)))
+
+        directory=path[:-len(segment)]
+        for next_number in range(number+1, number+1+count):
+            if next_number in scheduled:
+                continue
+            scheduled.add(next_number)
+            next_path=directory+str(next_number).zfill(width)+extension
+            self.start(next_path, size)
+
+    def start(self, path, size=0):
+        self.prefetched+=1
+        task=asyncio.ensure_future(self.prefetch(path))
+        self.tasks[task]=size
+        task.add_done_callback(self.done)
+
+    def done(self, task):
+        self.tasks.pop(task, None)
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.warning("Prefetching failed: {}".format(task.exception()))
+
+    def get_stats(self):
+        """Return the counters of the prefetcher
+
+        :return: A dictionary with the number of prefetched and running prefetches
+        """
+        return {
+            "prefetched": self.prefetched,
+            "running": len(self.tasks),
+        }
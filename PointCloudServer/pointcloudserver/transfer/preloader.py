@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import os
+import time as T
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+from pointcloudserver.dash.mpd import get_period_segments
+
+class Preloader:
+    """Load prepared media into a shared cache before it is requested
+
+    Segments are loaded in the order they are likely needed: the segments of
+    the first periods of all media first and within a period the smallest,
+    i.e. lowest quality, representations first. Files are read by a pool of
+    threads, while the previous batch is written to the cache.
+
+    Segments are stored under the same keys the DASH server uses, so the
+    media directory has to be given exactly as it is passed to the server.
+    """
+    def __init__(self, cache, media_path, periods=0, budget=0, batch_size=64, io_workers=8, logger=None):
+        """
+        :param cache: The cache to load the segments into
+        :param media_path: The directory where media can be found
+        :param periods: The number of periods to load per media, all if 0
+        :param budget: The total number of bytes to load, unlimited if 0
+        :param batch_size: The number of segments written to the cache at once
+        :param io_workers: The number of threads reading files in parallel
+        :param logger: An optional logger
+        """
+        self.cache=cache
+        self.media_path=media_path
+        self.periods=periods
+        self.budget=budget
+        self.batch_size=batch_size
+        self.io_workers=io_workers
+
+        if logger is None:
+            self.logger = logging.getLogger("root")
+        else:
+            self.logger = logger
+
+    def get_media(self):
+        media=[]
+        for entry in sorted(os.listdir(self.media_path)):
+            if os.path.isdir(os.path.join(self.media_path, entry)):
+                media.append(entry)
+        return media
+
+    def get_segments(self, name):
+        """Return the segments of a media with their period
+
+        The segments are listed in the `mpd.xml` of the media. Without one,
+        every folder of the media is a representation and the n-th file of
+        each folder belongs to the n-th period.
+
+        :param name: The name of the media
+        :return: A list of tuples of period index, size in bytes and path
+        """
+        media_path=os.path.join(self.media_path, name)
+        mpd_path=os.path.join(media_path, "mpd.xml")
+        if os.path.isfile(mpd_path):
+            return self.get_segments_from_mpd(media_path, mpd_path)
+        return self.get_segments_from_folders(media_path)
+
+    def get_segments_from_mpd(self, media_path, mpd_path):
+        root=ET.parse(mpd_path).getroot()
+        segments=[]
+        for index, urls in enumerate(get_period_segments(root, periods=self.periods or None)):
+            for url, size in urls:
+                segments.append((index, size, os.path.join(media_path, url)))
+        return segments
+
+    def get_segments_from_folders(self, media_path):
+        segments=[]
+        for directory, _, files in os.walk(media_path):
+            if directory == media_path:
+                continue
+            for index, file in enumerate(sorted(files)[:self.periods or None]):
+                path=os.path.join(directory, file)
+                segments.append((index, os.path.getsize(path), path))
+        return segments
+
+    def plan(self, media=None):
+        """Return the segments to load in the order they should be loaded
+
+        :param media: The names of the media to load, all if `None`
+        :return: A list of tuples of path and size in bytes
+        """
+        if media is None:
+            media=self.get_media()
+
+        segments=[]
+        for name in media:
+            try:
+                segments.extend(self.get_segments(name))
+            except (OSError, ET.ParseError, ValueError) as e:
+                self.logger.warning("Skipping preload of \"{}\": {}".format(name, e))
+        segments.sort(key=lambda segment: (segment[0], segment[1]))
+
+        planned=[]
+        total=0
+        for _, size, path in segments:
+            if self.budget and total+size > self.budget:
+                break
+            total+=size
+            planned.append((path, size))
+        return planned
+
+    def read_file(self, path):
+        try:
+            with open(path, 'rb') as file:
+                return file.read()
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+
+    async def run(self, media=None):
+        """Load the planned segments into the cache
+
+        The segments and bytes are counted once they were read, while writes
+        to the cache fail without raising. Failed writes are reported as
+        errors of the cache, which are counted next to the totals.
+
+        :param media: The names of the media to load, all if `None`
+        :return: A dictionary with the number of loaded segments and bytes and the errors of the cache meanwhile
+        """
+        t_start=T.time()
+        errors=self.get_errors()
+        loop=asyncio.get_running_loop()
+        executor=ThreadPoolExecutor(max_workers=self.io_workers)
+        try:
+            segments=await loop.run_in_executor(executor, self.plan, media)
+            self.logger.info("Preloading {} segments ({} MB)".format(len(segments), round(sum(size for _, size in segments)/1024/1024, 1)))
+
+            loaded=0
+            loaded_bytes=0
+            writing=None
+            step=max(1, len(segments)//self.batch_size//10)
+            for batch_index, start in enumerate(range(0, len(segments), self.batch_size)):
+                paths=[path for path, _ in segments[start:start+self.batch_size]]
+                values=await asyncio.gather(*[loop.run_in_executor(executor, self.read_file, path) for path in paths])
+                items=[(path, value) for path, value in zip(paths, values) if value is not None]
+
+                # Read the next batch while the previous one is written
+                if writing is not None:
+                    await writing
+                writing=asyncio.ensure_future(self.cache.set_many(items))
+
+                loaded+=len(items)
+                loaded_bytes+=sum(len(value) for _, value in items)
+                if batch_index%step == 0:
+                    self.logger.info("Preloaded {}/{} segments".format(loaded, len(segments)))
+            if writing is not None:
+                await writing
+        finally:
+            executor.shutdown(wait=False)
+
+        delta=T.time()-t_start
+        errors=self.get_errors()-errors
+        self.logger.info("Preloaded {} segments ({} MB) in {}s".format(loaded, round(loaded_bytes/1024/1024, 1), round(delta, 2)))
+        if errors > 0:
+            self.logger.warning("{} cache errors while preloading, not all segments were stored".format(errors))
+        return {"segments": loaded, "bytes": loaded_bytes, "seconds": delta, "errors": errors}
+
+    def get_errors(self):
+        return self.cache.get_stats().get("errors", 0)
@@ -0,0 +1,65 @@
+import os
+import sys
+import threading
+from collections import Counter
+
+class SamplingProfiler:
+    """A wall clock profiler sampling the stacks of all threads
+
+    A background thread periodically records the stack of every other
+    thread. The result is written in the collapsed stack format, one line
+    of semicolon separated frames and the number of samples per stack,
+    which flame graph tools like speedscope or flamegraph.pl read directly.
+    """
+    def __init__(self, interval=0.005):
+        """
+        :param interval: Seconds between two samples
+        """
+        self.interval=interval
+        self.samples=Counter()
+        self.sample_count=0
+        self.thread=None
+        self.stopped=threading.Event()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            raise RuntimeError("Profiler is already running")
+        self.samples=Counter()
+        self.sample_count=0
+        self.stopped.clear()
+        self.thread=threading.Thread(target=self.run, name="profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        own=threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names={thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                self.samples[self.get_stack(names.get(ident, str(ident)), frame)]+=1
+            self.sample_count+=1
+
+    def get_stack(self, thread_name, frame):
+        frames=[]
+        while frame is not None:
+            code=frame.f_code
+            frames.append("{} ({}:{})".format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+            frame=frame.f_back
+        frames.append(thread_name)
+        return ";".join(reversed(frames))
+
+    def collapse(self):
+        """Return the samples in the collapsed stack format
+
+        :return: One line per stack with the number of samples
+        """
+        return "".join("{} {}\n".format(stack, count) for stack, count in self.samples.most_common())
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import threading
+
+import redis.asyncio
+from redis.exceptions import RedisError
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from pointcloudserver.transfer.cache import NOT_FOUND, Cache
+
+# Every value is prefixed by one byte describing how it is stored
+RAW=b"\x00"
+ZSTD=b"\x01"
+NEGATIVE=b"\x02"
+
+class RedisCache(Cache):
+    """A cache in a redis server shared by several DASH servers
+
+    Requests use a pool of connections of an asynchronous client, so they
+    never block the event loop. Values are compressed and decompressed on
+    the executor of the server. Writes are sent in the background, so a
+    request filling the cache does not wait for redis. Writes issued while
+    a previous write is in flight, e.g. by the prefetcher, are collected
+    and sent in a single pipeline. Files found missing are stored as
+    negative entries, so requests for them do not reach the disk of every
+    server either.
+    """
+    def __init__(self, host="127.0.0.1", port=6379, db=0, prefix="pointcloudserver:", max_connections=32, ttl=0, negative_ttl=5, compression=None, compression_level=3, client=None, logger=None):
+        """
+        :param host: The host of the redis server
+        :param port: The port of the redis server
+        :param db: The database to use
+        :param prefix: A prefix added to every key
+        :param max_connections: The size of the connection pool
+        :param ttl: Seconds until a cached segment expires, never if 0
+        :param negative_ttl: Seconds until a negative entry expires, negative entries are disabled if 0
+        :param compression: The compression of stored values, one of `None` or `zstd`
+        :param compression_level: The zstd compression level
+        :param client: A client to use instead of creating one, e.g. for testing
+        :param logger: An optional logger
+        """
+        if logger is None:
+            self.logger = logging.getLogger("root")
+        else:
+            self.logger = logger
+
+        if client is None:
+            pool=redis.asyncio.BlockingConnectionPool(host=host, port=port, db=db, max_connections=max_connections)
+            client=redis.asyncio.Redis(connection_pool=pool)
+        self.client=client
+        self.prefix=prefix
+        self.ttl=ttl
+        self.negative_ttl=negative_ttl
+        self.configured=False
+
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("Compression \"zstd\" requires the package zstandard")
+        if compression not in (None, "zstd"):
+            raise ValueError("Unknown compression \"{}\"".format(compression))
+        self.compression=compression
+        self.compression_level=compression_level
+        # zstd contexts must not be shared by threads
+        self.contexts=threading.local()
+        self.run_io=None
+
+        self.pending=[]
+        self.flusher=None
+        self.tasks=set()
+
+        self.hits=0
+        self.misses=0
+        self.negative_hits=0
+        self.errors=0
+        self.pipelines=0
+        self.stored_bytes=0
+        self.raw_bytes=0
+
+        self.logger.info("Initialized redis cache at {}:{}".format(host, port))
+
+    def set_executor(self, run_io):
+        self.run_io=run_io
+
+    async def run_blocking(self, func, *args):
+        if self.run_io is None:
+            return func(*args)
+        return await self.run_io(func, *args)
+
+    def compress(self, value):
+        compressor=getattr(self.contexts, "compressor", None)
+        if compressor is None:
+            compressor=self.contexts.compressor=zstandard.ZstdCompressor(level=self.compression_level)
+        compressed=compressor.compress(value)
+        if len(compressed) < len(value):
+            return ZSTD+compressed
+        return RAW+value
+
+    def decompress(self, data):
+        decompressor=getattr(self.contexts, "decompressor", None)
+        if decompressor is None:
+            decompressor=self.contexts.decompressor=zstandard.ZstdDecompressor()
+        return decompressor.decompress(data[1:])
+
+    async def encode(self, value):
+        if self.compression == "zstd":
+            return await self.run_blocking(self.compress, value)
+        return RAW+value
+
+    async def decode(self, data):
+        kind=data[:1]
+        if kind == RAW:
+            return data[1:]
+        if kind == ZSTD:
+            return await self.run_blocking(self.decompress, data)
+        if kind == NEGATIVE:
+            return NOT_FOUND
+        raise ValueError("Unknown value format {}".format(kind))
+
+    async def configure(self):
+        # The server may be shared with other applications, its limits are only reported
+        self.configured=True
+        try:
+            config=await self.client.config_get("maxmemory*")
+        except RedisError as e:
+            self.logger.info("Could not read the memory limit of redis: {}".format(e))
+            return
+        config={(k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v) for k, v in config.items()}
+        max_memory=int(config.get("maxmemory", 0))
+        policy=config.get("maxmemory-policy")
+        self.logger.info("Redis memory limit {} MB, eviction policy {}".format(round(max_memory/1024/1024), policy))
+        if max_memory == 0 or policy == "noeviction":
+            self.logger.warning("Redis does not evict segments once its memory is full, start it with --maxmemory and --maxmemory-policy allkeys-lru")
+
+    async def get(self, key):
+        if not self.configured:
+            await self.configure()
+        try:
+            data=await self.client.get(self.prefix+key)
+        except RedisError as e:
+            self.errors+=1
+            self.logger.warning("Redis get failed: {}".format(e))
+            return None
+
+        if data is None:
+            self.misses+=1
+            return None
+        value=await self.decode(data)
+        if value is NOT_FOUND:
+            self.negative_hits+=1
+        else:
+            self.hits+=1
+        return value
+
+    async def set(self, key, value):
+        """Store a value in the background
+
+        The value is encoded and written once this returns, `drain` waits
+        for the write.
+        """
+        if key is None or value is None:
+            return
+        task=asyncio.ensure_future(self.store(key, value))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def store(self, key, value):
+        await self.enqueue(key, await self.encode(value), self.ttl, len(value))
+
+    async def set_many(self, items):
+        """Store several values in a single pipeline and wait until it was sent
+
+        :param items: An iterable of tuples of key and value
+        """
+        items=[(key, value) for key, value in items if key is not None and value is not None]
+        encoded=await asyncio.gather(*[self.encode(value) for _, value in items])
+        futures=[self.enqueue(key, data, self.ttl, len(value)) for (key, value), data in zip(items, encoded)]
+        await asyncio.gather(*futures)
+
+    async def set_missing(self, key):
+        """Store a negative entry for a key whose file does not exist in the background
+
+        :param key: The key of the missing file
+        """
+        if self.negative_ttl > 0:
+            self.enqueue(key, NEGATIVE, self.negative_ttl, 0)
+
+    async def drain(self):
+        """Wait until all writes started so far were sent"""
+        while self.tasks:
+            await asyncio.gather(*self.tasks)
+        if self.flusher is not None:
+            await self.flusher
+
+    def enqueue(self, key, data, ttl, raw_size):
+        """Add a write to the next pipeline
+
+        :return: A future resolved once the pipeline was sent
+        """
+        future=asyncio.get_running_loop().create_future()
+        self.pending.append((self.prefix+key, data, ttl, raw_size, future))
+        if self.flusher is None or self.flusher.done():
+            self.flusher=asyncio.ensure_future(self.flush())
+        return future
+
+    async def flush(self):
+        """Send pending writes in pipelines until none are left"""
+        while self.pending:
+            batch=self.pending
+            self.pending=[]
+
+            pipeline=self.client.pipeline(transaction=False)
+            for key, data, ttl, _, _ in batch:
+                pipeline.set(key, data, ex=ttl if ttl > 0 else None)
+            try:
+                await pipeline.execute()
+                self.pipelines+=1
+                for _, data, _, raw_size, _ in batch:
+                    self.stored_bytes+=len(data)
+                    self.raw_bytes+=raw_size
+            except RedisError as e:
+                self.errors+=1
+                self.logger.warning("Redis write of {} keys failed: {}".format(len(batch), e))
+
+            for _, _, _, _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+    async def exists(self, key):
+        try:
+            return await self.client.exists(self.prefix+key) > 0
+        except RedisError as e:
+            self.errors+=1
+            self.logger.warning("Redis exists failed: {}".format(e))
+            return False
+
+    async def delete(self, key):
+        try:
+            await self.client.delete(self.prefix+key)
+        except RedisError as e:
+            self.errors+=1
+            self.logger.warning("Redis delete failed: {}".format(e))
+
+    def get_stats(self):
+        """Return the counters of the cache
+
+        :return: A dictionary with hit, miss, error and byte counters
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "negative_hits": self.negative_hits,
+            "errors": self.errors,
+            "pipelines": self.pipelines,
+            "stored_bytes": self.stored_bytes,
+            "raw_bytes": self.raw_bytes,
+        }
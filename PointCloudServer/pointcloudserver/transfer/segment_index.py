@@ -0,0 +1,60 @@
+import os
+import time
+from bisect import bisect_left
+
+class Listing:
+    """The sorted file names of a representation directory"""
+    def __init__(self, names, mtime):
+        self.names=names
+        self.mtime=mtime
+        self.checked=time.monotonic()
+
+class SegmentIndex:
+    """Keep the sorted segment names of representation directories in memory
+
+    A directory is checked for modifications at most every `check_interval`
+    seconds and listed again if its modification time changed, e.g. because
+    new segments were written.
+    """
+    def __init__(self, run_io, check_interval=1.0):
+        """
+        :param run_io: A coroutine function running a blocking function off the event loop
+        :param check_interval: Seconds between two checks of a directory for modifications
+        """
+        self.run_io=run_io
+        self.check_interval=check_interval
+        self.listings={}
+
+    def list(self, directory, listing):
+        try:
+            mtime=os.stat(directory).st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if listing is not None and listing.mtime == mtime:
+            listing.checked=time.monotonic()
+            return listing
+
+        with os.scandir(directory) as entries:
+            names=sorted(entry.name for entry in entries if entry.is_file())
+        return Listing(names, mtime)
+
+    async def get_range(self, directory, first, count):
+        """Return the names of `count` consecutive segments starting at `first`
+
+        :param directory: The representation directory
+        :param first: The file name of the first segment
+        :param count: The maximum number of segments
+        :return: The segment names or `None` if `first` does not exist
+        """
+        listing=self.listings.get(directory)
+        if listing is None or time.monotonic()-listing.checked >= self.check_interval:
+            listing=await self.run_io(self.list, directory, listing)
+            if listing is None:
+                self.listings.pop(directory, None)
+                return None
+            self.listings[directory]=listing
+
+        index=bisect_left(listing.names, first)
+        if index == len(listing.names) or listing.names[index] != first:
+            return None
+        return listing.names[index:index+count]
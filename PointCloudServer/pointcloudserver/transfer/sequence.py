@@ -0,0 +1,114 @@
+import os
+
+import numpy as np
+
+from pointcloudserver.transfer.pack import PackedRepresentation, write_container
+from pointcloudserver.transfer.wire import get_frame_size, serialize_into
+
+FRAME_EXTENSIONS={".ply", ".drc", ".bin"}
+
+def load_frame(path: str) -> tuple:
+    """Load a recorded point cloud with the serializers of pointcloudtool
+
+    Point clouds without colors are white, Velodyne scans are colored by
+    their remission.
+
+    :param path: The path of a PLY, DRC or Velodyne bin file
+    :return: A tuple of the points and their colors as arrays of shape (N, 3)
+    """
+    try:
+        from pointcloudtool.io import COLORS, POINTS, REMISSION, PointCloudSerializerFactory
+    except ImportError as e:
+        raise ImportError("Loading point clouds needs pointcloudtool, install it from PointCloudAuxiliaries/PointCloudTool") from e
+
+    pointcloud=PointCloudSerializerFactory().create_from_path(path).load(path)
+    xyz=pointcloud.filter(POINTS).to_numpy()
+    if set(COLORS).issubset(pointcloud.columns):
+        rgb=pointcloud.filter(COLORS).to_numpy()
+    elif set(REMISSION).issubset(pointcloud.columns):
+        rgb=np.repeat(np.clip(pointcloud.filter(REMISSION).to_numpy()*255, 0, 255), 3, axis=1)
+    else:
+        rgb=np.full((len(xyz), 3), 255, dtype=np.uint8)
+    return xyz, rgb
+
+def find_frames(directory: str) -> list:
+    """Return the file names of the point clouds of a sequence in playback order"""
+    with os.scandir(directory) as entries:
+        return sorted(entry.name for entry in entries if entry.is_file() and os.path.splitext(entry.name)[1] in FRAME_EXTENSIONS)
+
+def encode_sequence(directory: str, path: str, scale: float = 1.0, load=load_frame) -> int:
+    """Convert a recorded sequence into a container of frames in the wire format of the socket server
+
+    Coordinates are multiplied with `scale` and clamped to the range of 16
+    bit integers. Every frame is loaded, converted and written on its own,
+    so sequences larger than the memory can be converted.
+
+    :param directory: The directory with one point cloud file per frame
+    :param path: The path of the container
+    :param scale: The factor converting coordinates to units of the wire format, e.g. 1000 for millimeters from meters
+    :param load: A function loading a frame from a path as tuple of points and colors
+    :return: The number of frames
+    """
+    names=find_frames(directory)
+    if len(names) == 0:
+        raise ValueError("{} contains no PLY, DRC or Velodyne bin files".format(directory))
+    buffer=bytearray()
+
+    def write(container, i):
+        nonlocal buffer
+        xyz, rgb=load(os.path.join(directory, names[i]))
+        xyz=np.clip(np.asarray(xyz)*scale, np.iinfo(np.int16).min, np.iinfo(np.int16).max)
+        size=get_frame_size(len(xyz))
+        if len(buffer) < size:
+            buffer=bytearray(size)
+        serialize_into(buffer, xyz, rgb)
+        container.write(memoryview(buffer)[:size])
+
+    write_container(path, names, write)
+    return len(names)
+
+class RecordedSequence:
+    """A sequence of frames encoded with `encode_sequence`, served from a memory mapping
+
+    Frames are already in the wire format, serving one only slices the
+    mapping. Playback is paced by time: a client receives the frame that is
+    due since its playback started, independent of how often it asks.
+    """
+    def __init__(self, path, fps=30, loop=False):
+        """
+        :param path: The path of the container
+        :param fps: The frame rate of the playback
+        :param loop: Start over at the first frame after the last one
+        """
+        self.packed=PackedRepresentation(path, os.stat(path))
+        if len(self.packed.names) == 0:
+            raise ValueError("{} contains no frames".format(path))
+        self.fps=fps
+        self.loop=loop
+
+    def __len__(self):
+        return len(self.packed.names)
+
+    def get_index(self, elapsed):
+        """Return the index of the frame due at a point of the playback
+
+        :param elapsed: Seconds since the start of the playback
+        :return: The frame index or `None` once a sequence without looping ended
+        """
+        index=int(elapsed*self.fps)
+        if index >= len(self):
+            if not self.loop:
+                return None
+            index%=len(self)
+        return index
+
+    def get(self, elapsed):
+        """Return the frame due at a point of the playback
+
+        :param elapsed: Seconds since the start of the playback
+        :return: A `memoryview` of the serialized frame or `None` once a sequence without looping ended
+        """
+        index=self.get_index(elapsed)
+        if index is None:
+            return None
+        return self.packed.get(self.packed.names[index])
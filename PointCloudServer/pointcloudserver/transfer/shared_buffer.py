@@ -0,0 +1,177 @@
+import hashlib
+import logging
+import mmap
+import multiprocessing
+import struct
+
+HEADER=struct.Struct("<Q") # Absolute write position in the log
+SLOT=struct.Struct("<16sQI4x") # Key digest, position and length of the value
+RECORD=struct.Struct("<16sI4x") # Key digest and length preceding each value
+EMPTY=bytes(16)
+DELETED=2**63 # Position of deleted values, never valid
+MAX_PROBES=32
+
+def align(size, alignment=8):
+    return (size+alignment-1)//alignment*alignment
+
+class SharedBuffer:
+    """A cache shared by processes forked after its creation
+
+    Values are appended to a circular log in an anonymous shared memory
+    mapping. Once the log wraps around, new values overwrite the oldest
+    ones, so eviction is first in first out and needs no bookkeeping. A
+    hash table in the same mapping maps the digest of each key to the
+    position of its value in the log.
+
+    Writers are serialized by a lock. Readers do not lock, they check that
+    the value was not overwritten while it was copied instead.
+    """
+    def __init__(self, logger=None, max_size=512, slots=None):
+        """
+        :param logger: An optional logger
+        :param max_size: The size of the log in MB
+        :param slots: The number of hash table slots, one per 16 kB of log if `None`
+        """
+        self.max_size=int(max_size*1024*1024) # in bytes
+        self.slots=slots if slots is not None else max(1024, self.max_size//(16*1024))
+
+        if logger is None:
+            self.logger = logging.getLogger("root")
+        else:
+            self.logger = logger
+
+        self.table_offset=HEADER.size
+        self.log_offset=align(self.table_offset+self.slots*SLOT.size)
+        self.memory=mmap.mmap(-1, self.log_offset+self.max_size)
+        self.lock=multiprocessing.Lock()
+
+        # Counters are kept per process
+        self.hits=0
+        self.misses=0
+
+        self.logger.info("Initialized shared buffer with {} Mb size limit".format(max_size))
+
+    def digest(self, key):
+        return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+    def get_head(self):
+        return HEADER.unpack_from(self.memory, 0)[0]
+
+    def is_valid(self, position, size, head):
+        # Values older than one log length are overwritten
+        return head-self.max_size <= position and position+size <= head
+
+    def probe(self, digest):
+        start=int.from_bytes(digest[:8], "little")%self.slots
+        for i in range(MAX_PROBES):
+            yield (start+i)%self.slots
+
+    def find(self, digest, head):
+        """Return the slot and the position and length of the value of `digest`
+
+        :return: A tuple of slot, position and length or `None` if not found
+        """
+        for slot in self.probe(digest):
+            slot_digest, position, length=SLOT.unpack_from(self.memory, self.table_offset+slot*SLOT.size)
+            if slot_digest == EMPTY:
+                return None
+            if slot_digest == digest:
+                if not self.is_valid(position, RECORD.size+length, head):
+                    return None
+                return slot, position, length
+        return None
+
+    def get(self, key):
+        digest=self.digest(key)
+        found=self.find(digest, self.get_head())
+        if found is None:
+            self.misses+=1
+            return None
+
+        _, position, length=found
+        offset=self.log_offset+position%self.max_size
+        record_digest, record_length=RECORD.unpack_from(self.memory, offset)
+        value=self.memory[offset+RECORD.size:offset+RECORD.size+length]
+
+        # The value is only intact if no writer reused its space meanwhile
+        if record_digest != digest or record_length != length or not self.is_valid(position, RECORD.size+length, self.get_head()):
+            self.misses+=1
+            return None
+        self.hits+=1
+        return value
+
+    def set(self, key, value, prefetched=False):
+        # Eviction is first in first out, prefetched values are stored like any other
+        if key is None or value is None:
+            return
+
+        size=align(RECORD.size+len(value))
+        if size > self.max_size:
+            self.logger.error("Size of value for key \"{}\" is to large ({})".format(key, len(value)))
+            return
+
+        digest=self.digest(key)
+        with self.lock:
+            head=self.get_head()
+            position=head
+            if position%self.max_size+size > self.max_size:
+                # Values are never split, skip the rest of the log
+                position+=self.max_size-position%self.max_size
+
+            # Invalidate the overwritten values before overwriting them
+            HEADER.pack_into(self.memory, 0, position+size)
+            offset=self.log_offset+position%self.max_size
+            RECORD.pack_into(self.memory, offset, digest, len(value))
+            self.memory[offset+RECORD.size:offset+RECORD.size+len(value)]=value
+
+            slot=self.find_free_slot(digest, position+size)
+            SLOT.pack_into(self.memory, self.table_offset+slot*SLOT.size, digest, position, len(value))
+
+    def find_free_slot(self, digest, head):
+        """Return the slot of `digest`, a free slot or the slot with the oldest value"""
+        oldest=None
+        oldest_position=None
+        for slot in self.probe(digest):
+            slot_digest, position, length=SLOT.unpack_from(self.memory, self.table_offset+slot*SLOT.size)
+            if slot_digest == EMPTY or slot_digest == digest:
+                return slot
+            if not self.is_valid(position, RECORD.size+length, head):
+                return slot
+            if oldest_position is None or position < oldest_position:
+                oldest=slot
+                oldest_position=position
+        return oldest
+
+    def delete(self, key):
+        digest=self.digest(key)
+        with self.lock:
+            found=self.find(digest, self.get_head())
+            if found is not None:
+                # Keep the digest, so probing continues past this slot
+                SLOT.pack_into(self.memory, self.table_offset+found[0]*SLOT.size, digest, DELETED, 0)
+
+    def __contains__(self, key):
+        return self.find(self.digest(key), self.get_head()) is not None
+
+    def get_max_size(self):
+        return self.max_size
+
+    def get_current_size(self):
+        return min(self.get_head(), self.max_size)
+
+    def get_free_size(self):
+        return self.get_max_size() - self.get_current_size()
+
+    def get_stats(self):
+        """Return the counters of the buffer
+
+        Hits and misses are counted by the calling process only.
+
+        :return: A dictionary with hit, miss and size counters
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": self.get_current_size(),
+            "max_size": self.get_max_size(),
+        }
@@ -0,0 +1,44 @@
+import asyncio
+
+class SingleFlight:
+    """Deduplicate concurrent calls for the same key
+
+    The first call for a key starts the work as a task, every call for the
+    same key arriving while the task runs awaits the result of that task
+    instead of starting the work again.
+    """
+    def __init__(self):
+        self.in_flight={}
+        self.fills=0 # Calls that did the work
+        self.coalesced=0 # Calls that awaited the result of another call
+
+    async def do(self, key, func, *args):
+        """Run the coroutine function `func` for `key` unless it already runs
+
+        :param key: The key identifying the work
+        :param func: A coroutine function doing the work
+        :param args: The arguments passed to `func`
+        :return: The result of `func`
+        """
+        task=self.in_flight.get(key)
+        if task is not None:
+            self.coalesced+=1
+        else:
+            self.fills+=1
+            task=asyncio.ensure_future(func(*args))
+            self.in_flight[key]=task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+
+        # A cancelled request must not cancel the work others wait for
+        return await asyncio.shield(task)
+
+    def get_stats(self):
+        """Return the counters of the deduplication
+
+        :return: A dictionary with fill, coalesced and in flight counters
+        """
+        return {
+            "fills": self.fills,
+            "coalesced": self.coalesced,
+            "in_flight": len(self.in_flight),
+        }
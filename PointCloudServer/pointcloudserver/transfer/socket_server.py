@@ -1,124 +1,269 @@
+import asyncio
 import logging
-import socket
+import sys
 import time
-import numpy as np
-from scipy.spatial.transform import Rotation as R
 import matplotlib.pyplot as plt
 
+from pointcloudserver.transfer.single_flight import SingleFlight
+from pointcloudserver.transfer.synthetic import SyntheticWorkload
+from pointcloudserver.transfer.wire import get_frame_size, serialize_into
+
+class Connection:
+    """The statistics of a client connection"""
+    def __init__(self, address):
+        self.address=address
+        self.connected=time.monotonic()
+        self.requests=0
+        self.frames=0
+        self.dropped=0
+        self.bytes=0
+
+    def get_stats(self):
+        duration=time.monotonic()-self.connected
+        return {
+            "address": self.address,
+            "duration": duration,
+            "requests": self.requests,
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "bytes": self.bytes,
+            "fps": self.frames/duration if duration > 0 else 0.0,
+        }
+
+class FrameRing:
+    """A ring of preallocated buffers frames are serialized into
+
+    Transports keep a reference to a frame until it was sent completely, so
+    a frame shared by several clients may still be sent while later frames
+    are serialized. A buffer is only reused once nothing but the ring refers
+    to it, checked by its reference count. If every buffer is still in use,
+    e.g. because a client stopped reading, a new buffer takes the place of
+    the oldest one, which is freed once it was sent.
+    """
+    def __init__(self, max_bytes=1024*1024):
+        """
+        :param max_bytes: The number of bytes that may wait to be sent to a client, which determines the frames in flight
+        """
+        self.max_bytes=max_bytes
+        self.buffers=[]
+        self.next=0
+        self.allocated=0
+        self.reused=0
+
+    def get_slots(self, size):
+        # The frames waiting to be sent to a client, the partially sent one, the current one and the one being serialized
+        return self.max_bytes//size+3
+
+    def get(self, size):
+        """Return a buffer no frame in flight refers to
+
+        :param size: The size of the frame in bytes
+        :return: A `bytearray` of at least `size` bytes
+        """
+        for _ in range(len(self.buffers)):
+            buffer=self.buffers[self.next]
+            self.next=(self.next+1)%len(self.buffers)
+            # Referenced by the ring, this function and the argument of getrefcount only
+            if len(buffer) >= size and sys.getrefcount(buffer) <= 3:
+                self.reused+=1
+                return buffer
+
+        buffer=bytearray(size)
+        self.allocated+=1
+        if len(self.buffers) < self.get_slots(size):
+            self.buffers.append(buffer)
+        else:
+            self.buffers[self.next]=buffer
+            self.next=(self.next+1)%len(self.buffers)
+        return buffer
+
+    def get_stats(self):
+        return {
+            "buffers": len(self.buffers),
+            "allocated": self.allocated,
+            "reused": self.reused,
+        }
+
 class SocketServer:
-    def __init__(self, host='127.0.0.1', port=48002):
+    def __init__(self, host='127.0.0.1', port=48002, fps=30, max_buffer=1024*1024, num_points=10000, shape="cube", seed=0, sequence=None):
+        """
+        :param host: The address to listen at
+        :param port: The port to listen at
+        :param fps: The frame rate of pushed frames, clients requesting frames within a frame interval receive the same frame
+        :param max_buffer: The number of bytes that may wait to be sent to a pushed client before frames are dropped
+        :param num_points: The number of points of every frame
+        :param shape: The shape of the streamed point cloud, one of cube, sphere, ball
+        :param seed: The seed of the points and colors of the point cloud
+        :param sequence: An optional `RecordedSequence` streamed instead of the synthetic point cloud
+        """
         self.SEND_FRAME=b'\x00'
+        self.START_PUSH=b'\x01'
+        self.STOP_PUSH=b'\x02'
         self.HOST = host
         self.PORT = port
+        self.fps=fps
+        self.max_buffer=max_buffer
         self.t_start=time.time()
+        self.workload=SyntheticWorkload(num_points=num_points, shape=shape, seed=seed)
+        self.sequence=sequence
 
-    def get_random_sphere_volume(self, num_points):
-        vec = np.random.randn(3, num_points)
-        vec /= np.linalg.norm(vec, axis=0)
-        return vec*1000
-
-    def get_random_cube_surface(self, num_points):
-        offset=np.array([-0.5,-0.5,-0.5])
-        size=np.array([1,1,1])
-
-        points=np.random.rand(num_points,3)
-        points[:,0]*=size[0]
-        points[:,1]*=size[1]
-        points[:,2]*=size[2]
-
-        while num_points>0:
-            face=num_points%6
-            if face==0:
-                points[num_points-1,1]=0
-            if face==1:
-                points[num_points-1,1]=size[1]
-            if face==2:
-                points[num_points-1,2]=0
-            if face==3:
-                points[num_points-1,2]=size[2]
-            if face==4:
-                points[num_points-1,0]=0
-            if face==5:
-                points[num_points-1,0]=size[0]
-            num_points-=1
-        points+=offset
-        return points*1000
-
-    def get_random_sphere_surface(self, num_points):
-        x = np.random.normal(size=(num_points, 3)) 
-        x /= np.linalg.norm(x, axis=1)[:, np.newaxis]
-        return x*1000
-
-    def get_random_rgb_color(self, num_points):
-        rgb=(np.random.rand(num_points,3)*255).astype('i')
-        return rgb
-
-    def rotate_pointcloud(self, pointcloud, degrees):
-        rotation_radians = np.radians(degrees)
-        rotation_axis = np.array([1, 1, 1])
-        rotation_vector = rotation_radians * rotation_axis
-        rotation = R.from_rotvec(rotation_vector)
-        rotated_vec = rotation.apply(pointcloud)
-        return rotated_vec
+        self.frames=SingleFlight()
+        self.buffers=FrameRing(max_bytes=max_buffer)
+        self.payload=None
+        self.payload_time=0.0
+        self.connections=set()
 
     def render(self, xyz, rgb=None):
         # Scale to [0,1] for matplotlib
         if rgb is not None:
-           rgb/=255
+           rgb=rgb/255
         fig = plt.figure()
         ax = fig.add_subplot(projection='3d')
         ax.scatter(xyz[:,0], xyz[:,1], xyz[:,2], c=rgb)
         plt.show()
     
-    def serialize(self, vertices, colors):
-        # Convert number of points to 32 bit integer
-        num_points = np.array([len(vertices)], dtype=np.int32)
-        num_points = num_points.tobytes('C')
-
-        # Convert vertices to 16 bit signed integer (signed short) array
-        vertices = np.array(vertices, dtype=np.int16)
-        vertices = vertices.tobytes('C')
+    def serialize(self, vertices, colors, buffer=None):
+        """Serialize a frame into the wire format
 
-        # Convert colors to 8 bit unsigned integer (byte) array
-        colors = np.array(colors, dtype=np.uint8)
-        colors = colors.tobytes('C')
+        Without a buffer a new one is allocated. The server serializes into
+        the buffers of a `FrameRing`, since transports may still hold a frame
+        shared by several clients while the next one is serialized.
 
-        # Return concatenated byte array
-        return num_points+vertices+colors
+        :param vertices: The vertices as array of shape (N, 3)
+        :param colors: The colors as array of shape (N, 3)
+        :param buffer: An optional writable buffer large enough for the frame, reused instead of allocating one
+        :return: The frame, a `memoryview` of the start of the buffer if one was passed
+        """
+        if buffer is None:
+            buffer=bytearray(get_frame_size(len(vertices)))
+            serialize_into(buffer, vertices, colors)
+            return buffer
+        return memoryview(buffer)[:serialize_into(buffer, vertices, colors)]
 
     def start(self):
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.bind((self.HOST, self.PORT))
-            s.listen()
-            logging.info("Listening on {}:{}".format(self.HOST, self.PORT))
+        asyncio.run(self.serve())
+
+    async def listen(self):
+        """Start accepting clients
+
+        :return: The `asyncio.Server`, e.g. to look up the port when listening on port 0
+        """
+        server=await asyncio.start_server(self.handle, self.HOST, self.PORT)
+        for s in server.sockets:
+            logging.info("Listening on {}:{}".format(*s.getsockname()[:2]))
+        return server
+
+    async def serve(self):
+        server=await self.listen()
+        async with server:
+            await server.serve_forever()
+
+    def encode_frame(self):
+        xyz, rgb=self.get_frame()
+        return self.serialize(xyz, rgb, self.buffers.get(get_frame_size(len(xyz))))
+
+    async def get_payload(self, connection):
+        """Return the serialized current frame
+
+        A frame is generated at most once per frame interval and shared by
+        all clients requesting frames within that interval. Frames are
+        generated on a thread, so clients are served while a frame is built.
+        Recorded sequences are already serialized and played from the start
+        for every connection.
+
+        :param connection: The connection the frame is sent to
+        :return: The serialized frame or `None` once a recorded sequence ended
+        """
+        if self.sequence is not None:
+            return self.sequence.get(time.monotonic()-connection.connected)
+        if self.payload is not None and time.monotonic()-self.payload_time < 1/self.fps:
+            return self.payload
+        return await self.frames.do("frame", self.update_payload)
+
+    async def update_payload(self):
+        generated=time.monotonic()
+        payload=await asyncio.get_running_loop().run_in_executor(None, self.encode_frame)
+        self.payload, self.payload_time=payload, generated
+        return payload
+
+    def send(self, writer, connection, payload):
+        writer.write(payload)
+        connection.frames+=1
+        connection.bytes+=len(payload)
+
+    async def push(self, writer, connection):
+        """Send a frame every frame interval until cancelled
+
+        Frames are written without waiting for the client to read them. If
+        more than `max_buffer` bytes are still waiting to be sent, the frame is
+        dropped, so slow clients receive fewer frames instead of older ones
+        and the memory used per client stays bounded.
+        """
+        interval=1/self.fps
+        deadline=time.monotonic()
+        while not writer.is_closing():
+            payload=await self.get_payload(connection)
+            if payload is None:
+                # Closing the connection ends reading requests as well
+                writer.close()
+                return
+            if writer.transport.get_write_buffer_size() > self.max_buffer:
+                connection.dropped+=1
+            else:
+                self.send(writer, connection, payload)
+
+            deadline+=interval
+            delay=deadline-time.monotonic()
+            if delay < 0:
+                # Generating frames fell behind, continue at the frame rate instead of catching up
+                deadline=time.monotonic()
+                delay=0
+            await asyncio.sleep(delay)
+
+    async def handle(self, reader, writer):
+        connection=Connection(writer.get_extra_info("peername"))
+        self.connections.add(connection)
+        logging.info('Accepted connection from {}'.format(connection.address))
+        pushing=None
+        try:
             while True:
-                conn, addr = s.accept()
-                with conn:
-                    logging.info('Accepted connection from {}'.format(addr))
-                    while True:
-                        data = conn.recv(1024)
-                        if not data:
-                            break
-                        logging.debug("Received {} b from {}".format(len(data), addr))
-                        logging.debug("Data received from {}: {}".format(addr, str(data)))
-
-                        if data == self.SEND_FRAME:
-                            logging.debug("Frame requested by {}".format(addr))
-                            pointcloud=self.get_frame()
-                            xyz = pointcloud[:,:3]
-                            rgb = pointcloud[:,3:]
-                            payload=self.serialize(xyz, rgb)
-                            conn.sendall(payload)
-                            logging.debug("Sent {} points ({} b)".format(len(pointcloud), len(payload)))
+                data = await reader.read(1024)
+                if not data:
+                    break
+                logging.debug("Received {} b from {}".format(len(data), connection.address))
 
-    def get_frame(self):
-        num_points=10000
-        ms_per_rot=10000
+                # Every byte is a request, clients may send several at once
+                for request in data:
+                    connection.requests+=1
+                    if request == self.SEND_FRAME[0]:
+                        payload=await self.get_payload(connection)
+                        if payload is None:
+                            return
+                        self.send(writer, connection, payload)
+                        await writer.drain()
+                    elif request == self.START_PUSH[0] and pushing is None:
+                        logging.debug("Pushing frames to {}".format(connection.address))
+                        pushing=asyncio.ensure_future(self.push(writer, connection))
+                    elif request == self.STOP_PUSH[0] and pushing is not None:
+                        pushing.cancel()
+                        pushing=None
+        except ConnectionError as e:
+            logging.debug("Connection to {} failed: {}".format(connection.address, e))
+        finally:
+            if pushing is not None:
+                pushing.cancel()
+                await asyncio.gather(pushing, return_exceptions=True)
+            self.connections.discard(connection)
+            writer.close()
+            stats=connection.get_stats()
+            logging.info("Closed connection from {} after {:.1f} s, sent {} frames ({} b) and dropped {}".format(connection.address, stats["duration"], stats["frames"], stats["bytes"], stats["dropped"]))
+
+    def get_stats(self):
+        """Return the statistics of all open connections
 
-        xyz=self.rotate_pointcloud(
-            self.get_random_cube_surface(num_points),
-            (((time.time()-self.t_start)*1000)%ms_per_rot)*(360/ms_per_rot)
-        )
-        rgb=self.get_random_rgb_color(num_points)
+        :return: A list with a dictionary per connection
+        """
+        return [connection.get_stats() for connection in self.connections]
 
-        return np.hstack((xyz, rgb))
\ No newline at end of file
+    def get_frame(self):
+        return self.workload.get_frame(time.time()-self.t_start)
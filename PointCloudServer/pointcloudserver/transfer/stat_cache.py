@@ -0,0 +1,93 @@
+import mimetypes
+import os
+import stat
+import time
+from collections import OrderedDict
+
+from pointcloudserver.dash.manifest import RACY_NANOSECONDS
+from pointcloudserver.transfer.http import format_http_date
+
+class FileMetadata:
+    """The metadata of a segment file needed to answer requests for it"""
+    def __init__(self, path, stat_result):
+        self.stat_result=stat_result
+        self.size=stat_result.st_size
+        self.mtime_ns=stat_result.st_mtime_ns
+        self.mtime=stat_result.st_mtime
+        self.etag="\"{:x}-{:x}\"".format(stat_result.st_size, stat_result.st_mtime_ns)
+        self.last_modified=format_http_date(stat_result.st_mtime)
+        self.content_type=mimetypes.guess_type(path, strict=False)[0]
+
+class StatCache:
+    """Remember the metadata of files which are not expected to change
+
+    Segments are written once and rarely modified afterwards, so the result
+    of `os.stat` is kept until the least recently used entries are dropped
+    to stay within `max_entries` and only checked again every
+    `check_interval` seconds, e.g. for a segment replaced by a new file.
+    Files modified within the last seconds may still be written, e.g. by an
+    encoder next to a watched MPD, and are stat'd again on every request.
+    Missing files are not remembered, so new segments become available
+    immediately.
+    """
+    def __init__(self, run_io, max_entries=100000, check_interval=1.0, on_change=None):
+        """
+        :param run_io: A coroutine function running a blocking function off the event loop
+        :param max_entries: The number of files to remember
+        :param check_interval: Seconds between two checks of a file for modifications
+        :param on_change: An optional coroutine function called with the path of a remembered file that changed or disappeared
+        """
+        self.run_io=run_io
+        self.max_entries=max_entries
+        self.check_interval=check_interval
+        self.on_change=on_change
+        self.entries=OrderedDict()
+
+        self.hits=0
+        self.misses=0
+
+    def stat(self, path):
+        try:
+            stat_result=os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not stat.S_ISREG(stat_result.st_mode):
+            return None
+        return FileMetadata(path, stat_result)
+
+    async def get(self, path):
+        """Return the metadata of the regular file at `path`
+
+        :param path: The path of the file
+        :return: The metadata or `None` if there is no regular file at `path`
+        """
+        entry=self.entries.get(path)
+        now=time.monotonic()
+        if entry is not None and now-entry[1] < self.check_interval and time.time_ns()-entry[0].mtime_ns >= RACY_NANOSECONDS:
+            self.hits+=1
+            self.entries.move_to_end(path)
+            return entry[0]
+
+        self.misses+=1
+        metadata=await self.run_io(self.stat, path)
+        if entry is not None and self.on_change is not None and (metadata is None or metadata.etag != entry[0].etag):
+            await self.on_change(path)
+        if metadata is None:
+            self.entries.pop(path, None)
+        elif self.max_entries > 0:
+            self.entries[path]=(metadata, now)
+            self.entries.move_to_end(path)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return metadata
+
+    def get_stats(self):
+        """Return the counters of the stat cache
+
+        :return: A dictionary with hit, miss and entry counters
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "items": len(self.entries),
+        }
@@ -0,0 +1,73 @@
+import numpy as np
+from scipy.spatial.transform import Rotation as R
+
+# Axis and fixed coordinate of the face every sixth point lies on
+CUBE_FACE_AXES=np.array([1, 1, 2, 2, 0, 0])
+CUBE_FACE_VALUES=np.array([0.0, 1.0, 0.0, 1.0, 0.0, 1.0])
+
+def get_cube_surface(num_points, rng):
+    """Return points on the surface of a unit cube centered at the origin"""
+    points=rng.random((num_points, 3))
+    faces=np.arange(1, num_points+1)%6
+    points[np.arange(num_points), CUBE_FACE_AXES[faces]]=CUBE_FACE_VALUES[faces]
+    return points-0.5
+
+def get_sphere_surface(num_points, rng):
+    """Return points on the surface of a unit sphere"""
+    points=rng.standard_normal((num_points, 3))
+    points/=np.linalg.norm(points, axis=1)[:, np.newaxis]
+    return points
+
+def get_sphere_volume(num_points, rng):
+    """Return points within a unit sphere"""
+    # The cube root spreads the points evenly over the volume instead of towards the center
+    return get_sphere_surface(num_points, rng)*np.cbrt(rng.random((num_points, 1)))
+
+SHAPES={
+    "cube": get_cube_surface,
+    "sphere": get_sphere_surface,
+    "ball": get_sphere_volume,
+}
+
+class SyntheticWorkload:
+    """A rotating point cloud of fixed geometry and colors
+
+    The points and colors are generated once from a seed, so every server
+    started with the same parameters streams the same frames. A frame only
+    rotates the points around the diagonal axis, which is a single matrix
+    multiplication.
+    """
+    def __init__(self, num_points=10000, shape="cube", ms_per_rot=10000, scale=1000, seed=0):
+        """
+        :param num_points: The number of points of every frame
+        :param shape: The shape of the point cloud, one of cube, sphere, ball
+        :param ms_per_rot: Milliseconds per full rotation
+        :param scale: The half size of the point cloud in units of the serialized coordinates
+        :param seed: The seed of the points and colors
+        """
+        if shape not in SHAPES:
+            raise ValueError("Unknown shape {}, expected one of {}".format(shape, ", ".join(SHAPES)))
+        rng=np.random.default_rng(seed)
+        self.ms_per_rot=ms_per_rot
+        # Single precision halves the memory bandwidth and is exact enough for 16 bit coordinates
+        self.xyz=(SHAPES[shape](num_points, rng)*scale).astype(np.float32)
+        self.rgb=rng.integers(0, 256, size=(num_points, 3), dtype=np.uint8)
+
+    def get_rotation(self, elapsed):
+        """Return the rotation matrix of the point cloud
+
+        :param elapsed: Seconds since the start of the rotation
+        :return: A 3x3 matrix
+        """
+        degrees=((elapsed*1000)%self.ms_per_rot)*(360/self.ms_per_rot)
+        rotation_vector=np.radians(degrees)*np.array([1, 1, 1])
+        return R.from_rotvec(rotation_vector).as_matrix().astype(np.float32)
+
+    def get_frame(self, elapsed):
+        """Return the point cloud rotated to a point in time
+
+        :param elapsed: Seconds since the start of the rotation
+        :return: A tuple of the points and their colors, the colors are shared by all frames and must not be modified
+        """
+        # Rotating row vectors multiplies with the transposed matrix
+        return self.xyz@self.get_rotation(elapsed).T, self.rgb
@@ -0,0 +1,119 @@
+import time as T
+from collections import deque
+
+class Trace:
+    """The phases of a single request
+
+    Phases follow each other, entering a phase ends the current one. The
+    request starts in the `routing` phase, which lasts until the endpoint
+    enters its first phase.
+    """
+    def __init__(self, path):
+        self.path=path
+        self.start=T.perf_counter()
+        self.phase="routing"
+        self.phase_start=self.start
+        self.phases={}
+        self.status=None
+        self.duration=None
+
+    def enter(self, phase):
+        now=T.perf_counter()
+        self.phases[self.phase]=self.phases.get(self.phase, 0)+now-self.phase_start
+        self.phase=phase
+        self.phase_start=now
+
+    def finish(self):
+        self.enter(None)
+        self.duration=self.phase_start-self.start
+
+    def to_dict(self):
+        return {
+            "path": self.path,
+            "status": self.status,
+            "duration": self.duration,
+            "phases": self.phases,
+        }
+
+class Tracer:
+    """Records the phases of requests while enabled
+
+    The most recent traces are kept in memory, so slow requests can be
+    inspected after a latency spike. If a histogram is given, the duration
+    of every phase is also observed in it.
+    """
+    def __init__(self, enabled=False, max_traces=1000, histogram=None):
+        """
+        :param enabled: Trace requests from the start
+        :param max_traces: The number of recent traces to keep
+        :param histogram: An optional histogram labeled by phase
+        """
+        self.enabled=enabled
+        self.traces=deque(maxlen=max_traces)
+        self.histogram=histogram
+
+    def record(self, trace):
+        self.traces.append(trace)
+        if self.histogram is not None:
+            for phase, duration in trace.phases.items():
+                self.histogram.observe(duration, (phase,))
+
+    def get_traces(self, limit=100, min_duration=0):
+        """Return the most recent traces, newest first
+
+        :param limit: The maximum number of traces
+        :param min_duration: Only return requests which took at least this many seconds
+        :return: A list of dictionaries describing the requests
+        """
+        traces=[]
+        for trace in reversed(self.traces):
+            if len(traces) >= limit:
+                break
+            if trace.duration >= min_duration:
+                traces.append(trace.to_dict())
+        return traces
+
+    def get_summary(self):
+        """Return the total and maximum duration of every phase over the kept traces
+
+        :return: A dictionary mapping each phase to its count, total and maximum in seconds
+        """
+        summary={}
+        for trace in self.traces:
+            for phase, duration in trace.phases.items():
+                entry=summary.setdefault(phase, {"count": 0, "total": 0.0, "max": 0.0})
+                entry["count"]+=1
+                entry["total"]+=duration
+                entry["max"]=max(entry["max"], duration)
+        return summary
+
+class RequestTracing:
+    """ASGI middleware tracing the phases of requests while the tracer is enabled
+
+    A `Trace` is stored in the `trace` key of the ASGI scope, so endpoints
+    can enter their phases. Once the response starts, the request is in the
+    `write` phase until the last part of the body was sent.
+    """
+    def __init__(self, app, tracer):
+        self.app=app
+        self.tracer=tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        trace=Trace(scope["path"])
+        scope["trace"]=trace
+
+        async def send_traced(message):
+            if message["type"] == "http.response.start":
+                trace.status=message["status"]
+                trace.enter("write")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_traced)
+        finally:
+            trace.finish()
+            self.tracer.record(trace)
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import os
+import xml.etree.ElementTree as ET
+
+from pointcloudserver.dash.mpd import get_representation_urls
+
+class WarmUp:
+    """Preload the first segments of every media into the cache
+
+    The segments are taken from the `mpd.xml` of each media folder in the
+    order of their periods, so the segments played first are loaded first.
+    """
+    def __init__(self, media_path, prefetch, run_io, periods=0, budget=0, concurrency=8, logger=None):
+        """
+        :param media_path: The directory where media can be found
+        :param prefetch: A coroutine function loading the segment at a path into the cache
+        :param run_io: A coroutine function running a blocking function off the event loop
+        :param periods: The number of periods to load per media, all if 0
+        :param budget: The number of bytes to load per media, unlimited if 0
+        :param concurrency: The number of segments loaded in parallel
+        :param logger: An optional logger
+        """
+        self.media_path=media_path
+        self.prefetch=prefetch
+        self.run_io=run_io
+        self.periods=periods
+        self.budget=budget
+        self.concurrency=concurrency
+
+        if logger is None:
+            self.logger = logging.getLogger("root")
+        else:
+            self.logger = logger
+
+    def get_media(self):
+        media=[]
+        for entry in sorted(os.listdir(self.media_path)):
+            if os.path.isfile(os.path.join(self.media_path, entry, "mpd.xml")):
+                media.append(entry)
+        return media
+
+    def get_segments(self, name):
+        """Return the paths of the segments to load for a media
+
+        :param name: The name of the media
+        :return: A list of tuples of the segment path and its size in bytes
+        """
+        root=ET.parse(os.path.join(self.media_path, name, "mpd.xml")).getroot()
+        urls=get_representation_urls(root, periods=self.periods or None)
+
+        segments=[]
+        total=0
+        for url, size in urls:
+            if self.budget and total+size > self.budget:
+                break
+            total+=size
+            segments.append((os.path.join(self.media_path, name, url), size))
+        return segments
+
+    async def run(self):
+        media=await self.run_io(self.get_media)
+        self.logger.info("Warming up cache for {} media".format(len(media)))
+        for name in media:
+            try:
+                segments=await self.run_io(self.get_segments, name)
+            except (OSError, ET.ParseError, ValueError) as e:
+                self.logger.warning("Skipping warm-up of \"{}\": {}".format(name, e))
+                continue
+            await self.load(name, segments)
+        self.logger.info("Finished cache warm-up")
+
+    async def load(self, name, segments):
+        semaphore=asyncio.Semaphore(self.concurrency)
+        total=len(segments)
+        loaded=0
+        step=max(1, total//10)
+
+        async def load_segment(path):
+            nonlocal loaded
+            async with semaphore:
+                await self.prefetch(path)
+            loaded+=1
+            if loaded%step == 0 or loaded == total:
+                self.logger.info("Warm-up of \"{}\": {}/{} segments".format(name, loaded, total))
+
+        await asyncio.gather(*[load_segment(path) for path, _ in segments])
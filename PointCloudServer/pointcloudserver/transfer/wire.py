@@ -0,0 +1,41 @@
+import struct
+
+import numpy as np
+
+HEADER=struct.Struct("<i")
+POINT_SIZE=3*2+3 # xyz as 16 bit signed integers and rgb as bytes
+
+# Wire format of a frame of the socket protocol:
+# - The number of points N as 32 bit signed integer
+# - N points as xyz with a 16 bit signed integer per axis
+# - N colors as rgb with an 8 bit unsigned integer per channel in the same order as the points
+def get_frame_size(num_points: int) -> int:
+    return HEADER.size+num_points*POINT_SIZE
+
+def serialize_into(buffer, vertices, colors, offset=0) -> int:
+    """Write a frame into a buffer
+
+    The vertices and colors are converted while they are copied into the
+    buffer, so no temporary arrays or byte strings are created. Coordinates
+    are truncated towards zero like `numpy.ndarray.astype` does.
+
+    :param buffer: A writable buffer, e.g. a `bytearray` or a writable `mmap`
+    :param vertices: The vertices as array of shape (N, 3)
+    :param colors: The colors as array of shape (N, 3)
+    :param offset: The offset of the frame in the buffer
+    :return: The size of the frame in bytes
+    """
+    num_points=len(vertices)
+    size=get_frame_size(num_points)
+    if len(buffer)-offset < size:
+        raise ValueError("A frame of {} points needs {} b, but the buffer has {} b left".format(num_points, size, len(buffer)-offset))
+
+    HEADER.pack_into(buffer, offset, num_points)
+    if num_points > 0:
+        offset+=HEADER.size
+        xyz=np.frombuffer(buffer, dtype="<i2", count=num_points*3, offset=offset).reshape(num_points, 3)
+        np.copyto(xyz, vertices, casting="unsafe")
+        offset+=xyz.nbytes
+        rgb=np.frombuffer(buffer, dtype=np.uint8, count=num_points*3, offset=offset).reshape(num_points, 3)
+        np.copyto(rgb, colors, casting="unsafe")
+    return size
@@ -0,0 +1,108 @@
+import pytest
+from pointcloudserver.transfer.buffer import Buffer
+
+# Buffer sizes are given in MB, this converts from bytes
+B=1/(1024*1024)
+
+def create_buffer(max_size, protected_ratio=0.0):
+    return Buffer(max_size=max_size*B, protected_ratio=protected_ratio)
+
+class TestBuffer:
+    def test_get_returns_stored_value(self):
+        buffer=create_buffer(100)
+        buffer.set("a", b"1234")
+        assert buffer.get("a")==b"1234"
+        assert buffer.get("b") is None
+
+    def test_ignores_none_and_too_large_values(self):
+        buffer=create_buffer(10)
+        buffer.set("a", None)
+        buffer.set("b", b"x"*11)
+        assert len(buffer)==0
+        assert buffer.get_current_size()==0
+
+    def test_tracks_current_size(self):
+        buffer=create_buffer(100)
+        buffer.set("a", b"x"*10)
+        buffer.set("b", b"x"*20)
+        assert buffer.get_current_size()==30
+        assert buffer.get_free_size()==70
+        buffer.set("a", b"x"*5)
+        assert buffer.get_current_size()==25
+        buffer.delete("b")
+        assert buffer.get_current_size()==5
+
+    def test_evicts_least_recently_used(self):
+        buffer=create_buffer(30)
+        buffer.set("a", b"x"*10)
+        buffer.set("b", b"x"*10)
+        buffer.set("c", b"x"*10)
+        buffer.get("a")
+        buffer.set("d", b"x"*10)
+        assert "a" in buffer
+        assert "b" not in buffer
+        assert "c" in buffer
+        assert "d" in buffer
+        assert buffer.get_current_size()==30
+
+    def test_sequential_scan_keeps_protected_values(self):
+        buffer=create_buffer(40, protected_ratio=0.5)
+        buffer.set("hot", b"x"*10)
+        buffer.get("hot")
+        for i in range(10):
+            buffer.set(str(i), b"x"*10)
+        assert "hot" in buffer
+        assert buffer.get_current_size()<=40
+
+    def test_promotes_prefetched_values_on_second_hit(self):
+        buffer=create_buffer(40, protected_ratio=0.5)
+        buffer.set("hot", b"x"*10)
+        buffer.get("hot")
+        # Sequential playback hits every prefetched segment once
+        for i in range(10):
+            buffer.set(str(i), b"x"*10, prefetched=True)
+            assert buffer.get(str(i))==b"x"*10
+        assert "hot" in buffer and buffer.protected_size==10
+
+        buffer.set("a", b"x"*10, prefetched=True)
+        buffer.get("a")
+        buffer.get("a")
+        assert "a" in buffer.protected
+
+    def test_demotes_when_protected_segment_is_full(self):
+        buffer=create_buffer(40, protected_ratio=0.5)
+        for key in ["a", "b", "c"]:
+            buffer.set(key, b"x"*10)
+            buffer.get(key)
+        assert buffer.protected_size==20
+        assert buffer.get_current_size()==30
+        assert all(key in buffer for key in ["a", "b", "c"])
+
+    def test_clean(self):
+        buffer=create_buffer(100)
+        for key in ["a", "b", "c"]:
+            buffer.set(key, b"x"*10)
+        buffer.clean(15)
+        assert "a" not in buffer and "b" not in buffer and "c" in buffer
+        buffer.clean()
+        assert len(buffer)==0
+        assert buffer.get_current_size()==0
+
+    def test_stats(self):
+        buffer=create_buffer(20)
+        buffer.set("a", b"x"*10)
+        buffer.get("a")
+        buffer.get("b")
+        buffer.set("b", b"x"*10)
+        buffer.set("c", b"x"*10)
+        stats=buffer.get_stats()
+        assert stats["hits"]==1
+        assert stats["misses"]==1
+        assert stats["evictions"]==1
+        assert stats["evicted_bytes"]==10
+        assert stats["items"]==2
+        assert stats["size"]==20
+
+    def test_rejects_invalid_protected_ratio(self):
+        with pytest.raises(ValueError):
+            create_buffer(10, protected_ratio=2)
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from pointcloudserver.transfer.buffer import Buffer
+from pointcloudserver.transfer.cache import NOT_FOUND, BufferCache, CacheFactory, TieredCache
+from pointcloudserver.transfer.redis_cache import RedisCache
+
+fakeredis=pytest.importorskip("fakeredis")
+
+# Buffer sizes are given in MB, this converts from bytes
+B=1/(1024*1024)
+
+def create_tiers(l1_size=100):
+    return [BufferCache(Buffer(max_size=l1_size*B)), RedisCache(client=fakeredis.FakeAsyncRedis())]
+
+class TestTieredCache:
+    def test_promotes_values_from_lower_tiers(self):
+        async def run():
+            l1, l2=create_tiers()
+            cache=TieredCache([l1, l2])
+            await l2.set("a", b"1234")
+            await l2.drain()
+            value=await cache.get("a")
+            return value, await l1.exists("a"), await cache.get("a"), cache.get_stats()
+
+        value, promoted, again, stats=asyncio.run(run())
+        assert value==b"1234" and promoted and again==b"1234"
+        assert [tier["hits_served"] for tier in stats["tiers"]]==[1, 1]
+        assert stats["promotions"]==1
+
+    def test_writes_through_all_tiers(self):
+        async def run():
+            l1, l2=create_tiers()
+            cache=TieredCache([l1, l2])
+            await cache.set("a", b"1234")
+            await cache.set_missing("b")
+            await l2.drain()
+            return await l1.exists("a"), await l2.get("a"), await cache.get("b"), await cache.get("c")
+
+        assert asyncio.run(run())==(True, b"1234", NOT_FOUND, None)
+
+    def test_demotes_evicted_values(self):
+        async def run():
+            l1, l2=create_tiers(l1_size=10)
+            cache=TieredCache([l1, l2], write_through=False)
+            await cache.set("a", b"0123456789")
+            in_l2=await l2.exists("a")
+            await cache.set("b", b"0123456789")
+            await asyncio.gather(*cache.tasks)
+            return in_l2, await l1.exists("a"), await l2.get("a"), cache.get_stats()["demotions"]
+
+        assert asyncio.run(run())==(False, False, b"0123456789", 1)
+
+    def test_writes_values_too_large_for_l1_to_l2(self):
+        async def run():
+            l1, l2=create_tiers(l1_size=10)
+            cache=TieredCache([l1, l2], write_through=False)
+            await cache.set("a", b"0123456789a")
+            await cache.set_many([("b", b"0123456789b"), ("c", b"c")])
+            return [(await l1.exists(key), await l2.exists(key)) for key in "abc"]
+
+        assert asyncio.run(run())==[(False, True), (False, True), (True, False)]
+
+    def test_shared_l1_writes_through(self, monkeypatch):
+        config={
+            "use": "tiered",
+            "tiered": {"tiers": ["internal", "redis"], "write_through": False},
+            "internal": {"buffer_size": 1, "protected_ratio": 0.8},
+        }
+        factory=CacheFactory()
+        create=factory.create
+        monkeypatch.setattr(factory, "create", lambda name, config, workers: create(name, config, workers) if name == "internal" else create_tiers()[1])
+        # The internal cache shared by several workers cannot demote evicted segments
+        assert factory.create_from_config(config, workers=2).write_through
+        assert not factory.create_from_config(config, workers=1).write_through
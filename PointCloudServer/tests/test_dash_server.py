@@ -0,0 +1,230 @@
+import os
+import shutil
+
+import pytest
+from fastapi.testclient import TestClient
+from pointcloudserver.transfer.batch import unpack
+from pointcloudserver.transfer.buffer import Buffer
+from pointcloudserver.transfer.cache import BufferCache
+from pointcloudserver.transfer.dash_server import DASHServer
+from pointcloudserver.transfer.pack import pack
+
+mpd=b'<MPD type="static"><Period id="0" /></MPD>'
+segment=bytes(range(256))*4
+
+@pytest.fixture
+def media_path(tmp_path):
+    os.makedirs(tmp_path/"foo"/"bar")
+    (tmp_path/"foo"/"mpd.xml").write_bytes(mpd)
+    (tmp_path/"foo"/"bar"/"00000001.drc").write_bytes(segment)
+    (tmp_path/"foo"/"bar"/"00000002.drc").write_bytes(segment[:10])
+    return str(tmp_path)
+
+def create_client(media_path, **kwargs):
+    return TestClient(DASHServer(media_path=media_path, **kwargs).app)
+
+class TestDASHServer:
+    @pytest.mark.parametrize("delivery", ["memory", "file"])
+    def test_serves_segment(self, media_path, delivery):
+        client=create_client(media_path, delivery=delivery)
+        response=client.get("/media/foo/bar/00000001.drc")
+        assert response.status_code==200
+        assert response.content==segment
+        assert response.headers["content-type"]=="pointcloud/drc"
+        assert client.get("/media/foo/bar/00000003.drc").status_code==404
+
+    @pytest.mark.parametrize("delivery", ["memory", "file"])
+    def test_serves_segment_with_validators(self, media_path, delivery):
+        client=create_client(media_path, delivery=delivery, max_age=60, immutable=True)
+        response=client.get("/media/foo/bar/00000001.drc")
+        assert response.headers["cache-control"]=="public, max-age=60, immutable"
+        assert "last-modified" in response.headers
+
+        etag=response.headers["etag"]
+        response=client.get("/media/foo/bar/00000001.drc", headers={"If-None-Match": etag})
+        assert response.status_code==304
+        assert response.headers["etag"]==etag
+
+        last_modified=response.headers["last-modified"]
+        response=client.get("/media/foo/bar/00000001.drc", headers={"If-Modified-Since": last_modified})
+        assert response.status_code==304
+
+    @pytest.mark.parametrize("delivery", ["memory", "file"])
+    def test_replaced_segment_gets_new_etag(self, media_path, delivery):
+        path=os.path.join(media_path, "foo", "bar", "00000001.drc")
+        os.utime(path, (1000000000, 1000000000))
+        server=DASHServer(media_path=media_path, cache=BufferCache(Buffer()), delivery=delivery)
+        server.files.check_interval=0
+        client=TestClient(server.app)
+        etag=client.get("/media/foo/bar/00000001.drc").headers["etag"]
+
+        # A file replaced long after it was written
+        with open(path, "wb") as file:
+            file.write(segment[:20])
+        os.utime(path, (1000000100, 1000000100))
+        response=client.get("/media/foo/bar/00000001.drc", headers={"If-None-Match": etag})
+        assert response.status_code==200
+        assert response.headers["etag"]!=etag
+        assert response.content==segment[:20]
+
+    def test_restats_segment_still_written(self, media_path):
+        path=os.path.join(media_path, "foo", "bar", "00000001.drc")
+        client=create_client(media_path, cache=BufferCache(Buffer()))
+        assert client.get("/media/foo/bar/00000001.drc").content==segment
+        with open(path, "ab") as file:
+            file.write(segment[:10])
+        response=client.get("/media/foo/bar/00000001.drc")
+        assert response.headers["content-length"]==str(len(segment)+10)
+        assert response.content==segment+segment[:10]
+
+    @pytest.mark.parametrize("delivery", ["memory", "file"])
+    def test_batch_with_removed_segment_is_not_found(self, media_path, delivery):
+        path=os.path.join(media_path, "foo", "bar", "00000002.drc")
+        os.utime(path, (1000000000, 1000000000))
+        client=create_client(media_path, delivery=delivery, batch_size=10)
+        assert client.get("/media/foo/bar/batch/00000001.drc/2").status_code==200
+        # The segment index and the metadata of the removed segment are still remembered
+        os.remove(path)
+        assert client.get("/media/foo/bar/batch/00000001.drc/2").status_code==404
+
+    def test_conditional_segment_request_does_not_read_file(self, media_path):
+        # Files written within the last seconds are stat'd on every request
+        os.utime(os.path.join(media_path, "foo", "bar", "00000001.drc"), (1000000000, 1000000000))
+        server=DASHServer(media_path=media_path)
+        client=TestClient(server.app)
+        etag=client.get("/media/foo/bar/00000001.drc").headers["etag"]
+        server.read_file=None
+        response=client.get("/media/foo/bar/00000001.drc", headers={"If-None-Match": etag})
+        assert response.status_code==304
+        assert server.files.get_stats()["hits"]==1
+
+    def test_file_delivery_serves_ranges(self, media_path):
+        client=create_client(media_path, delivery="file")
+        response=client.get("/media/foo/bar/00000001.drc", headers={"Range": "bytes=10-19"})
+        assert response.status_code==206
+        assert response.content==segment[10:20]
+        assert response.headers["content-range"]=="bytes 10-19/{}".format(len(segment))
+
+    def test_file_delivery_rejects_unsatisfiable_ranges(self, media_path):
+        client=create_client(media_path, delivery="file")
+        response=client.get("/media/foo/bar/00000001.drc", headers={"Range": "bytes={}-".format(len(segment))})
+        assert response.status_code==416
+        assert response.headers["content-range"]=="bytes */{}".format(len(segment))
+
+    def test_file_delivery_honors_if_range(self, media_path):
+        client=create_client(media_path, delivery="file")
+        etag=client.get("/media/foo/bar/00000001.drc").headers["etag"]
+        response=client.get("/media/foo/bar/00000001.drc", headers={"Range": "bytes=10-19", "If-Range": etag})
+        assert response.status_code==206
+        assert response.content==segment[10:20]
+
+        # A range of another version of the segment is answered with the whole segment
+        response=client.get("/media/foo/bar/00000001.drc", headers={"Range": "bytes=10-19", "If-Range": "\"0-0\""})
+        assert response.status_code==200
+        assert response.content==segment
+
+    def test_serves_mpd_with_validators(self, media_path):
+        client=create_client(media_path)
+        response=client.get("/media/foo", headers={"Accept-Encoding": "identity"})
+        assert response.status_code==200
+        assert response.content==mpd
+        assert response.headers["content-type"]=="application/dash+xml"
+        assert "last-modified" in response.headers
+
+        etag=response.headers["etag"]
+        response=client.get("/media/foo", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+        assert response.status_code==304
+        assert response.content==b""
+
+        assert client.get("/media/baz").status_code==404
+
+    def test_serves_compressed_mpd(self, media_path):
+        client=create_client(media_path)
+        response=client.get("/media/foo", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"]=="gzip"
+        assert response.headers["vary"]=="Accept-Encoding"
+        # The client decodes the content transparently
+        assert response.content==mpd
+
+    def test_reloads_modified_mpd(self, media_path):
+        server=DASHServer(media_path=media_path)
+        server.manifests.check_interval=0
+        client=TestClient(server.app)
+        etag=client.get("/media/foo").headers["etag"]
+
+        path=os.path.join(media_path, "foo", "mpd.xml")
+        with open(path, "wb") as file:
+            file.write(mpd+b"\n")
+        os.utime(path, ns=(0, 0))
+
+        response=client.get("/media/foo", headers={"If-None-Match": etag})
+        assert response.status_code==200
+        assert response.content==mpd+b"\n"
+
+    @pytest.mark.parametrize("delivery", ["memory", "file"])
+    def test_serves_batch(self, media_path, delivery):
+        client=create_client(media_path, delivery=delivery, batch_size=10)
+        response=client.get("/media/foo/bar/batch/00000001.drc/10")
+        assert response.status_code==200
+        assert response.headers["x-segments"]=="00000001.drc,00000002.drc"
+        assert unpack(response.content)==[segment, segment[:10]]
+
+        assert client.get("/media/foo/bar/batch/00000003.drc/1").status_code==404
+        assert client.get("/media/foo/bar/batch/00000001.drc/11").status_code==400
+
+    def test_serves_packed_segments(self, media_path):
+        directory=os.path.join(media_path, "foo", "bar")
+        pack(directory, directory+".pack")
+        shutil.rmtree(directory)
+
+        client=create_client(media_path, batch_size=10)
+        response=client.get("/media/foo/bar/00000001.drc")
+        assert response.status_code==200
+        assert response.content==segment
+        assert response.headers["content-type"]=="pointcloud/drc"
+        response=client.get("/media/foo/bar/00000001.drc", headers={"If-None-Match": response.headers["etag"]})
+        assert response.status_code==304
+        assert client.get("/media/foo/bar/00000003.drc").status_code==404
+
+        response=client.get("/media/foo/bar/batch/00000001.drc/10")
+        assert response.headers["x-segments"]=="00000001.drc,00000002.drc"
+        assert unpack(response.content)==[segment, segment[:10]]
+
+    def test_serves_metrics(self, media_path):
+        client=create_client(media_path, cache=BufferCache(Buffer()))
+        client.get("/media/foo/bar/00000001.drc")
+        client.get("/media/foo/bar/00000001.drc")
+
+        response=client.get("/metrics")
+        assert response.status_code==200
+        lines=response.text.splitlines()
+        assert 'pointcloudserver_request_duration_seconds_count{route="/media/{name}/{representation}/{segment}",cache="miss"} 1' in lines
+        assert 'pointcloudserver_request_duration_seconds_count{route="/media/{name}/{representation}/{segment}",cache="hit"} 1' in lines
+        assert 'pointcloudserver_served_bytes_total{media="foo",representation="bar"} 2048' in lines
+        assert 'pointcloudserver_disk_read_duration_seconds_count 1' in lines
+        assert 'pointcloudserver_cache_hits_total 1' in lines
+        assert 'pointcloudserver_requests_in_flight 1' in lines
+
+    def test_traces_request_phases(self, media_path):
+        client=create_client(media_path, cache=BufferCache(Buffer()), admin=True)
+        client.get("/media/foo/bar/00000001.drc")
+        assert client.get("/admin/traces").json()==[]
+
+        assert client.put("/admin/tracing", params={"enabled": True}).json()["enabled"]
+        client.get("/media/foo/bar/00000001.drc")
+        client.get("/media/foo/bar/00000002.drc")
+        traces=client.get("/admin/traces").json()
+        assert [trace["path"] for trace in traces]==["/media/foo/bar/00000002.drc", "/media/foo/bar/00000001.drc"]
+        assert set(traces[0]["phases"])=={"routing", "stat", "cache", "disk", "write"}
+        assert set(traces[1]["phases"])=={"routing", "stat", "cache", "write"}
+        assert traces[1]["status"]==200
+
+    def test_profiles_server(self, media_path):
+        client=create_client(media_path, admin=True, max_profile_seconds=1)
+        response=client.get("/admin/profile", params={"seconds": 0.1, "interval": 0.001})
+        assert response.status_code==200
+        assert "attachment" in response.headers["content-disposition"]
+        stack, count=response.text.splitlines()[0].rsplit(" ", 1)
+        assert int(count) > 0 and ";" in stack
+
+        assert client.get("/admin/profile", params={"seconds": 2}).status_code==400
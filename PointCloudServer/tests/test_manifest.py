@@ -0,0 +1,119 @@
+import os
+from argparse import Namespace
+
+import pytest
+from pointcloudserver.commands import mpd as mpd_command
+from pointcloudserver.dash import manifest as manifest_module
+from pointcloudserver.dash.manifest import MediaManifest
+from pointcloudserver.dash.mpd import replace_file, scan_segments, stat_segments
+
+def settle(path, files=False):
+    # Folders and frames modified within the last seconds are always statted again
+    for directory, _, names in os.walk(path):
+        os.utime(directory, ns=(10**18, 10**18))
+        for name in names if files else []:
+            os.utime(os.path.join(directory, name), ns=(10**18, 10**18))
+
+@pytest.fixture
+def media_path(tmp_path):
+    for quality in ["low", "high"]:
+        (tmp_path/quality).mkdir()
+        for frame in range(3):
+            (tmp_path/quality/"{:08d}.drc".format(frame)).write_bytes(bytes(frame+1))
+    settle(tmp_path)
+    return tmp_path
+
+class TestMediaManifest:
+    def test_lists_same_segments_as_scan(self, media_path):
+        manifest=MediaManifest()
+        changed, removed=manifest.update(str(media_path))
+        assert sorted(changed)==["high", "low"] and removed==[]
+        assert manifest.get_segments()==stat_segments(scan_segments(str(media_path)))
+
+    def test_rescans_changed_folders_only(self, media_path, tmp_path_factory, monkeypatch):
+        path=str(tmp_path_factory.mktemp("manifest")/"manifest.json")
+        manifest=MediaManifest()
+        manifest.update(str(media_path))
+        manifest.save(path)
+
+        statted=[]
+        stat_files=manifest_module.stat_files
+        monkeypatch.setattr(manifest_module, "stat_files", lambda paths, io_workers: statted.extend(paths) or stat_files(paths, io_workers))
+        manifest=MediaManifest.load(path)
+        assert manifest.update(str(media_path))==([], [])
+        assert statted==[]
+
+        (media_path/"mid").mkdir()
+        (media_path/"mid"/"00000000.drc").write_bytes(bytes(5))
+        (media_path/"low"/"00000003.drc").write_bytes(bytes(7))
+        changed, removed=manifest.update(str(media_path))
+        assert sorted(changed)==["low", "mid"] and removed==[]
+        assert "high" not in {os.path.basename(os.path.dirname(path)) for path in statted}
+        assert manifest.get_segments()==stat_segments(scan_segments(str(media_path)))
+
+        os.remove(media_path/"mid"/"00000000.drc")
+        os.rmdir(media_path/"mid")
+        assert manifest.update(str(media_path))==([], ["mid"])
+
+    def test_skips_files_that_are_no_segments(self, media_path):
+        (media_path/"low"/"00000003.drc.tmp").write_bytes(bytes(3))
+        (media_path/"low"/".DS_Store").write_bytes(bytes(3))
+        manifest=MediaManifest()
+        manifest.update(str(media_path))
+        assert [url for _, _, url, _ in manifest.get_segments()]==["high/0000000{}.drc".format(i) for i in range(3)]+["low/0000000{}.drc".format(i) for i in range(3)]
+
+    def test_detects_frames_written_in_place(self, media_path):
+        manifest=MediaManifest()
+        manifest.update(str(media_path))
+        # Appending neither changes the folder nor, once it is old, the time of the last scan
+        with open(media_path/"low"/"00000000.drc", "ab") as f:
+            f.write(bytes(4))
+        assert manifest.update(str(media_path))==(["low"], [])
+        assert manifest.get_segments()[3]==(0, "0", "low/00000000.drc", 5)
+
+        settle(media_path, files=True)
+        manifest.update(str(media_path))
+        with open(media_path/"high"/"00000002.drc", "ab") as f:
+            f.write(bytes(4))
+        settle(media_path)
+        assert manifest.update(str(media_path))==(["high"], [])
+        assert manifest.get_segments()[2]==(2, "2", "high/00000002.drc", 7)
+
+    def test_watch_survives_failed_updates(self, media_path, tmp_path_factory, monkeypatch, caplog):
+        output_file=str(tmp_path_factory.mktemp("mpd")/"mpd.xml")
+        os.remove(media_path/"low"/"00000001.drc")
+        sleeps=[]
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 2:
+                raise KeyboardInterrupt()
+            (media_path/"low"/"00000001.drc").write_bytes(bytes(2))
+
+        monkeypatch.setattr(mpd_command.T, "sleep", sleep)
+        args=Namespace(mediaDir=[str(media_path)], outputFile=output_file, framesPerSecond=30, watch=1.0, manifest=None, ioWorkers=1, compact=True, baseUrl="/media/foo/", batchSize=None, pretty=False)
+        with pytest.raises(KeyboardInterrupt):
+            mpd_command.run(args)
+        assert "not numbered consecutively" in caplog.text
+        assert os.path.isfile(output_file)
+
+    def test_detects_multiple_objects(self, tmp_path):
+        for object in ["a", "b"]:
+            (tmp_path/object/"0").mkdir(parents=True)
+            (tmp_path/object/"0"/"00000000.ply").write_bytes(bytes(3))
+        manifest=MediaManifest()
+        manifest.update(str(tmp_path))
+        assert manifest.get_segments()==[(0, "a", "a/0/00000000.ply", 3), (0, "b", "b/0/00000000.ply", 3)]
+
+        (tmp_path/"a"/"1").mkdir()
+        (tmp_path/"a"/"1"/"00000000.ply").write_bytes(bytes(4))
+        assert manifest.update(str(tmp_path))==(["a/1"], [])
+
+    def test_replaces_changed_files_only(self, tmp_path):
+        path=str(tmp_path/"mpd.xml")
+        assert replace_file(path, lambda f: f.write("<MPD/>"))
+        mtime=os.stat(path).st_mtime_ns
+        assert not replace_file(path, lambda f: f.write("<MPD/>"))
+        assert os.stat(path).st_mtime_ns==mtime
+        assert replace_file(path, lambda f: f.write("<MPD />"))
+        assert os.listdir(tmp_path)==["mpd.xml"]
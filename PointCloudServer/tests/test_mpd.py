@@ -0,0 +1,141 @@
+import io
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+
+import pytest
+from pointcloudserver.dash.mpd import BATCH_SCHEME, get_bandwidth, get_compact_timeslots, get_period_segments, get_period_times, get_representation_id, get_representation_urls, get_segment_template, index_representations, index_segments, scan_segments, stat_segments, write_compact_mpd, write_mpd
+from pointcloudserver.dash.timeline import parse_timeline
+
+@pytest.fixture
+def single_object(tmp_path):
+    for quality, size in [("low", 10), ("high", 30)]:
+        (tmp_path/quality).mkdir()
+        # Created out of order, the frame order must not depend on the file system
+        for frame in [2, 0, 1]:
+            (tmp_path/quality/"{:08d}.drc".format(frame)).write_bytes(bytes(size+frame))
+    (tmp_path/"mpd.xml").write_text("")
+    return tmp_path
+
+@pytest.fixture
+def multiple_object(tmp_path):
+    for object in ["a", "b"]:
+        for quality in ["0", "1"]:
+            (tmp_path/object/quality).mkdir(parents=True)
+            for frame in range(2):
+                (tmp_path/object/quality/"{:08d}.ply".format(frame)).write_bytes(bytes(5))
+    return tmp_path
+
+def scan_media(path, io_workers=1):
+    return index_segments(stat_segments(scan_segments(path), io_workers))
+
+def scan_representations(path):
+    return index_representations(stat_segments(scan_segments(path)))
+
+def build_tree(periods, fps, batch_size=None):
+    """Build the MPD the streaming writer is compared with as ElementTree, adaptation sets have their id first"""
+    mpd=ET.Element("MPD")
+    mpd.set("type", "static")
+    mpd.set("minBufferTime", str(1.0/float(fps)))
+    mpd.set("mediaPresentationDuration", str(len(periods)*(1/fps)))
+    ET.SubElement(mpd, "BaseURL").text="/media/foo/"
+    if batch_size is not None:
+        batch=ET.SubElement(mpd, "SupplementalProperty")
+        batch.set("schemeIdUri", BATCH_SCHEME)
+        batch.set("value", str(batch_size))
+    for index, adaptation_sets in enumerate(periods):
+        period=ET.SubElement(mpd, "Period")
+        period.set("id", str(index))
+        start, end, duration=get_period_times(index, fps)
+        period.set("start", start)
+        period.set("end", end)
+        period.set("duration", duration)
+        for adaptation_set in adaptation_sets.values():
+            element=ET.SubElement(period, "AdaptationSet")
+            element.set("id", adaptation_set.id)
+            element.set("mimeType", adaptation_set.mime_type)
+            for url, size in adaptation_set.representations:
+                representation=ET.SubElement(element, "Representation")
+                representation.set("id", get_representation_id(url))
+                representation.set("size", str(size))
+                representation.set("bandwidth", str(get_bandwidth(size, fps)))
+                ET.SubElement(representation, "BaseURL").text=url
+    return mpd
+
+def serialize_xml(root, pretty=False):
+    if pretty:
+        return minidom.parseString(ET.tostring(root)).toprettyxml(indent="  ")
+    return ET.tostring(root, encoding='unicode', method='xml')
+
+class TestMPD:
+    @pytest.mark.parametrize("io_workers", [1, 4])
+    def test_scans_single_object(self, single_object, io_workers):
+        periods=scan_media(str(single_object), io_workers=io_workers)
+        assert len(periods)==3
+        assert list(periods[1].keys())==["1"]
+        assert periods[1]["1"].mime_type=="pointcloud/drc"
+        assert periods[1]["1"].representations==[("high/00000001.drc", 31), ("low/00000001.drc", 11)]
+
+    def test_scans_multiple_object(self, multiple_object):
+        periods=scan_media(str(multiple_object))
+        assert len(periods)==2
+        assert list(periods[0].keys())==["a", "b"]
+        assert periods[0]["b"].representations==[("b/0/00000000.ply", 5), ("b/1/00000000.ply", 5)]
+
+    @pytest.mark.parametrize("pretty", [False, True])
+    @pytest.mark.parametrize("layout", ["single_object", "multiple_object"])
+    def test_streams_same_mpd_as_tree(self, layout, pretty, request):
+        periods=scan_media(str(request.getfixturevalue(layout)))
+        file=io.StringIO()
+        write_mpd(file, periods, "/media/foo/", fps=30, batch_size=4, pretty=pretty)
+        expected=serialize_xml(build_tree(periods, 30, batch_size=4), pretty=pretty)
+        assert file.getvalue()==expected
+
+    def test_streamed_mpd_lists_segments(self, single_object):
+        file=io.StringIO()
+        write_mpd(file, scan_media(str(single_object)), "/media/foo/", fps=30)
+        urls=get_representation_urls(ET.fromstring(file.getvalue().encode()))
+        assert urls[:2]==[("high/00000000.drc", 30), ("low/00000000.drc", 10)]
+
+    @pytest.mark.parametrize("layout", ["single_object", "multiple_object"])
+    def test_compact_mpd_lists_same_segments(self, layout, request):
+        path=str(request.getfixturevalue(layout))
+        file=io.StringIO()
+        write_mpd(file, scan_media(path), "/media/foo/", fps=30)
+        compact=io.StringIO()
+        write_compact_mpd(compact, scan_representations(path), "/media/foo/", fps=30, pretty=True)
+
+        expected=get_period_segments(ET.fromstring(file.getvalue()))
+        segments=get_period_segments(ET.fromstring(compact.getvalue().encode()))
+        assert [sorted(urls) for urls in segments]==[sorted(urls) for urls in expected]
+
+    def test_compact_mpd_has_frame_times_and_bandwidths(self, single_object):
+        file=io.StringIO()
+        write_compact_mpd(file, scan_representations(str(single_object)), "/media/foo/", fps=10)
+        root=ET.fromstring(file.getvalue())
+        timeslots=get_compact_timeslots(root)
+        assert [(start, end) for start, end, _ in timeslots]==[(0.0, 0.1), (0.1, 0.2), (0.2, 0.3)]
+        assert timeslots[2][2]==[[("high", "high/00000002.drc", 320, 32), ("low", "low/00000002.drc", 120, 12)]]
+
+        timeline=parse_timeline(file.getvalue(), "http://127.0.0.1/media/foo")
+        assert round(timeline[1].start)==100 and round(timeline[1].duration)==100
+        assert timeline[1].alternatives[0][0].url=="http://127.0.0.1/media/foo/low/00000001.drc"
+
+    def test_segment_template_needs_consecutive_frames(self):
+        assert get_segment_template(["00000005.drc", "00000006.drc"])==("$Number%08d$.drc", 5)
+        with pytest.raises(ValueError):
+            get_segment_template(["00000000.drc", "00000002.drc"])
+        with pytest.raises(ValueError):
+            get_segment_template(["frame0.ply"])
+
+    def test_compact_mpd_skips_files_that_are_no_segments(self, single_object):
+        (single_object/"low"/"00000003.drc.tmp").write_bytes(bytes(3))
+        (single_object/"low"/".DS_Store").write_bytes(bytes(3))
+        file=io.StringIO()
+        write_compact_mpd(file, scan_representations(str(single_object)), "/media/foo/", fps=10)
+        urls=get_representation_urls(ET.fromstring(file.getvalue()))
+        assert sorted(url for url, _ in urls)==["high/0000000{}.drc".format(i) for i in range(3)]+["low/0000000{}.drc".format(i) for i in range(3)]
+
+    def test_compact_mpd_reports_gaps(self, single_object):
+        (single_object/"low"/"00000001.drc").unlink()
+        with pytest.raises(ValueError, match="Representation low .* \"00000002.drc\" where \"00000001.drc\""):
+            write_compact_mpd(io.StringIO(), scan_representations(str(single_object)), "/media/foo/", fps=10)
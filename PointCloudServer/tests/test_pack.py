@@ -0,0 +1,72 @@
+import os
+from argparse import Namespace
+
+import pytest
+import pointcloudserver.commands.pack as pack_command
+from pointcloudserver.dash.mpd import index_segments, scan_segments, stat_segments
+from pointcloudserver.transfer.pack import PackedRepresentation, load_index, pack, unpack, verify
+
+def scan_media(path):
+    return index_segments(stat_segments(scan_segments(path)))
+
+@pytest.fixture
+def representation(tmp_path):
+    directory=tmp_path/"foo"/"q0"
+    directory.mkdir(parents=True)
+    for frame in [2, 0, 1]:
+        (directory/"{:08d}.drc".format(frame)).write_bytes(bytes([frame])*(frame+5))
+    return directory
+
+class TestPack:
+    def test_packs_and_unpacks_segments(self, representation, tmp_path):
+        path=str(representation)+".pack"
+        assert pack(str(representation), path)==3
+        assert [(name, size) for name, _, size in load_index(path)]==[("00000000.drc", 5), ("00000001.drc", 6), ("00000002.drc", 7)]
+
+        assert unpack(path, str(tmp_path/"copy"))==3
+        for name in os.listdir(representation):
+            assert (tmp_path/"copy"/name).read_bytes()==(representation/name).read_bytes()
+
+    def test_verify_compares_names_and_sizes(self, representation):
+        path=str(representation)+".pack"
+        pack(str(representation), path)
+        verify(path, str(representation))
+
+        (representation/"00000001.drc").write_bytes(bytes(2))
+        with pytest.raises(ValueError, match="00000001.drc"):
+            verify(path, str(representation))
+        (representation/"00000001.drc").unlink()
+        with pytest.raises(ValueError, match="00000001.drc"):
+            verify(path, str(representation))
+
+    def test_command_removes_folders_only_on_request(self, representation):
+        media_dir=str(representation.parent)
+        pack_command.run(Namespace(mediaDir=[media_dir], unpack=False, remove=False))
+        assert os.path.isdir(representation) and os.path.isfile(str(representation)+".pack")
+
+        pack_command.run(Namespace(mediaDir=[media_dir], unpack=False, remove=True))
+        assert not os.path.exists(representation)
+
+        pack_command.run(Namespace(mediaDir=[media_dir], unpack=True, remove=True))
+        assert sorted(os.listdir(representation))==["00000000.drc", "00000001.drc", "00000002.drc"]
+        assert not os.path.exists(str(representation)+".pack")
+
+    def test_serves_slices_of_mapping(self, representation):
+        path=str(representation)+".pack"
+        pack(str(representation), path)
+        packed=PackedRepresentation(path, os.stat(path))
+        data=packed.get("00000001.drc")
+        assert isinstance(data, memoryview)
+        assert bytes(data)==bytes([1])*6
+        assert packed.get("00000003.drc") is None
+        assert packed.get_range("00000001.drc", 5)==["00000001.drc", "00000002.drc"]
+        assert packed.get_etag("00000001.drc")!=packed.get_etag("00000002.drc")
+
+    def test_mpd_lists_packed_segments(self, representation):
+        media_path=str(representation.parent)
+        expected=scan_media(media_path)
+        pack(str(representation), str(representation)+".pack")
+        # Packed representations take precedence over folders of the same name
+        (representation/"00000003.drc").write_bytes(b"")
+        periods=scan_media(media_path)
+        assert [[adaptation_set.representations for adaptation_set in period.values()] for period in periods]==[[adaptation_set.representations for adaptation_set in period.values()] for period in expected]
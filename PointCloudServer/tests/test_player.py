@@ -0,0 +1,99 @@
+import asyncio
+
+import httpx
+import pytest
+from pointcloudserver.dash.adaptation import AvailableBandwidthPolicy, BandwidthMeter, HighestBandwidthPolicy
+from pointcloudserver.dash.player import Player
+from pointcloudserver.dash.throughput import BandwidthTrace, TokenBucket
+from pointcloudserver.dash.timeline import parse_duration, parse_timeline
+from pointcloudserver.transfer.dash_server import DASHServer
+
+def create_mpd(periods=3, qualities=[("low", 1000), ("high", 4000)]):
+    mpd='<MPD type="static" minBufferTime="0.01"><BaseURL>/media/foo/</BaseURL>'
+    for i in range(periods):
+        mpd+='<Period id="{0}" start="PT{1}S" end="PT{2}S"><AdaptationSet id="0" mimeType="pointcloud/drc">'.format(i, i*0.01, (i+1)*0.01)
+        for quality, bandwidth in qualities:
+            mpd+='<Representation id="{0}-{1}" bandwidth="{2}"><BaseURL>{1}/{0:08d}.drc</BaseURL></Representation>'.format(i, quality, bandwidth)
+        mpd+='</AdaptationSet></Period>'
+    return mpd+'</MPD>'
+
+class TestPlayer:
+    def test_parses_timeline(self):
+        assert parse_duration("PT1M0.5S")==60.5
+        assert parse_duration("PT3.3e-05S")==3.3e-05
+
+        timeline=parse_timeline(create_mpd(), "http://127.0.0.1/media/foo")
+        assert len(timeline)==3
+        assert round(timeline[1].start)==10 and round(timeline[1].duration)==10
+        assert timeline[1].alternatives[0][1].url=="http://127.0.0.1/media/foo/high/00000001.drc"
+        assert timeline[1].selections[0].bandwidth==1000
+
+    def test_policies_select_like_unity_client(self):
+        timeline=parse_timeline(create_mpd(), "http://127.0.0.1/media/foo")
+        meter=BandwidthMeter()
+        meter.measure(3000, 1.0)
+        AvailableBandwidthPolicy(meter).adapt(timeline)
+        assert [timeslot.selections[0].bandwidth for timeslot in timeline]==[1000, 1000, 1000]
+
+        # The played timeslot and buffered timeslots keep their selection
+        meter.measure(5000, 1.0)
+        timeline[1].buffered=True
+        AvailableBandwidthPolicy(meter).adapt(timeline)
+        assert [timeslot.selections[0].bandwidth for timeslot in timeline]==[1000, 1000, 4000]
+
+        HighestBandwidthPolicy().adapt(timeline)
+        assert timeline[0].selections[0].bandwidth==4000
+
+    def test_token_bucket_follows_trace(self, tmp_path):
+        path=tmp_path/"trace.txt"
+        path.write_text("# time mbit/s\n5 0.008\n6 0.016\n")
+        trace=BandwidthTrace.load(str(path))
+        assert trace.get_rate(0.5)==1000 and trace.get_rate(1.5)==2000 and trace.get_rate(2.5)==1000
+
+        now=[0.0]
+        bucket=TokenBucket(trace, burst=100, clock=lambda: now[0])
+
+        async def sleep(seconds):
+            now[0]+=seconds
+
+        async def run():
+            original=asyncio.sleep
+            asyncio.sleep=sleep
+            try:
+                await bucket.consume(1100)
+                first=now[0]
+                await bucket.consume(2000)
+                return first, now[0]
+            finally:
+                asyncio.sleep=original
+
+        first, second=asyncio.run(run())
+        assert abs(first-1.0) < 0.06
+        assert abs(second-2.0) < 0.06
+
+    def test_orders_alternatives_by_bandwidth(self):
+        # Like MPDs of `pointcloudserver mpd`, whose folder names sort high before low
+        timeline=parse_timeline(create_mpd(qualities=[("high", 4000), ("low", 1000)]), "http://127.0.0.1/media/foo")
+        assert [r.bandwidth for r in timeline[0].alternatives[0]]==[1000, 4000]
+        assert timeline[0].get_relative_quality()==0.0
+        HighestBandwidthPolicy().adapt(timeline)
+        assert timeline[0].get_relative_quality()==1.0
+
+    @pytest.mark.parametrize("qualities", [[("low", 1000), ("high", 4000)], [("high", 4000), ("low", 1000)]])
+    def test_plays_media_from_server(self, tmp_path, qualities):
+        (tmp_path/"foo"/"low").mkdir(parents=True)
+        (tmp_path/"foo"/"high").mkdir(parents=True)
+        (tmp_path/"foo"/"mpd.xml").write_text(create_mpd(qualities=qualities))
+        for i in range(3):
+            (tmp_path/"foo"/"low"/"{:08d}.drc".format(i)).write_bytes(bytes(100))
+            (tmp_path/"foo"/"high"/"{:08d}.drc".format(i)).write_bytes(bytes(400))
+
+        async def run():
+            server=DASHServer(media_path=str(tmp_path), metrics=False)
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as client:
+                return await Player(client, "http://test/media/foo", policy="highest").run()
+
+        report=asyncio.run(run())
+        assert report["played_timeslots"]==3
+        assert report["bytes"]==1200 and report["errors"]==0
+        assert report["mean_quality"]==1.0
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from pointcloudserver.transfer.prefetcher import Prefetcher
+
+def notify_all(prefetcher, requests, size=10):
+    for name, representation, segment in requests:
+        prefetcher.notify(name, representation, segment, "/media/{}/{}/{}".format(name, representation, segment), size)
+
+class TestPrefetcher:
+    def test_prefetches_after_sequential_requests(self):
+        paths=[]
+
+        async def prefetch(path):
+            paths.append(path)
+
+        async def run():
+            prefetcher=Prefetcher(prefetch, segments=2)
+            notify_all(prefetcher, [("foo", "q0", "00000001.drc")])
+            assert not prefetcher.tasks
+            # Segment N of another representation does not continue segment N-1 of q0
+            notify_all(prefetcher, [("foo", "q1", "00000002.drc"), ("bar", "q0", "00000002.drc"), ("foo", "q0", "00000002.drc")])
+            await asyncio.gather(*prefetcher.tasks)
+
+        asyncio.run(run())
+        assert paths==["/media/foo/q0/00000003.drc", "/media/foo/q0/00000004.drc"]
+
+    def test_skips_segments_without_number(self):
+        async def prefetch(path):
+            raise AssertionError("Nothing should be prefetched")
+
+        async def run():
+            prefetcher=Prefetcher(prefetch, segments=2)
+            notify_all(prefetcher, [("foo", "q0", "frame1.ply"), ("foo", "q0", "frame2.ply"), ("foo", "q0", "00000001")])
+            return prefetcher.get_stats()
+
+        assert asyncio.run(run())=={"prefetched": 0, "running": 0}
+
+    def test_limits_prefetched_bytes(self):
+        paths=[]
+
+        async def prefetch(path):
+            paths.append(path)
+
+        async def run():
+            prefetcher=Prefetcher(prefetch, segments=8, max_size=25)
+            notify_all(prefetcher, [("foo", "q0", "00000001.drc"), ("foo", "q0", "00000002.drc")], size=10)
+            await asyncio.gather(*prefetcher.tasks)
+
+        asyncio.run(run())
+        assert paths==["/media/foo/q0/00000003.drc", "/media/foo/q0/00000004.drc"]
+
+    def test_limits_prefetched_bytes_to_free_space(self):
+        paths=[]
+        free_size=[35]
+
+        async def prefetch(path):
+            paths.append(path)
+
+        async def run():
+            prefetcher=Prefetcher(prefetch, segments=8, get_free_size=lambda: free_size[0])
+            notify_all(prefetcher, [("foo", "q0", "00000001.drc"), ("foo", "q0", "00000002.drc")], size=10)
+            # Segments still being loaded count against the free space
+            notify_all(prefetcher, [("bar", "q0", "00000001.drc"), ("bar", "q0", "00000002.drc")], size=10)
+            await asyncio.gather(*prefetcher.tasks)
+            free_size[0]=0
+            notify_all(prefetcher, [("foo", "q1", "00000001.drc"), ("foo", "q1", "00000002.drc")], size=10)
+            return prefetcher.get_stats()
+
+        stats=asyncio.run(run())
+        assert paths==["/media/foo/q0/0000000{}.drc".format(i) for i in range(3, 6)]
+        assert stats=={"prefetched": 3, "running": 0}
+
+    def test_schedules_segments_once(self):
+        paths=[]
+
+        async def prefetch(path):
+            paths.append(path)
+
+        async def run():
+            prefetcher=Prefetcher(prefetch, segments=3)
+            # Segments 3 and 4 were scheduled by the request of segment 2 already
+            notify_all(prefetcher, [("foo", "q0", "00000001.drc"), ("foo", "q0", "00000002.drc"), ("foo", "q0", "00000003.drc")])
+            await asyncio.gather(*prefetcher.tasks)
+            return prefetcher.get_stats()
+
+        stats=asyncio.run(run())
+        assert paths==["/media/foo/q0/0000000{}.drc".format(i) for i in range(3, 7)]
+        assert stats=={"prefetched": 4, "running": 0}
+
+    def test_logs_failed_prefetches(self, caplog):
+        async def prefetch(path):
+            raise OSError("No such file {}".format(path))
+
+        async def run():
+            prefetcher=Prefetcher(prefetch, segments=1)
+            notify_all(prefetcher, [("foo", "q0", "00000001.drc"), ("foo", "q0", "00000002.drc")])
+            await asyncio.gather(*prefetcher.tasks, return_exceptions=True)
+            await asyncio.sleep(0)
+            return prefetcher.get_stats()
+
+        with caplog.at_level(logging.WARNING):
+            stats=asyncio.run(run())
+        assert stats=={"prefetched": 1, "running": 0}
+        assert "Prefetching failed: No such file /media/foo/q0/00000003.drc" in caplog.text
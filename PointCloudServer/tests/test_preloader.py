@@ -0,0 +1,44 @@
+import asyncio
+import os
+
+import pytest
+from pointcloudserver.transfer.preloader import Preloader
+from pointcloudserver.transfer.redis_cache import RedisCache
+
+fakeredis=pytest.importorskip("fakeredis")
+
+@pytest.fixture
+def media_path(tmp_path):
+    for quality, size in [("qp8", 10), ("qp12", 20)]:
+        os.makedirs(tmp_path/"foo"/quality)
+        for frame in range(3):
+            (tmp_path/"foo"/quality/"{:08d}.drc".format(frame)).write_bytes(bytes(size))
+    return str(tmp_path)
+
+def create_preloader(media_path, **kwargs):
+    return Preloader(RedisCache(client=fakeredis.FakeAsyncRedis()), media_path, **kwargs)
+
+class TestPreloader:
+    def test_plans_first_periods_and_low_qualities_first(self, media_path):
+        preloader=create_preloader(media_path, budget=65)
+        planned=[os.path.relpath(path, media_path) for path, _ in preloader.plan()]
+        assert planned==[os.path.join("foo", "qp8", "00000000.drc"), os.path.join("foo", "qp12", "00000000.drc"), os.path.join("foo", "qp8", "00000001.drc"), os.path.join("foo", "qp12", "00000001.drc")]
+
+    def test_loads_segments_into_cache(self, media_path):
+        preloader=create_preloader(media_path, periods=2, batch_size=3)
+
+        async def run():
+            stats=await preloader.run()
+            path=os.path.join(media_path, "foo", "qp12", "00000001.drc")
+            return stats, await preloader.cache.get(path), await preloader.cache.exists(os.path.join(media_path, "foo", "qp12", "00000002.drc"))
+
+        stats, value, exists=asyncio.run(run())
+        assert stats["segments"]==4 and stats["bytes"]==60
+        assert value==bytes(20) and not exists
+
+    def test_reports_failed_writes(self, media_path):
+        server=fakeredis.FakeServer()
+        server.connected=False
+        preloader=Preloader(RedisCache(client=fakeredis.FakeAsyncRedis(server=server)), media_path, batch_size=3)
+        stats=asyncio.run(preloader.run())
+        assert stats["segments"]==6 and stats["errors"]==2
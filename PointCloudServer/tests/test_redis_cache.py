@@ -0,0 +1,107 @@
+import asyncio
+import logging
+
+import pytest
+from pointcloudserver.transfer.redis_cache import NOT_FOUND, RedisCache
+
+fakeredis=pytest.importorskip("fakeredis")
+
+def create_cache(**kwargs):
+    return RedisCache(client=fakeredis.FakeAsyncRedis(), **kwargs)
+
+class TestRedisCache:
+    def test_get_returns_stored_value(self):
+        async def run():
+            cache=create_cache()
+            await cache.set("a", b"1234")
+            await cache.drain()
+            return await cache.get("a"), await cache.get("b"), await cache.exists("a")
+
+        assert asyncio.run(run())==(b"1234", None, True)
+
+    def test_stores_negative_entries(self):
+        async def run():
+            cache=create_cache()
+            await cache.set_missing("a")
+            await cache.drain()
+            return await cache.get("a"), cache.get_stats()["negative_hits"]
+
+        assert asyncio.run(run())==(NOT_FOUND, 1)
+
+    def test_sets_ttl(self):
+        async def run():
+            cache=create_cache(ttl=60)
+            await cache.set("a", b"1")
+            await cache.drain()
+            return await cache.client.ttl(cache.prefix+"a")
+
+        assert 0 < asyncio.run(run()) <= 60
+
+    def test_pipelines_concurrent_writes(self):
+        async def run():
+            cache=create_cache()
+            await asyncio.gather(*[cache.set(str(i), b"x") for i in range(10)])
+            await cache.drain()
+            return cache.get_stats()["pipelines"], await cache.get("9")
+
+        pipelines, value=asyncio.run(run())
+        assert pipelines==1
+        assert value==b"x"
+
+    def test_compresses_values(self):
+        pytest.importorskip("zstandard")
+
+        async def run():
+            cache=create_cache(compression="zstd")
+            await cache.set("a", b"x"*1000)
+            await cache.drain()
+            return await cache.get("a"), cache.get_stats()
+
+        value, stats=asyncio.run(run())
+        assert value==b"x"*1000
+        assert stats["stored_bytes"] < stats["raw_bytes"]
+
+    def test_compresses_on_executor(self):
+        pytest.importorskip("zstandard")
+        calls=[]
+
+        async def run_io(func, *args):
+            calls.append(func.__name__)
+            return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+        async def run():
+            cache=create_cache(compression="zstd")
+            cache.set_executor(run_io)
+            await cache.set("a", b"x"*1000)
+            await cache.drain()
+            return await cache.get("a")
+
+        assert asyncio.run(run())==b"x"*1000
+        assert calls==["compress", "decompress"]
+
+    def test_set_does_not_wait_for_redis(self):
+        async def run():
+            cache=create_cache()
+            await cache.set("a", b"1")
+            sent=cache.get_stats()["pipelines"]
+            await cache.drain()
+            return sent, cache.get_stats()["pipelines"]
+
+        assert asyncio.run(run())==(0, 1)
+
+    def test_reports_memory_limit_without_changing_it(self, caplog):
+        class Client(fakeredis.FakeAsyncRedis):
+            async def config_get(self, pattern="*"):
+                return {b"maxmemory": b"0", b"maxmemory-policy": b"noeviction"}
+
+            async def config_set(self, name, value):
+                raise AssertionError("The redis server must not be reconfigured")
+
+        async def run():
+            cache=RedisCache(client=Client())
+            return await cache.get("a")
+
+        with caplog.at_level(logging.INFO):
+            assert asyncio.run(run()) is None
+        assert "eviction policy noeviction" in caplog.text
+        assert "does not evict segments" in caplog.text
@@ -0,0 +1,55 @@
+import asyncio
+import numpy as np
+import pytest
+from pointcloudserver.transfer.sequence import RecordedSequence, encode_sequence
+from pointcloudserver.transfer.socket_server import SocketServer
+
+def load_scan(path):
+    scan=np.fromfile(path, dtype=np.float32).reshape((-1, 4))
+    return scan[:, :3], np.repeat(scan[:, 3:]*255, 3, axis=1)
+
+@pytest.fixture
+def sequence(tmp_path):
+    directory=tmp_path/"scans"
+    directory.mkdir()
+    for frame in range(3):
+        scan=np.array([[frame, 1.5, -2, 0.5]]*(frame+1)+[[40, -40, 0, 1]], dtype=np.float32)
+        scan.tofile(directory/"{:06d}.bin".format(frame))
+    (directory/"notes.txt").write_text("not a frame")
+    path=str(tmp_path/"scans.frames")
+    assert encode_sequence(str(directory), path, scale=1000, load=load_scan)==3
+    return path
+
+class TestRecordedSequence:
+    def test_encodes_frames_in_wire_format(self, sequence):
+        recorded=RecordedSequence(sequence, fps=10)
+        assert len(recorded)==3
+        frame=recorded.get(0.15)
+        assert isinstance(frame, memoryview)
+        xyz=np.array([[1000, 1500, -2000], [1000, 1500, -2000], [32767, -32768, 0]])
+        rgb=np.array([[127]*3, [127]*3, [255]*3])
+        assert frame==SocketServer().serialize(xyz, rgb)
+
+    def test_paces_and_loops_playback(self, sequence):
+        recorded=RecordedSequence(sequence, fps=10)
+        assert [recorded.get_index(t) for t in [0, 0.09, 0.1, 0.25]]==[0, 0, 1, 2]
+        assert recorded.get(0.3) is None
+        recorded.loop=True
+        assert recorded.get_index(0.35)==0
+
+    def test_socket_server_streams_sequence(self, sequence):
+        async def run():
+            server=SocketServer(port=0, fps=10, sequence=RecordedSequence(sequence, fps=10))
+            listener=await server.listen()
+            reader, writer=await asyncio.open_connection("127.0.0.1", listener.sockets[0].getsockname()[1])
+            writer.write(b'\x01')
+            # The server closes the connection after the last frame
+            data=await asyncio.wait_for(reader.read(), 2)
+            writer.close()
+            listener.close()
+            return data
+
+        data=asyncio.run(run())
+        recorded=RecordedSequence(sequence)
+        frames=[bytes(recorded.packed.get(name)) for name in recorded.packed.names]
+        assert data==b"".join(frames)
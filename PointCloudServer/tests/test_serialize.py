@@ -1,5 +1,7 @@
 import numpy as np
+import pytest
 from pointcloudserver.transfer.socket_server import SocketServer
+from pointcloudserver.transfer.wire import get_frame_size, serialize_into
 
 vertices=np.array([
     [0,1,2],
@@ -21,3 +23,24 @@ class TestSerialize:
         server=SocketServer()
         serialized_actual=server.serialize(vertices, colors)
         assert serialized_actual==serialized_expected
+
+    def test_serialize_into_reused_buffer(self):
+        server=SocketServer()
+        buffer=bytearray(64)
+        assert server.serialize(vertices, colors, buffer)==serialized_expected
+        # A smaller frame overwrites the start of the buffer
+        assert server.serialize(vertices[:1], colors[:1], buffer)==b'\x01\x00\x00\x00\x00\x00\x01\x00\x02\x00\x06\x07\x08'
+
+    def test_serialize_matches_numpy_conversion(self):
+        rng=np.random.default_rng(0)
+        xyz=rng.uniform(-1000, 1000, (1000, 3))
+        rgb=rng.integers(0, 256, (1000, 3))
+        expected=np.array([1000], dtype=np.int32).tobytes()+xyz.astype(np.int16).tobytes()+rgb.astype(np.uint8).tobytes()
+        assert SocketServer().serialize(xyz, rgb)==expected
+
+    def test_serialize_into_checks_buffer_size(self):
+        with pytest.raises(ValueError):
+            serialize_into(bytearray(get_frame_size(2)-1), vertices, colors)
+        buffer=bytearray(get_frame_size(2)+3)
+        assert serialize_into(buffer, vertices, colors, offset=3)==len(serialized_expected)
+        assert buffer[3:]==serialized_expected
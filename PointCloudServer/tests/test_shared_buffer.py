@@ -0,0 +1,46 @@
+import multiprocessing
+
+import pytest
+from pointcloudserver.transfer.shared_buffer import SharedBuffer
+
+# Buffer sizes are given in MB, this converts from bytes
+B=1/(1024*1024)
+
+class TestSharedBuffer:
+    def test_get_returns_stored_value(self):
+        buffer=SharedBuffer(max_size=1024*B)
+        buffer.set("a", b"1234")
+        assert buffer.get("a")==b"1234"
+        assert buffer.get("b") is None
+        assert "a" in buffer
+
+    def test_overwrites_oldest_values(self):
+        buffer=SharedBuffer(max_size=1024*B)
+        for i in range(10):
+            buffer.set(str(i), bytes([i])*200)
+        assert buffer.get("0") is None
+        assert buffer.get("9")==bytes([9])*200
+        assert buffer.get_current_size()==1024
+
+    def test_updates_and_deletes_values(self):
+        buffer=SharedBuffer(max_size=1024*B)
+        buffer.set("a", b"1")
+        buffer.set("a", b"2")
+        assert buffer.get("a")==b"2"
+        buffer.delete("a")
+        assert "a" not in buffer
+
+    @pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="Requires fork")
+    def test_shares_values_with_forked_processes(self):
+        buffer=SharedBuffer(max_size=1024*B)
+        buffer.set("parent", b"1")
+
+        def child():
+            assert buffer.get("parent")==b"1"
+            buffer.set("child", b"2")
+
+        process=multiprocessing.get_context("fork").Process(target=child)
+        process.start()
+        process.join()
+        assert process.exitcode==0
+        assert buffer.get("child")==b"2"
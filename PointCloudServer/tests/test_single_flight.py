@@ -0,0 +1,51 @@
+import asyncio
+from pointcloudserver.transfer.single_flight import SingleFlight
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_fill(self):
+        calls=[]
+
+        async def load(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return key*2
+
+        async def run():
+            single_flight=SingleFlight()
+            results=await asyncio.gather(*[single_flight.do("a", load, "a") for _ in range(10)])
+            return single_flight, results
+
+        single_flight, results=asyncio.run(run())
+        assert calls==["a"]
+        assert results==["aa"]*10
+        assert single_flight.get_stats()=={"fills": 1, "coalesced": 9, "in_flight": 0}
+
+    def test_sequential_calls_fill_again(self):
+        calls=[]
+
+        async def load(key):
+            calls.append(key)
+            return key
+
+        async def run():
+            single_flight=SingleFlight()
+            await single_flight.do("a", load, "a")
+            await single_flight.do("a", load, "a")
+
+        asyncio.run(run())
+        assert calls==["a", "a"]
+
+    def test_cancelled_caller_does_not_cancel_fill(self):
+        async def load(key):
+            await asyncio.sleep(0.01)
+            return key
+
+        async def run():
+            single_flight=SingleFlight()
+            first=asyncio.ensure_future(single_flight.do("a", load, "a"))
+            second=asyncio.ensure_future(single_flight.do("a", load, "a"))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(run())=="a"
@@ -0,0 +1,102 @@
+import asyncio
+import struct
+from pointcloudserver.transfer.socket_server import FrameRing, SocketServer
+
+async def start(server):
+    listener=await server.listen()
+    return listener, listener.sockets[0].getsockname()[1]
+
+async def read_frame(reader):
+    num_points=struct.unpack("<i", await reader.readexactly(4))[0]
+    return await reader.readexactly(num_points*9)
+
+class TestSocketServer:
+    def test_serves_concurrent_clients(self):
+        async def run():
+            server=SocketServer(port=0)
+            listener, port=await start(server)
+            clients=[await asyncio.open_connection("127.0.0.1", port) for _ in range(3)]
+            # All clients stay connected while requesting frames
+            for reader, writer in clients:
+                writer.write(b'\x00\x00')
+            frames=[[await read_frame(reader), await read_frame(reader)] for reader, _ in clients]
+            stats=server.get_stats()
+            for _, writer in clients:
+                writer.close()
+            listener.close()
+            return frames, stats
+
+        frames, stats=asyncio.run(run())
+        assert [len(pair) for pair in frames]==[2, 2, 2]
+        assert all(len(frame)==10000*9 for pair in frames for frame in pair)
+        assert sorted(s["frames"] for s in stats)==[2, 2, 2]
+        assert all(s["requests"]==2 and s["dropped"]==0 for s in stats)
+
+    def test_pushes_frames_at_frame_rate(self):
+        async def run():
+            server=SocketServer(port=0, fps=20)
+            listener, port=await start(server)
+            reader, writer=await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b'\x01')
+            frames=0
+            loop=asyncio.get_running_loop()
+            end=loop.time()+0.5
+            while loop.time() < end:
+                await asyncio.wait_for(read_frame(reader), 1)
+                frames+=1
+            writer.write(b'\x02')
+            writer.close()
+            listener.close()
+            return frames
+
+        frames=asyncio.run(run())
+        assert 5 <= frames <= 12
+
+    def test_drops_frames_for_slow_clients(self):
+        async def run():
+            server=SocketServer(port=0, fps=200, max_buffer=0)
+            listener, port=await start(server)
+            # The client never reads, so frames pile up in the socket buffers
+            reader, writer=await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b'\x01')
+            await asyncio.sleep(1.0)
+            stats=server.get_stats()[0]
+            writer.close()
+            listener.close()
+            return stats
+
+        stats=asyncio.run(run())
+        assert stats["frames"] > 0
+        assert stats["dropped"] > 0
+
+class TestFrameRing:
+    def test_reuses_buffers_no_frame_refers_to(self):
+        ring=FrameRing(max_bytes=0)
+        buffer=ring.get(10)
+        first=id(buffer)
+        del buffer
+        buffer=ring.get(10)
+        assert id(buffer)==first
+        # A frame still being sent keeps its buffer
+        frame=memoryview(buffer)[:10]
+        del buffer
+        assert ring.get(10) is not frame.obj
+        assert ring.get_stats()=={"buffers": 2, "allocated": 2, "reused": 1}
+
+    def test_replaces_oldest_buffer_while_all_are_in_use(self):
+        ring=FrameRing(max_bytes=0)
+        frames=[ring.get(10) for _ in range(5)]
+        assert len({id(frame) for frame in frames})==5
+        assert ring.get_stats()=={"buffers": 3, "allocated": 5, "reused": 0}
+        del frames
+        ring.get(10)
+        assert ring.get_stats()["reused"]==1
+
+    def test_server_serializes_into_ring(self):
+        server=SocketServer(num_points=100)
+        first=bytes(server.encode_frame())
+        second=server.encode_frame()
+        assert len(first)==len(second)==4+100*9
+        del second
+        server.encode_frame()
+        assert server.buffers.get_stats()=={"buffers": 1, "allocated": 1, "reused": 2}
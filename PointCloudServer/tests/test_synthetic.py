@@ -0,0 +1,30 @@
+import numpy as np
+from pointcloudserver.transfer.synthetic import SyntheticWorkload, get_cube_surface
+
+class TestSyntheticWorkload:
+    def test_cube_points_lie_on_faces(self):
+        points=get_cube_surface(600, np.random.default_rng(0))
+        assert points.shape==(600, 3)
+        on_face=np.isclose(np.abs(points), 0.5).any(axis=1)
+        assert on_face.all()
+        # Every face holds the same number of points
+        faces=np.isclose(points, 0.5).sum(axis=0)+np.isclose(points, -0.5).sum(axis=0)
+        assert faces.tolist()==[200, 200, 200]
+
+    def test_same_seed_gives_same_frames(self):
+        first=SyntheticWorkload(num_points=1000, shape="sphere", seed=3)
+        second=SyntheticWorkload(num_points=1000, shape="sphere", seed=3)
+        xyz, rgb=first.get_frame(1.5)
+        assert np.array_equal(xyz, second.get_frame(1.5)[0])
+        assert np.array_equal(rgb, second.get_frame(1.5)[1])
+        assert rgb.dtype==np.uint8
+
+    def test_frames_rotate_geometry(self):
+        workload=SyntheticWorkload(num_points=1000, shape="ball", ms_per_rot=1000)
+        start, _=workload.get_frame(0)
+        rotated, _=workload.get_frame(0.25)
+        assert np.allclose(start, workload.xyz)
+        assert not np.allclose(rotated, start)
+        assert np.allclose(np.linalg.norm(rotated, axis=1), np.linalg.norm(start, axis=1), atol=1e-2)
+        assert np.allclose(workload.get_frame(1.0)[0], start, atol=1e-2)
+        assert np.linalg.norm(start, axis=1).max() <= 1000.01
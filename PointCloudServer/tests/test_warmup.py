@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from pointcloudserver.dash.mpd import index_segments, scan_segments, stat_segments, write_mpd
+from pointcloudserver.transfer.buffer import Buffer
+from pointcloudserver.transfer.cache import BufferCache
+from pointcloudserver.transfer.dash_server import DASHServer
+from pointcloudserver.transfer.warmup import WarmUp
+
+@pytest.fixture
+def media_path(tmp_path):
+    for quality, size in [("qp8", 10), ("qp12", 20)]:
+        os.makedirs(tmp_path/"foo"/quality)
+        for frame in range(3):
+            (tmp_path/"foo"/quality/"{:08d}.drc".format(frame)).write_bytes(bytes(size))
+    with open(tmp_path/"foo"/"mpd.xml", "w") as file:
+        write_mpd(file, index_segments(stat_segments(scan_segments(str(tmp_path/"foo")))), "/media/foo/", fps=30)
+    return str(tmp_path)
+
+def warm_up(media_path, **kwargs):
+    paths=[]
+
+    async def prefetch(path):
+        paths.append(os.path.relpath(path, media_path))
+
+    async def run_io(func, *args):
+        return func(*args)
+
+    asyncio.run(WarmUp(media_path, prefetch, run_io, **kwargs).run())
+    return sorted(paths)
+
+class TestWarmUp:
+    def test_loads_all_segments(self, media_path):
+        assert len(warm_up(media_path))==6
+
+    def test_loads_first_periods(self, media_path):
+        assert warm_up(media_path, periods=2)==sorted(os.path.join("foo", quality, "{:08d}.drc".format(frame)) for quality in ["qp8", "qp12"] for frame in range(2))
+
+    def test_stops_at_budget(self, media_path):
+        # The segments of the first period take 30 bytes, the next segment does not fit
+        assert warm_up(media_path, budget=45)==[os.path.join("foo", "qp12", "00000000.drc"), os.path.join("foo", "qp8", "00000000.drc")]
+
+    def test_fills_server_cache(self, media_path):
+        server=DASHServer(media_path=media_path, cache=BufferCache(Buffer()), warmup_periods=1)
+        with TestClient(server.app):
+            for _ in range(100):
+                if server.cache.get_stats()["size"] >= 30:
+                    break
+                time.sleep(0.01)
+        assert server.cache.get_stats()["size"]==30
+
+    def test_server_logs_failed_warm_up(self, media_path, caplog):
+        server=DASHServer(media_path=os.path.join(media_path, "missing"), cache=BufferCache(Buffer()), warmup_periods=1)
+        with caplog.at_level(logging.ERROR), TestClient(server.app) as client:
+            assert client.get("/media/foo/qp8/00000000.drc").status_code==404
+        assert "Cache warm-up failed" in caplog.text